@@ -0,0 +1,79 @@
+"""Benchmark attendance_correlation against the per-subject pearsonr loop it replaced.
+
+    python benchmarks/bench_correlation.py --rows 200000 --subjects 50 200 500
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from services.analytics import attendance_correlation  # noqa: E402
+
+
+def loop_reference(df: pd.DataFrame) -> dict:
+    """The previous implementation: mask the frame and call pearsonr once per subject."""
+    r, p = stats.pearsonr(df["attendance_pct"], df["marks"])
+    by_subject = {}
+    for subj in df["subject"].dropna().unique():
+        s = df[df["subject"] == subj]
+        if len(s) >= 3:
+            r_s, p_s = stats.pearsonr(s["attendance_pct"], s["marks"])
+            by_subject[str(subj)] = {"correlation": round(float(r_s), 4), "p_value": round(float(p_s), 4)}
+    return {
+        "overall": {"correlation": round(float(r), 4), "p_value": round(float(p), 4)},
+        "by_subject": by_subject,
+    }
+
+
+def frame(rows: int, subjects: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    att = rng.uniform(40, 100, rows).round(1)
+    return pd.DataFrame({
+        "subject": pd.Categorical(rng.integers(0, subjects, rows).astype(str)),
+        "attendance_pct": att,
+        "marks": np.clip(att * 0.6 + rng.normal(0, 15, rows), 0, 100).round(0),
+        "semester": rng.integers(1, 3, rows),
+        "grade": rng.choice(list("ABCD"), rows),
+    })
+
+
+def timed(func, *args, repeat: int = 3, **kwargs) -> tuple[float, object]:
+    best, out = float("inf"), None
+    for _ in range(repeat):
+        t = time.perf_counter()
+        out = func(*args, **kwargs)
+        best = min(best, time.perf_counter() - t)
+    return best, out
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--subjects", type=int, nargs="+", default=[50, 200, 500])
+    args = parser.parse_args()
+
+    results = []
+    for n_subjects in args.subjects:
+        df = frame(args.rows, n_subjects)
+        t_loop, ref = timed(loop_reference, df)
+        t_new, new = timed(attendance_correlation, df)
+        t_spear, _ = timed(attendance_correlation, df, method="spearman")
+        t_groups, _ = timed(attendance_correlation, df, group_by=("subject", "semester", "grade"))
+        results.append({
+            "rows": args.rows,
+            "subjects": n_subjects,
+            "loop_seconds": round(t_loop, 4),
+            "grouped_seconds": round(t_new, 4),
+            "speedup": round(t_loop / t_new, 1),
+            "spearman_seconds": round(t_spear, 4),
+            "subject_semester_grade_seconds": round(t_groups, 4),
+            "same_output": json.dumps(ref) == json.dumps(new),
+        })
+    print(json.dumps(results, indent=2))
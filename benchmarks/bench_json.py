@@ -0,0 +1,122 @@
+"""Benchmark insights response encoding on a large roster (default 100k students).
+
+    python benchmarks/bench_json.py --students 100000
+
+Compares the old path (jsonable_encoder + stdlib JSONResponse) with serialization.dumps
+(orjson, and the stdlib fallback), times gzip/brotli at a few levels, the native analytics
+records against DataFrame.to_dict, and a full GET /api/insights against an If-None-Match
+revalidation (304).
+"""
+import argparse
+import gzip
+import json
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+
+from datagen import synthetic_frame, write_csv  # noqa: E402
+from services import serialization  # noqa: E402
+from services.analytics import risk_analysis, risk_records, run_analytics  # noqa: E402
+from services.ingestion import preprocess  # noqa: E402
+from services.insights import build_insight_summary  # noqa: E402
+from services.snapshot import snapshot_path  # noqa: E402
+
+
+def best_of(func, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - t)
+    return round(best, 4)
+
+
+def bench_encoding(insights: dict, repeat: int) -> dict:
+    out = {"old_jsonable_encoder_stdlib": best_of(lambda: JSONResponse(jsonable_encoder(insights)), repeat)}
+    orjson = serialization.orjson
+    if orjson is not None:
+        out["orjson"] = best_of(lambda: serialization.dumps(insights), repeat)
+    serialization.orjson = None
+    try:
+        out["stdlib_fallback"] = best_of(lambda: serialization.dumps(insights), repeat)
+    finally:
+        serialization.orjson = orjson
+    return out
+
+
+def bench_compression(body: bytes) -> dict:
+    out = {"identity": {"bytes": len(body)}}
+    for level in (1, 5, 9):
+        t = time.perf_counter()
+        size = len(gzip.compress(body, compresslevel=level, mtime=0))
+        out[f"gzip-{level}"] = {"seconds": round(time.perf_counter() - t, 4), "bytes": size}
+    if serialization.brotli is not None:
+        for quality in (1, 5, 9):
+            t = time.perf_counter()
+            size = len(serialization.brotli.compress(body, quality=quality))
+            out[f"br-{quality}"] = {"seconds": round(time.perf_counter() - t, 4), "bytes": size}
+    return out
+
+
+def bench_http(csv_path: Path) -> dict:
+    from fastapi.testclient import TestClient
+
+    import main
+
+    params = {"csv_path": str(csv_path)}
+    out = {}
+    with TestClient(main.app) as client:
+        client.get("/api/insights", params=params)  # compute and cache
+        for label, headers in (("plain", {"Accept-Encoding": "identity"}), ("gzip", {"Accept-Encoding": "gzip"})):
+            t = time.perf_counter()
+            r = client.get("/api/insights", params=params, headers=headers)
+            out[f"full_{label}"] = {"seconds": round(time.perf_counter() - t, 4), "status": r.status_code}
+        etag = r.headers.get("etag")
+        t = time.perf_counter()
+        r = client.get("/api/insights", params=params, headers={"If-None-Match": etag})
+        out["revalidate"] = {"seconds": round(time.perf_counter() - t, 4), "status": r.status_code}
+    return out
+
+
+def main(args) -> dict:
+    df = preprocess(synthetic_frame(students=args.students, subjects=args.subjects, seed=args.seed))
+    risk_seconds = {
+        "to_dict_records": best_of(lambda: risk_analysis(df).to_dict(orient="records"), 1),
+        "native_records": best_of(lambda: risk_records(df), 1),
+    }
+    insights = build_insight_summary(run_analytics(df))
+    body = serialization.dumps(insights)
+    report = {
+        "students": args.students,
+        "payload_bytes": len(body),
+        "risk_records_seconds": risk_seconds,
+        "encode_seconds": bench_encoding(insights, args.repeat),
+        "compression": bench_compression(body),
+    }
+    if not args.no_http:
+        workdir = Path(tempfile.mkdtemp(prefix="bench-json-"))
+        try:
+            csv_path = write_csv(synthetic_frame(students=args.students, subjects=args.subjects, seed=args.seed),
+                                 workdir / "students.csv")
+            report["http"] = bench_http(csv_path)
+            shutil.rmtree(snapshot_path(csv_path), ignore_errors=True)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--students", type=int, default=100_000)
+    parser.add_argument("--subjects", type=int, default=6)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--no-http", action="store_true")
+    print(json.dumps(main(parser.parse_args()), indent=2))
@@ -0,0 +1,265 @@
+"""Benchmark the analytics pipeline stage by stage and the HTTP endpoints at several dataset sizes.
+
+    python benchmarks/bench_pipeline.py --sizes 1000 100000 1000000 --out bench.json
+    python benchmarks/bench_pipeline.py --sizes 1000 100000 --compare bench.json
+
+For each size a synthetic CSV (benchmarks/datagen.py) is timed through parse, preprocess,
+run_analytics, build_insight_summary, the index, the chunked path and the whole pipeline,
+each once more under tracemalloc for its peak Python/numpy allocation. The endpoints are
+then called in-process through the ASGI app. The JSON report carries the commit and
+library versions; --compare prints the ratio to an older report and exits 1 if any timing
+got slower than --threshold (ignoring differences under --min-seconds).
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from datagen import synthetic_frame, write_csv  # noqa: E402
+from services.analytics import run_analytics, run_analytics_chunked  # noqa: E402
+from services.ingestion import (  # noqa: E402
+    _normalize_columns,
+    _read_csv,
+    iter_csv_chunks,
+    preprocess,
+    sniff_format,
+)
+from services.insights import InsightIndex, build_insight_summary  # noqa: E402
+from services.snapshot import snapshot_path  # noqa: E402
+
+DEFAULT_SIZES = (1_000, 100_000, 1_000_000)
+
+
+def timed(func: Callable[[], Any], trace_memory: bool) -> tuple[Any, dict[str, float]]:
+    """Run func once for time, then (optionally) again under tracemalloc for its peak."""
+    t = time.perf_counter()
+    result = func()
+    stats = {"seconds": round(time.perf_counter() - t, 4)}
+    if trace_memory:
+        tracemalloc.start()
+        try:
+            func()
+            stats["peak_mb"] = round(tracemalloc.get_traced_memory()[1] / 2**20, 2)
+        finally:
+            tracemalloc.stop()
+    return result, stats
+
+
+def bench_stages(csv_path: Path, trace_memory: bool) -> dict[str, dict]:
+    """Time each step of load_csv → run_analytics → build_insight_summary separately."""
+    import main  # noqa: E402  (imported here so generating data doesn't pay for the app)
+
+    stages: dict[str, dict] = {}
+
+    def parse() -> pd.DataFrame:
+        return _normalize_columns(_read_csv(csv_path, sniff_format(csv_path)))
+
+    raw, stages["parse"] = timed(parse, trace_memory)
+    df, stages["preprocess"] = timed(lambda: preprocess(raw), trace_memory)
+    analytics, stages["analytics"] = timed(lambda: run_analytics(df), trace_memory)
+    insights, stages["summary"] = timed(lambda: build_insight_summary(analytics), trace_memory)
+    _, stages["index"] = timed(lambda: InsightIndex(insights), trace_memory)
+    _, stages["chunked_analytics"] = timed(
+        lambda: run_analytics_chunked(iter_csv_chunks(csv_path)), trace_memory
+    )
+    # Whole pipeline as the API runs it: first without a snapshot, then reading it back
+    shutil.rmtree(snapshot_path(csv_path), ignore_errors=True)
+    _, stages["pipeline_cold"] = timed(lambda: main._compute_insights(csv_path), False)
+    _, stages["pipeline_snapshot"] = timed(lambda: main._compute_insights(csv_path), trace_memory)
+    shutil.rmtree(snapshot_path(csv_path), ignore_errors=True)
+    return stages
+
+
+def bench_http(csv_path: Path) -> dict[str, dict]:
+    """Call the endpoints in-process (upload is a cache miss; the rest reuse its dataset)."""
+    from fastapi.testclient import TestClient
+
+    import main
+    from services.cache import insights_cache
+
+    results: dict[str, dict] = {}
+    name = f"bench-{csv_path.stem}.csv"
+    uploaded = main.UPLOAD_DIR / name
+    with TestClient(main.app, raise_server_exceptions=False) as client:
+        def call(label: str, method: str, url: str, **kwargs) -> Any:
+            t = time.perf_counter()
+            r = client.request(method, url, **kwargs)
+            results[label] = {
+                "seconds": round(time.perf_counter() - t, 4),
+                "status": r.status_code,
+                "bytes": len(r.content),
+            }
+            if r.status_code >= 400:
+                print(f"  {label}: HTTP {r.status_code} {r.text[:200]}", file=sys.stderr)
+            return r
+
+        try:
+            with open(csv_path, "rb") as f:
+                call("upload", "POST", "/api/upload", files={"file": (name, f, "text/csv")})
+            params = {"csv_path": str(uploaded)}
+            call("insights_cached", "GET", "/api/insights", params=params)
+            page = call("insights_page", "GET", "/api/insights", params={
+                **params, "limit": 50, "sort": "academic_health", "exclude": "raw_analytics",
+            })
+            students = page.json().get("students", []) if page.status_code == 200 else []
+            if students:
+                sid = students[-1]["student_id"]
+                call("student", "GET", f"/api/students/{sid}", params=params)
+            call("correlation", "GET", "/api/correlation", params={**params, "group_by": "subject,semester"})
+        finally:
+            insights_cache.invalidate(uploaded)
+            shutil.rmtree(snapshot_path(uploaded), ignore_errors=True)
+            uploaded.unlink(missing_ok=True)
+    return results
+
+
+def _max_rss_mb() -> float:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / (2**20 if sys.platform == "darwin" else 2**10), 1)  # bytes on macOS, KiB on Linux
+
+
+def _git(*args: str) -> Optional[str]:
+    try:
+        out = subprocess.run(["git", *args], cwd=ROOT, capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.stdout.strip()
+
+
+def environment() -> dict[str, Any]:
+    import fastapi
+    import scipy
+
+    return {
+        "commit": _git("rev-parse", "HEAD"),
+        "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "versions": {
+            "pandas": pd.__version__,
+            "numpy": np.__version__,
+            "scipy": scipy.__version__,
+            "fastapi": fastapi.__version__,
+        },
+    }
+
+
+def run(args) -> dict[str, Any]:
+    report: dict[str, Any] = {"environment": environment(), "config": {}, "results": []}
+    data_spec = {
+        "subjects": args.subjects,
+        "semesters": args.semesters,
+        "null_rate": args.null_rate,
+        "dirty_header_rate": args.dirty_header_rate,
+        "seed": args.seed,
+    }
+    report["config"] = {**data_spec, "encoding": args.encoding, "delimiter": args.delimiter}
+    workdir = Path(tempfile.mkdtemp(prefix="bench-"))
+    try:
+        for rows in args.sizes:
+            t = time.perf_counter()
+            csv_path = write_csv(
+                synthetic_frame(rows=rows, **data_spec),
+                workdir / f"students-{rows}.csv",
+                encoding=args.encoding,
+                delimiter=args.delimiter,
+            )
+            entry: dict[str, Any] = {
+                "rows": rows,
+                "file_bytes": csv_path.stat().st_size,
+                "generate_seconds": round(time.perf_counter() - t, 4),
+            }
+            print(f"{rows} rows ({entry['file_bytes']} bytes)...", file=sys.stderr)
+            entry["stages"] = bench_stages(csv_path, trace_memory=not args.no_memory)
+            if not args.no_http:
+                entry["http"] = bench_http(csv_path)
+            entry["max_rss_mb"] = _max_rss_mb()
+            report["results"].append(entry)
+            csv_path.unlink()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return report
+
+
+def _flatten(report: dict[str, Any], field: str) -> dict[str, Any]:
+    """One field per measurement: {"100000/stages/analytics": value, ...}."""
+    flat = {}
+    for entry in report.get("results", []):
+        for section in ("stages", "http"):
+            for name, stats in entry.get(section, {}).items():
+                if field in stats:
+                    flat[f"{entry['rows']}/{section}/{name}"] = stats[field]
+    return flat
+
+
+def compare(old: dict[str, Any], new: dict[str, Any], threshold: float, min_seconds: float) -> list[str]:
+    """Print new/old timing ratios; return the keys that regressed."""
+    before, after = _flatten(old, "seconds"), _flatten(new, "seconds")
+    regressed = []
+    print(f"{'metric':<42}{'old s':>10}{'new s':>10}{'ratio':>8}")
+    for key in sorted(after.keys() & before.keys(), key=lambda k: (int(k.split('/')[0]), k)):
+        a, b = before[key], after[key]
+        ratio = b / a if a else float("inf")
+        flag = ""
+        if ratio > threshold and b - a > min_seconds:
+            regressed.append(key)
+            flag = "  << slower"
+        print(f"{key:<42}{a:>10.4f}{b:>10.4f}{ratio:>8.2f}{flag}")
+    old_status, new_status = _flatten(old, "status"), _flatten(new, "status")
+    for key in sorted(new_status.keys() & old_status.keys()):
+        if new_status[key] != old_status[key]:
+            print(f"{key}: HTTP {old_status[key]} -> {new_status[key]}")
+    return regressed
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES), help="rows per dataset")
+    parser.add_argument("--subjects", type=int, default=6)
+    parser.add_argument("--semesters", type=int, default=2)
+    parser.add_argument("--null-rate", type=float, default=0.01)
+    parser.add_argument("--dirty-header-rate", type=float, default=0.0)
+    parser.add_argument("--encoding", default="utf-8")
+    parser.add_argument("--delimiter", default=",")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc pass")
+    parser.add_argument("--no-http", action="store_true", help="skip the endpoint timings")
+    parser.add_argument("--out", type=Path, help="write the JSON report here (default: stdout)")
+    parser.add_argument("--compare", type=Path, help="earlier report to compare against")
+    parser.add_argument("--threshold", type=float, default=1.25, help="new/old ratio that counts as a regression")
+    parser.add_argument("--min-seconds", type=float, default=0.01, help="ignore slowdowns smaller than this")
+    args = parser.parse_args(argv)
+
+    report = run(args)
+    text = json.dumps(report, indent=2)
+    if args.out:
+        args.out.write_text(text)
+    elif not args.compare:
+        print(text)
+    if args.compare:
+        regressed = compare(json.loads(args.compare.read_text()), report, args.threshold, args.min_seconds)
+        if regressed:
+            print(f"{len(regressed)} timing(s) regressed beyond {args.threshold}x", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,119 @@
+"""Benchmark risk_records from 1k to 1M rows and check that it scales near-linearly.
+
+    python benchmarks/bench_risk_scaling.py
+    python benchmarks/bench_risk_scaling.py --sizes 1000 10000 100000 1000000 --max-exponent 1.2
+
+For each size a synthetic frame (benchmarks/datagen.py, preprocessed as an upload would
+be) is timed through risk_records, best of --repeat. The exponent is the slope of
+log(seconds) against log(rows) over the sizes; 1.0 is linear. Up to --reference-rows the
+output is also compared with the per-student loop risk_records replaced (quadratic, so
+only run on small frames). Prints JSON and exits 1 if the output differs or the exponent
+exceeds --max-exponent.
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from datagen import synthetic_frame  # noqa: E402
+from services.analytics import _widen_numeric, risk_records  # noqa: E402
+from services.ingestion import preprocess  # noqa: E402
+
+
+def loop_reference(df: pd.DataFrame) -> list[dict]:
+    """The previous implementation: one boolean-mask scan and one weak_subjects pass per student."""
+    df = _widen_numeric(df)
+
+    def weak_subjects(frame: pd.DataFrame, threshold: float = 50) -> dict[str, list[dict]]:
+        out = {}
+        for sid, g in frame.groupby("student_id", observed=True):
+            weak = g[g["marks"] < threshold][["subject", "marks"]].to_dict("records")
+            for r in weak:
+                r["marks"] = round(float(r["marks"]), 2)
+            out[str(sid)] = weak
+        return out
+
+    agg = df.groupby("student_id", observed=True).agg(avg_marks=("marks", "mean")).round(2)
+    agg = agg.assign(name=df.groupby("student_id", observed=True)["name"].first()).reset_index()
+    risk_list = []
+    for _, row in agg.iterrows():
+        sid = row["student_id"]
+        student_df = df[df["student_id"] == sid]
+        avg_m = row["avg_marks"]
+        att = student_df["attendance_pct"].mean()
+        weak = weak_subjects(df).get(str(sid), [])
+        risk_list.append({
+            "student_id": sid,
+            "name": row.get("name", ""),
+            "avg_marks": round(avg_m, 2),
+            "attendance_avg": round(float(att), 2) if not np.isnan(att) else None,
+            "weak_subject_count": len(weak),
+            "weak_subjects": [w["subject"] for w in weak],
+            "subject_marks": student_df[["subject", "marks"]].to_dict(orient="records"),
+            "risk_low_marks": bool(avg_m < 55),
+            "risk_low_attendance": bool(att < 75),
+            "risk_multiple_weak": len(weak) >= 2,
+        })
+    return risk_list
+
+
+def timed(func, *args, repeat: int = 3) -> tuple[float, object]:
+    best, out = float("inf"), None
+    for _ in range(repeat):
+        t = time.perf_counter()
+        out = func(*args)
+        best = min(best, time.perf_counter() - t)
+    return best, out
+
+
+def exponent(rows: list[int], seconds: list[float]) -> float:
+    """Least-squares slope of log(seconds) on log(rows)."""
+    return float(np.polyfit(np.log(rows), np.log(seconds), 1)[0])
+
+
+def main(args) -> int:
+    results, failures = [], []
+    for rows in args.sizes:
+        df = preprocess(synthetic_frame(rows=rows, semesters=args.semesters, null_rate=args.null_rate, seed=args.seed))
+        seconds, out = timed(risk_records, df, repeat=args.repeat)
+        entry = {
+            "rows": rows,
+            "students": len(out),
+            "seconds": round(seconds, 4),
+            "us_per_row": round(seconds / rows * 1e6, 3),
+        }
+        if rows <= args.reference_rows:
+            t_ref, ref = timed(loop_reference, df, repeat=1)
+            entry["reference_seconds"] = round(t_ref, 4)
+            entry["identical"] = json.dumps(ref, default=str) == json.dumps(out, default=str)
+            if not entry["identical"]:
+                failures.append(f"{rows} rows: output differs from the per-student loop")
+        print(f"{rows} rows: {seconds:.4f}s", file=sys.stderr)
+        results.append(entry)
+    report = {"results": results}
+    if len(results) > 1:
+        report["exponent"] = round(exponent([r["rows"] for r in results], [r["seconds"] for r in results]), 3)
+        if report["exponent"] > args.max_exponent:
+            failures.append(f"time grows like rows^{report['exponent']} (limit {args.max_exponent})")
+    report["failures"] = failures
+    print(json.dumps(report, indent=2))
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000, 1_000_000])
+    parser.add_argument("--semesters", type=int, default=2)
+    parser.add_argument("--null-rate", type=float, default=0.02)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--reference-rows", type=int, default=1_000,
+                        help="compare with the per-student loop up to this many rows")
+    parser.add_argument("--max-exponent", type=float, default=1.2)
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,246 @@
+"""Check that chunked (and appended) analytics match run_analytics on the whole file.
+
+    python benchmarks/check_chunked_parity.py --students 2000 --chunk-rows 1000
+
+Cases:
+- plain: text ids, one row per student and subject, some blank cells.
+- mixed_ids: numeric ids with a text id ("S99") only in a later chunk; each chunk is
+  typed on its own, so the chunked path has to settle on text ids like pandas does.
+- semesters: several rows per student and subject (subject_marks lists each row).
+- append: POST /api/upload?mode=append of a text-id delta into a numeric-id dataset,
+  compared with a full recompute of the combined file.
+- append_patch: two appends that add subjects to existing students and add new ones;
+  these patch the cached insights and append to the state log, so the response and the
+  state read back from disk must both match a full recompute.
+- append_read: an append that repeats an existing student's subject; the append
+  response, GET /api/insights and GET /api/students/{id} served from the cache must
+  equal the same reads after every cache is cleared (same ETag, same body). dtype_plan
+  is left out: it describes a loaded frame, and an append loads none (it is null, as
+  for chunked files).
+
+Everything must be equal, number types included (45 and 45.0 serialize differently).
+Correlations come from co-moments merged chunk by chunk, so they are exact up to
+floating-point rounding before being rounded to 4 places. Prints the mismatches as
+JSON and exits 1 if there are any.
+"""
+import argparse
+import json
+import math
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from datagen import synthetic_frame  # noqa: E402
+from services.analytics import run_analytics, run_analytics_chunked  # noqa: E402
+from services.ingestion import iter_csv_chunks, load_csv  # noqa: E402
+
+def diff(a, b, path: str = "", out: list = None, limit: int = 10) -> list:
+    """Paths where a and b differ (NaN equals NaN; an int never equals a float)."""
+    out = [] if out is None else out
+    if len(out) >= limit:
+        return out
+    if isinstance(a, dict) and isinstance(b, dict):
+        for k in sorted(set(a) | set(b), key=str):
+            if k not in a or k not in b:
+                out.append(f"{path}/{k}: only in {'chunked' if k in b else 'full'}")
+            else:
+                diff(a[k], b[k], f"{path}/{k}", out, limit)
+    elif isinstance(a, list) and isinstance(b, list):
+        if len(a) != len(b):
+            out.append(f"{path}: {len(a)} vs {len(b)} items")
+        for i, (x, y) in enumerate(zip(a, b)):
+            diff(x, y, f"{path}[{i}]", out, limit)
+    elif isinstance(a, bool) or isinstance(b, bool) or isinstance(a, str) or isinstance(b, str):
+        if a != b:
+            out.append(f"{path}: {a!r} vs {b!r}")
+    elif isinstance(a, (int, float)) and isinstance(b, (int, float)):
+        if type(a) is not type(b) or not (a == b or (math.isnan(a) and math.isnan(b))):
+            out.append(f"{path}: {a!r} vs {b!r}")
+    elif a != b:
+        out.append(f"{path}: {a!r} vs {b!r}")
+    return out
+
+
+def compare_file(path: Path, chunk_rows: int) -> list:
+    full = run_analytics(load_csv(path))
+    chunked = run_analytics_chunked(iter_csv_chunks(path, chunksize=chunk_rows))
+    return diff(full, chunked)
+
+
+def numeric_ids(df, text_id_at: int = None):
+    """student_id as 1..n; the student at text_id_at (a position in the file) gets "S99"."""
+    codes = df["student_id"].astype("category").cat.codes + 1
+    df = df.assign(student_id=codes.astype(object))
+    if text_id_at is not None:
+        sid = df["student_id"].iloc[text_id_at]
+        df.loc[df["student_id"] == sid, "student_id"] = "S99"
+    return df
+
+
+def remove_dataset(target: Path) -> None:
+    from services.snapshot import snapshot_path
+
+    target.unlink(missing_ok=True)
+    snap = snapshot_path(target)
+    shutil.rmtree(snap, ignore_errors=True)
+    for f in snap.parent.glob(snap.name + ".state*"):
+        f.unlink()
+
+
+def post_csv(client, url: str, name: str, frame) -> tuple[int, dict]:
+    r = client.post(url, files={"file": (name, frame.to_csv(index=False).encode(), "text/csv")})
+    return r.status_code, (r.json() if r.status_code == 200 else {"error": r.text[:200]})
+
+
+def check_append(workdir: Path, students: int) -> list:
+    from fastapi.testclient import TestClient
+
+    import main
+    from config import UPLOAD_DIR
+
+    name = f"parity-append-{workdir.name}.csv"
+    base = numeric_ids(synthetic_frame(students=students, subjects=5, seed=3))
+    delta = synthetic_frame(students=20, subjects=5, seed=4)  # text ids ("S000001", ...)
+    target = UPLOAD_DIR / name
+    try:
+        with TestClient(main.app, raise_server_exceptions=False) as client:
+            status, _ = post_csv(client, "/api/upload", name, base)
+            if status != 200:
+                return [f"append: base upload returned {status}"]
+            status, body = post_csv(client, f"/api/upload?mode=append&dataset={name}", "delta.csv", delta)
+            if status != 200:
+                return [f"append: returned {status}: {body}"]
+        return diff(run_analytics(load_csv(target)), body["raw_analytics"], "/append")
+    finally:
+        remove_dataset(target)
+
+
+def check_append_patch(workdir: Path, students: int) -> list:
+    from fastapi.testclient import TestClient
+
+    import main
+    from config import UPLOAD_DIR
+    from services.analytics import AnalyticsAccumulator
+    from services.insights import build_insight_summary
+    from services.snapshot import read_state
+
+    name = f"parity-patch-{workdir.name}.csv"
+    # Deltas add subjects to existing students and add new students
+    frame = synthetic_frame(students=students + 40, subjects=6, seed=6)
+    sid = frame["student_id"].str[1:].astype(int)
+    last = frame["subject"] == frame["subject"].iloc[5]
+    base = frame[(sid < students) & ~last]
+    deltas = [
+        frame[((sid < 10) & last) | ((sid >= students) & (sid < students + 20))],
+        frame[((sid >= 10) & (sid < 20) & last) | (sid >= students + 20)],
+    ]
+    target = UPLOAD_DIR / name
+    out = []
+    try:
+        with TestClient(main.app, raise_server_exceptions=False) as client:
+            status, _ = post_csv(client, "/api/upload", name, base)
+            if status != 200:
+                return [f"append_patch: base upload returned {status}"]
+            for i, delta in enumerate(deltas):
+                status, body = post_csv(client, f"/api/upload?mode=append&dataset={name}", "delta.csv", delta)
+                if status != 200:
+                    return [f"append_patch: append {i} returned {status}: {body}"]
+        full = build_insight_summary(run_analytics(load_csv(target)))
+        out += diff({k: full[k] for k in ("summary", "students", "raw_analytics")},
+                    {k: body[k] for k in ("summary", "students", "raw_analytics")}, "/append_patch")
+        saved = read_state(target)  # the first append saves the whole state, later ones a patch each
+        if saved is None or len(saved[1]) != len(deltas) - 1:
+            out.append(f"append_patch: expected {len(deltas) - 1} patches on the saved state, got {saved and len(saved[1])}")
+        else:
+            out += diff(full["raw_analytics"], AnalyticsAccumulator.from_state(*saved).result(), "/append_patch/state")
+        return out
+    finally:
+        remove_dataset(target)
+
+
+def check_append_read(workdir: Path) -> list:
+    from fastapi.testclient import TestClient
+
+    import main
+    from config import UPLOAD_DIR
+    from services.cache import analytics_states, insight_indexes, insights_cache
+
+    name = f"parity-read-{workdir.name}.csv"
+    header = "student_id,name,subject,marks,attendance_pct\n"
+    base = header + "1,A,Math,40,70\n1,A,Sci,45,\n2,B,Math,90,95\n2,B,Sci,80,90\n3,C,Math,55,80\n"
+    target = UPLOAD_DIR / name
+    keys = ("summary", "students", "raw_analytics")
+    out = []
+
+    def reads(client) -> dict:
+        got = {}
+        for label, url in (("insights", "/api/insights"), ("student", "/api/students/1")):
+            r = client.get(url, params={"csv_path": str(target)})
+            body = {k: v for k, v in r.json().items() if k != "dtype_plan"}
+            got[label] = {"status": r.status_code, "etag": r.headers.get("etag"), "body": body}
+        return got
+
+    try:
+        with TestClient(main.app, raise_server_exceptions=False) as client:
+            r = client.post("/api/upload", files={"file": (name, base.encode(), "text/csv")})
+            if r.status_code != 200:
+                return [f"append_read: base upload returned {r.status_code}"]
+            r = client.post(f"/api/upload?mode=append&dataset={name}",
+                            files={"file": ("delta.csv", (header + "1,A,Math,60,75\n").encode(), "text/csv")})
+            if r.status_code != 200:
+                return [f"append_read: append returned {r.status_code}: {r.text[:200]}"]
+            appended = r.json()
+            cached = reads(client)
+            for cache in (insights_cache, insight_indexes, analytics_states):
+                cache.invalidate(target)
+            fresh = reads(client)
+        out += diff({k: fresh["insights"]["body"][k] for k in keys}, {k: appended[k] for k in keys}, "/append_read/response")
+        for label in ("insights", "student"):
+            a, b = fresh[label], cached[label]
+            if a["status"] != 200 or b["status"] != 200:
+                out.append(f"append_read/{label}: HTTP {b['status']} cached, {a['status']} recomputed")
+                continue
+            if a["etag"] != b["etag"]:
+                out.append(f"append_read/{label}: ETag {b['etag']} cached vs {a['etag']} recomputed")
+            out += diff(a["body"], b["body"], f"/append_read/{label}")
+        return out
+    finally:
+        remove_dataset(target)
+
+
+def main(args) -> int:
+    workdir = Path(tempfile.mkdtemp(prefix="parity-"))
+    report = {}
+    try:
+        plain = synthetic_frame(students=args.students, subjects=6, null_rate=0.02, seed=1)
+        plain.to_csv(workdir / "plain.csv", index=False)
+        report["plain"] = compare_file(workdir / "plain.csv", args.chunk_rows)
+
+        mixed = numeric_ids(synthetic_frame(students=args.students, subjects=6, seed=2),
+                            text_id_at=args.students * 6 - 1)
+        mixed.to_csv(workdir / "mixed.csv", index=False)
+        report["mixed_ids"] = compare_file(workdir / "mixed.csv", args.chunk_rows)
+
+        sem = synthetic_frame(students=args.students, subjects=4, semesters=3, seed=5)
+        sem.to_csv(workdir / "semesters.csv", index=False)
+        report["semesters"] = compare_file(workdir / "semesters.csv", args.chunk_rows)
+
+        if not args.no_http:
+            report["append"] = check_append(workdir, min(args.students, 500))
+            report["append_patch"] = check_append_patch(workdir, min(args.students, 500))
+            report["append_read"] = check_append_read(workdir)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    print(json.dumps(report, indent=2))
+    return 1 if any(report.values()) else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--students", type=int, default=2000)
+    parser.add_argument("--chunk-rows", type=int, default=1000)
+    parser.add_argument("--no-http", action="store_true")
+    sys.exit(main(parser.parse_args()))
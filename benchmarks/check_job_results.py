@@ -0,0 +1,107 @@
+"""Check that finished upload jobs keep only a summary, and /api/jobs/{id} still returns the insights.
+
+    python benchmarks/check_job_results.py --rows 20000
+
+Scenarios, through the app with a TestClient (datasets removed afterwards):
+- upload: a background upload's job result equals GET /api/insights for the file; the
+  job itself holds no more than the file version and the summary.
+- evicted: with the insights cache cleared, the job result is recomputed from the file
+  and is unchanged.
+- append: a background append's job result equals GET /api/insights after the append.
+- changed: once the file changes (here, by the append), the first job answers 409
+  instead of insights for a version it didn't produce.
+
+Prints the observations as JSON and exits 1 if any check fails.
+"""
+import argparse
+import json
+import sys
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+import main as app_main  # noqa: E402
+from config import UPLOAD_DIR  # noqa: E402
+from datagen import synthetic_csv  # noqa: E402
+from services.cache import _approx_size, insights_cache  # noqa: E402
+from services.jobs import job_queue  # noqa: E402
+from services.snapshot import remove_snapshot  # noqa: E402
+
+KEYS = ("summary", "students", "raw_analytics")
+
+
+def wait(client: TestClient, job_id: str, limit: float = 120) -> dict:
+    deadline = time.perf_counter() + limit
+    while time.perf_counter() < deadline:
+        state = client.get(f"/api/jobs/{job_id}", params={"result": False}).json()
+        if state["status"] in ("done", "failed"):
+            return state
+        time.sleep(0.05)
+    raise TimeoutError(f"job {job_id} still running after {limit}s")
+
+
+def main(args) -> int:
+    name = f"jobs-{uuid.uuid4().hex[:8]}.csv"
+    target = UPLOAD_DIR / name
+    failures, out = [], {}
+
+    def check(scenario, ok, detail):
+        if not ok:
+            failures.append(f"{scenario}: {detail}")
+
+    def submit(client, body: bytes, mode: str = "replace") -> str:
+        r = client.post("/api/upload", params={"background": True, "mode": mode, "dataset": name},
+                        files={"file": (name, body, "text/csv")})
+        r.raise_for_status()
+        state = wait(client, r.json()["job_id"])
+        check(mode, state["status"] == "done", state["error"])
+        return state["job_id"]
+
+    def compare(client, scenario: str, job_id: str) -> None:
+        got = client.get(f"/api/jobs/{job_id}")
+        ref = client.get("/api/insights", params={"csv_path": str(target)})
+        check(scenario, got.status_code == 200, f"job GET returned {got.status_code}: {got.text[:200]}")
+        if got.status_code == 200:
+            result = got.json()["result"]
+            check(scenario, all(result[k] == ref.json()[k] for k in KEYS), "job result differs from /api/insights")
+
+    try:
+        with TestClient(app_main.app, raise_server_exceptions=False) as client:
+            # upload
+            job_id = submit(client, synthetic_csv(args.rows, seed=0))
+            kept = job_queue.get(job_id).result
+            out["upload"] = {"kept_keys": sorted(kept), "kept_bytes": _approx_size(kept),
+                             "insights_bytes": _approx_size(insights_cache.get(kept.get("fingerprint")))}
+            check("upload", sorted(kept) == ["csv_path", "fingerprint", "summary"], f"job keeps {sorted(kept)}")
+            check("upload", out["upload"]["kept_bytes"] < 16_384, f"job keeps {out['upload']['kept_bytes']} bytes")
+            compare(client, "upload", job_id)
+
+            # evicted
+            insights_cache.invalidate(target)
+            compare(client, "evicted", job_id)
+
+            # append
+            delta = synthetic_csv(max(args.rows // 10, 10), seed=1)
+            append_id = submit(client, delta, mode="append")
+            compare(client, "append", append_id)
+
+            # changed
+            stale = client.get(f"/api/jobs/{job_id}")
+            out["changed"] = {"status": stale.status_code}
+            check("changed", stale.status_code == 409, f"job of a replaced version answered {stale.status_code}")
+    finally:
+        target.unlink(missing_ok=True)
+        remove_snapshot(target)
+    out["failures"] = failures
+    print(json.dumps(out, indent=2))
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20_000)
+    sys.exit(main(parser.parse_args()))
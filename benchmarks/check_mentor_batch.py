@@ -0,0 +1,261 @@
+"""Check class-wide mentor reports against a local fake LLM server (no API key needed).
+
+    python benchmarks/check_mentor_batch.py
+
+A ThreadingHTTPServer on 127.0.0.1 plays the model: it answers each prompt after
+--latency seconds with one "### STUDENT <id>" section per student asked for. The
+mentor client is pointed at it through a stand-in for google.generativeai whose
+generate_content POSTs the prompt there.
+
+Scenarios:
+- run: every student gets a report, in ceil(students / batch size) requests; an
+  oversized batch_size is clamped to MENTOR_BATCH_MAX_SIZE.
+- event_loop: with progress writes made slow, the event loop keeps ticking (the
+  progress file is written from an executor, not on the loop).
+- resume: posting the same dataset again finishes from the progress file, with no requests.
+- history: only MENTOR_BATCH_HISTORY finished jobs stay registered.
+- download: GET .../report while the job runs (several at once) serves complete CSVs
+  from files of their own, deleted once sent; once the job is done it serves
+  report_file itself, and no temporary files are left behind.
+
+Progress and report files go to a temporary directory. Prints the observations as
+JSON and exits 1 if any check fails.
+"""
+import argparse
+import asyncio
+import csv
+import json
+import math
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import main as app_main  # noqa: E402
+from services import mentor_batch  # noqa: E402
+from services.ai_mentor import mentor_client  # noqa: E402
+
+_STUDENT = re.compile(r"^### STUDENT (\S+)$", re.M)
+
+
+class FakeLLMServer(ThreadingHTTPServer):
+    """POST / with a prompt; replies with a report per "### STUDENT <id>" block in it."""
+
+    daemon_threads = True
+
+    def __init__(self, latency: float):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.latency = latency
+        self.requests = 0
+        self.batch_sizes: list[int] = []
+        self._lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_POST(self):  # noqa: N802 (http.server naming)
+        prompt = self.rfile.read(int(self.headers["Content-Length"])).decode("utf-8")
+        ids = _STUDENT.findall(prompt)
+        with self.server._lock:
+            self.server.requests += 1
+            self.server.batch_sizes.append(len(ids))
+        time.sleep(self.server.latency)
+        if ids:
+            text = "\n\n".join(f"### STUDENT {sid}\nKeep going, {sid}: focus on one subject a week." for sid in ids)
+        else:
+            text = "Keep going: focus on one subject a week."
+        body = text.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class HttpGemini:
+    """Stands in for the google.generativeai module, sending every prompt to a FakeLLMServer."""
+
+    def __init__(self, url: str):
+        self.url = url
+
+    def configure(self, **kwargs):
+        pass
+
+    def list_models(self):
+        return [SimpleNamespace(name="models/fake-model", supported_generation_methods=["generateContent"])]
+
+    def GenerativeModel(self, name):  # noqa: N802 (mirrors the SDK)
+        return SimpleNamespace(generate_content=self.generate_content)
+
+    def generate_content(self, prompt, stream=False):
+        req = urllib.request.Request(self.url, data=prompt.encode("utf-8"), method="POST")
+        with urllib.request.urlopen(req, timeout=30) as r:
+            return SimpleNamespace(text=r.read().decode("utf-8"))
+
+
+def install(fake: HttpGemini) -> None:
+    mentor_client.api_key = "fake"
+    mentor_client._genai = fake
+    mentor_client._available = ["fake-model"]
+    mentor_client._model_name = "fake-model"
+
+
+def students(n: int, prefix: str = "S") -> list[dict]:
+    return [
+        {"student_id": f"{prefix}{i:04d}", "name": f"Student {i}", "avg_marks": 48.0 + i % 10,
+         "attendance_avg": 70.0, "academic_health": 56.8, "weak_subjects": ["Math"],
+         "subject_marks": [{"subject": "Math", "marks": 45.0}], "risk_flags": ["Needs academic attention"]}
+        for i in range(n)
+    ]
+
+
+class SlowJson:
+    """mentor_batch's json module with a slow dumps(), standing in for a slow disk."""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+
+    def dumps(self, *args, **kwargs):
+        time.sleep(self.delay)
+        return json.dumps(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(json, name)
+
+
+async def finish(job, limit: float = 60) -> None:
+    await asyncio.wait_for(job.task, timeout=limit)
+
+
+async def scenarios(server: FakeLLMServer, args, failures: list) -> dict:
+    def check(name, ok, detail):
+        if not ok:
+            failures.append(f"{name}: {detail}")
+
+    out = {}
+    limit = getattr(mentor_batch, "MENTOR_BATCH_MAX_SIZE", 20)
+
+    # run
+    class_list = students(args.students)
+    job = mentor_batch.start_batch(("run", 1), "run.csv", class_list, "n/a", batch_size=10_000)
+    await finish(job)
+    state = job.state()
+    with open(job.report_file, encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    out["run"] = {"state": {k: state[k] for k in ("status", "completed", "requests", "batch_size")},
+                  "server_requests": server.requests, "largest_batch": max(server.batch_sizes)}
+    check("run", state["status"] == "done" and state["completed"] == args.students, state)
+    check("run", state["batch_size"] == limit, f"batch_size not clamped to {limit}: {state['batch_size']}")
+    check("run", max(server.batch_sizes) <= limit, f"a request carried {max(server.batch_sizes)} students")
+    check("run", server.requests == math.ceil(args.students / limit), f"{server.requests} requests")
+    check("run", len(rows) == args.students, f"report has {len(rows)} rows")
+
+    # event_loop
+    lags: list[float] = []
+    stop = asyncio.Event()
+
+    async def ticker():
+        while not stop.is_set():
+            t = time.perf_counter()
+            await asyncio.sleep(0.01)
+            lags.append(time.perf_counter() - t - 0.01)
+
+    tick = asyncio.create_task(ticker())
+    real_json = mentor_batch.json
+    mentor_batch.json = SlowJson(0.05)  # per progress line
+    try:
+        job = mentor_batch.start_batch(("slow", 1), "slow.csv", students(40, "L"), "n/a", batch_size=20)
+        await finish(job)
+    finally:
+        mentor_batch.json = real_json
+        stop.set()
+        await tick
+    out["event_loop"] = {"status": job.status, "max_lag_ms": round(max(lags) * 1000, 1)}
+    check("event_loop", job.status == "done", job.state())
+    check("event_loop", max(lags) < 0.25, f"event loop stalled {max(lags) * 1000:.0f} ms while writing progress")
+
+    # resume
+    before = server.requests
+    job = mentor_batch.start_batch(("run", 1), "run.csv", class_list, "n/a")
+    await finish(job)
+    state = job.state()
+    out["resume"] = {"resumed": state["resumed"], "requests": server.requests - before}
+    check("resume", state["resumed"] == args.students and server.requests == before, out["resume"])
+
+    # history
+    keep = mentor_batch.MENTOR_BATCH_HISTORY
+    for i in range(keep + 5):
+        await finish(mentor_batch.start_batch(("history", i), "h.csv", students(1, f"H{i}-"), "n/a"))
+    running = mentor_batch.start_batch(("history", "last"), "h.csv", students(3, "HL"), "n/a")
+    registered = len(mentor_batch._JOBS)
+    await finish(running)
+    out["history"] = {"kept": keep, "registered": registered}
+    check("history", registered <= keep + 1, f"{registered} jobs registered, history {keep}")
+    check("history", mentor_batch.get_batch(running.job_id) is running, "newest job evicted")
+
+    # download
+    job = mentor_batch.start_batch(("download", 1), "dl.csv", students(60, "D"), "n/a", batch_size=5)
+    served, sizes = set(), []
+    while not job.task.done():
+        for r in await asyncio.gather(*(app_main.api_mentor_batch_report(job.job_id) for _ in range(4))):
+            with open(r.path, encoding="utf-8", newline="") as f:
+                rows = list(csv.DictReader(f))
+            served.add(str(r.path))
+            sizes.append(len(rows))
+            check("download", len({row["student_id"] for row in rows}) == len(rows), "duplicate rows in a partial report")
+            if r.background is not None:
+                await r.background()
+        await asyncio.sleep(0.01)
+    await finish(job)
+    final = await app_main.api_mentor_batch_report(job.job_id)
+    with open(final.path, encoding="utf-8", newline="") as f:
+        final_rows = list(csv.DictReader(f))
+    leftovers = sorted(p.name for p in mentor_batch.MENTOR_BATCH_DIR.iterdir() if p.suffix == ".tmp" or p.name in
+                       {Path(x).name for x in served})
+    out["download"] = {"partial_downloads": len(sizes), "largest_partial": max(sizes, default=0),
+                       "final_rows": len(final_rows), "leftovers": leftovers}
+    check("download", sizes and str(job.report_file) not in served, "running job served report_file (or no downloads made)")
+    check("download", len(served) == len(sizes), "two downloads shared a file")
+    check("download", Path(final.path) == job.report_file and final.background is None, "finished job not served from report_file")
+    check("download", len(final_rows) == 60, f"final report has {len(final_rows)} rows")
+    check("download", not leftovers, f"left behind {leftovers}")
+    return out
+
+
+def main(args) -> int:
+    workdir = Path(tempfile.mkdtemp(prefix="mentor-batch-"))
+    mentor_batch.MENTOR_BATCH_DIR = workdir
+    mentor_batch.MENTOR_BATCH_HISTORY = 5
+    server = FakeLLMServer(args.latency)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    install(HttpGemini(server.url))
+    failures: list = []
+    try:
+        report = asyncio.run(scenarios(server, args, failures))
+    finally:
+        server.shutdown()
+        shutil.rmtree(workdir, ignore_errors=True)
+    report["failures"] = failures
+    print(json.dumps(report, indent=2))
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--students", type=int, default=45)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds per fake LLM request")
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,203 @@
+"""Check the mentor pool against a fake Gemini with configurable latency (no API key needed).
+
+    python benchmarks/check_mentor_pool.py
+
+Scenarios:
+- bound: 3x MENTOR_MAX_CONCURRENCY calls never run more than the limit at once.
+- timeout: calls abandoned on timeout keep their slot until the worker returns; the
+  next call waits in "waiting" (not inside the executor), so its own timeout only
+  starts once it has a thread, and timeouts are not counted as completed.
+- stream: a streamed reply that times out frees its slot when the producer stops.
+- refresh: refresh_loop retries a failed SDK set-up with backoff (through the mentor
+  pool) until it succeeds, refreshes at once after a 404, and otherwise stays idle.
+
+Prints the observations as JSON and exits 1 if any check fails.
+"""
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+os.environ.setdefault("MENTOR_MAX_CONCURRENCY", "2")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from services import ai_mentor  # noqa: E402
+from services.ai_mentor import MentorClient, mentor_client  # noqa: E402
+
+LIMIT = ai_mentor.MENTOR_MAX_CONCURRENCY
+COUNTERS = ("in_flight", "waiting", "abandoned", "timeouts", "completed")
+INSIGHTS = {"summary": {"total_students": 0, "attendance_marks_correlation": "n/a"}, "students": []}
+
+
+class FakeGemini:
+    """Stands in for the google.generativeai module: every call sleeps `latency` seconds."""
+
+    def __init__(self, latency: float = 0.1):
+        self.latency = latency
+        self.active = 0
+        self.max_active = 0
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def configure(self, **kwargs):
+        pass
+
+    def list_models(self):
+        return [SimpleNamespace(name="models/fake-model", supported_generation_methods=["generateContent"])]
+
+    def GenerativeModel(self, name):  # noqa: N802 (mirrors the SDK)
+        return SimpleNamespace(generate_content=self.generate_content)
+
+    def _work(self, latency: float):
+        with self._lock:
+            self.calls += 1
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            time.sleep(latency)
+        finally:
+            with self._lock:
+                self.active -= 1
+
+    def generate_content(self, prompt, stream=False):
+        latency = self.latency
+        if not stream:
+            self._work(latency)
+            return SimpleNamespace(text="fake reply")
+
+        def chunks():
+            for i in range(3):
+                self._work(latency)
+                yield SimpleNamespace(text=f"part {i} ")
+        return chunks()
+
+
+def install(fake: FakeGemini) -> None:
+    mentor_client.api_key = "fake"
+    mentor_client._genai = fake
+    mentor_client._available = ["fake-model"]
+    mentor_client._model_name = "fake-model"
+
+
+def mentor_stats() -> dict:
+    stats = ai_mentor.mentor_stats()
+    return {k: stats.get(k) for k in COUNTERS + ("max_waiting",)}
+
+
+async def wait_until(cond, limit: float = 5.0) -> bool:
+    deadline = time.monotonic() + limit
+    while time.monotonic() < deadline:
+        if cond():
+            return True
+        await asyncio.sleep(0.01)
+    return cond()
+
+
+async def scenarios(fake: FakeGemini, failures: list) -> dict:
+    def check(name, ok, detail):
+        if not ok:
+            failures.append(f"{name}: {detail}")
+
+    out = {}
+    ask = ai_mentor.get_mentor_response_async
+
+    # bound
+    fake.latency = 0.2
+    t = time.perf_counter()
+    replies = await asyncio.gather(*(ask(INSIGHTS, f"bound {i}", timeout=5) for i in range(3 * LIMIT)))
+    stats = mentor_stats()
+    out["bound"] = {"seconds": round(time.perf_counter() - t, 3), "max_active": fake.max_active,
+                    "max_waiting": stats["max_waiting"], "completed": stats["completed"]}
+    check("bound", fake.max_active == LIMIT, f"{fake.max_active} concurrent calls, limit {LIMIT}")
+    check("bound", all(r == "fake reply" for r in replies), replies)
+    check("bound", stats["completed"] == 3 * LIMIT and stats["in_flight"] == 0, stats)
+
+    # timeout
+    base = mentor_stats()
+    fake.latency = 0.6
+    replies = await asyncio.gather(*(ask(INSIGHTS, f"slow {i}", timeout=0.1) for i in range(LIMIT)))
+    after_timeout = mentor_stats()
+    check("timeout", all(r.startswith("AI error") for r in replies), replies)
+    check("timeout", after_timeout["in_flight"] == LIMIT and after_timeout["abandoned"] == LIMIT,
+          f"abandoned workers not counted: {after_timeout}")
+    fake.latency = 0.05
+    t = time.perf_counter()
+    follow = asyncio.create_task(ask(INSIGHTS, "after timeout", timeout=0.3))
+    queued = await wait_until(lambda: mentor_stats()["waiting"] == 1, limit=0.3)
+    reply = await follow
+    end = mentor_stats()
+    out["timeout"] = {"follow_up_seconds": round(time.perf_counter() - t, 3), "follow_up_reply": reply,
+                      "queued_visibly": queued, "after_timeout": after_timeout}
+    check("timeout", queued, "follow-up call was not visible in 'waiting'")
+    check("timeout", reply == "fake reply", f"follow-up call failed: {reply}")
+    check("timeout", end["timeouts"] - base["timeouts"] == LIMIT, end)
+    check("timeout", end["completed"] - base["completed"] == 1, f"timeouts counted as completed: {end}")
+    check("timeout", end["in_flight"] == 0 and end["abandoned"] == 0, end)
+
+    # stream
+    fake.latency = 0.3
+    pieces = [p async for p in ai_mentor.stream_mentor_response_async(INSIGHTS, "stream", timeout=0.1)]
+    held = mentor_stats()["in_flight"]
+    released = await wait_until(lambda: mentor_stats()["in_flight"] == 0)
+    out["stream"] = {"pieces": pieces, "in_flight_after_timeout": held}
+    check("stream", pieces and pieces[-1].startswith("AI error"), pieces)
+    check("stream", held == 1, "slot released while the producer was still running")
+    check("stream", released, "slot never released after the producer stopped")
+
+    # refresh
+    ai_mentor.MENTOR_INIT_RETRY = 0.05
+    client = MentorClient(api_key="fake", refresh_interval=60)
+    saved = {k: sys.modules.get(k) for k in ("google", "google.generativeai")}
+    sys.modules["google.generativeai"] = None  # import fails, as without the SDK installed
+    loop_task = None
+    try:
+        client.start()
+        first_error = client.init_error
+        base = mentor_stats()
+        loop_task = asyncio.create_task(client.refresh_loop())
+        retried = await wait_until(lambda: getattr(client, "init_failures", 0) >= 3, limit=2)
+        sys.modules["google"] = SimpleNamespace(generativeai=fake)
+        sys.modules["google.generativeai"] = fake
+        recovered = await wait_until(lambda: client.state()["ready"] and client.refreshes == 1, limit=5)
+        calls = mentor_stats()["completed"] - base["completed"]
+        await asyncio.sleep(0.3)
+        idle = client.refreshes == 1
+        t = time.perf_counter()
+        threading.Thread(target=client.mark_unavailable, args=("fake-model",)).start()
+        prompt = await wait_until(lambda: client.refreshes == 2, limit=2)
+        out["refresh"] = {"first_error": first_error, "recovered": recovered, "pool_calls": calls,
+                          "refresh_after_404_seconds": round(time.perf_counter() - t, 3), "state": client.state()}
+        check("refresh", first_error and retried, f"failed set-up was not retried: {client.state()}")
+        check("refresh", recovered and client.init_error is None, f"never recovered: {client.state()}")
+        # the first failure was the direct start(); at least two failed retries and the good one follow
+        check("refresh", calls >= 3, f"retries did not go through the mentor pool ({calls} calls)")
+        check("refresh", idle, "refreshed without a 404 or the interval passing")
+        check("refresh", prompt, "404 did not wake the refresh loop")
+    finally:
+        if loop_task is not None:
+            loop_task.cancel()
+        for k, v in saved.items():
+            if v is None:
+                sys.modules.pop(k, None)
+            else:
+                sys.modules[k] = v
+    return out
+
+
+def main() -> int:
+    fake = FakeGemini()
+    install(fake)
+    failures: list = []
+    report = asyncio.run(scenarios(fake, failures))
+    report["limit"] = LIMIT
+    report["failures"] = failures
+    print(json.dumps(report, indent=2))
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
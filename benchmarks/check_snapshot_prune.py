@@ -0,0 +1,99 @@
+"""Check that dataset snapshots and saved analytics state don't pile up in SNAPSHOT_DIR.
+
+    python benchmarks/check_snapshot_prune.py
+
+Scenarios, in a temporary upload directory:
+- replace: uploading over a file removes its snapshot and saved state.
+- orphan: the snapshot of a CSV that was deleted goes at the next snapshot write.
+- stale_tmp: a .tmp-<pid> directory older than STALE_TMP_SECONDS goes too.
+- lru: over max_bytes, the least recently read snapshots are removed first (with
+  their saved state); the one just written is kept.
+
+Prints the observations as JSON and exits 1 if any check fails.
+"""
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from datagen import synthetic_csv  # noqa: E402
+from services import ingestion, snapshot  # noqa: E402
+
+
+def names(directory: Path) -> list[str]:
+    return sorted(p.name for p in directory.iterdir()) if directory.exists() else []
+
+
+def main() -> int:
+    workdir = Path(tempfile.mkdtemp(prefix="snapshots-"))
+    ingestion.UPLOAD_DIR = workdir
+    snapshot.SNAPSHOT_DIR = workdir / ".snapshots"
+    failures, out = [], {}
+
+    def check(name, ok, detail):
+        if not ok:
+            failures.append(f"{name}: {detail}")
+
+    def upload(name: str, seed: int = 0) -> Path:
+        return ingestion.save_upload(synthetic_csv(200, seed=seed), name)
+
+    try:
+        # replace
+        a = upload("a.csv")
+        ingestion.load_dataset(a)
+        snapshot.write_state({"version": 0}, a)
+        before = names(snapshot.SNAPSHOT_DIR)
+        upload("a.csv", seed=1)
+        out["replace"] = {"before": before, "after": names(snapshot.SNAPSHOT_DIR)}
+        check("replace", len(before) == 2, f"expected a snapshot and a state file, got {before}")
+        check("replace", out["replace"]["after"] == [], f"left behind {out['replace']['after']}")
+
+        # orphan and stale_tmp
+        b = upload("b.csv")
+        ingestion.load_dataset(b)
+        b.unlink()
+        tmp = snapshot.SNAPSHOT_DIR / "x-000000000000.tmp-1"
+        tmp.mkdir()
+        old = time.time() - snapshot.STALE_TMP_SECONDS - 60
+        os.utime(tmp, (old, old))
+        c = upload("c.csv")
+        ingestion.load_dataset(c)
+        left = names(snapshot.SNAPSHOT_DIR)
+        out["orphan"] = left
+        check("orphan", snapshot.snapshot_path(b).name not in left, f"snapshot of deleted b.csv kept: {left}")
+        check("orphan", snapshot.snapshot_path(c).name in left, f"snapshot of c.csv missing: {left}")
+        check("stale_tmp", tmp.name not in left, f"stale {tmp.name} kept")
+
+        # lru
+        d, e = upload("d.csv", seed=2), upload("e.csv", seed=3)
+        for p in (d, e):
+            ingestion.load_dataset(p)
+            snapshot.write_state({"version": 0}, p)
+            time.sleep(0.02)
+        ingestion.load_dataset(c)  # read: c becomes the most recently used
+        time.sleep(0.02)
+        f = upload("f.csv", seed=4)
+        ingestion.load_dataset(f)
+        keep = snapshot.snapshot_path(f)
+        budget = snapshot._footprint(keep) + snapshot._footprint(snapshot.snapshot_path(c))
+        removed = snapshot.prune_snapshots(keep=keep, max_bytes=budget)
+        left = names(snapshot.SNAPSHOT_DIR)
+        out["lru"] = {"removed": sorted(p.name for p in removed), "left": left}
+        expected = {snapshot.snapshot_path(d).name, snapshot.snapshot_path(e).name}
+        check("lru", set(out["lru"]["removed"]) == expected, f"removed {out['lru']['removed']}, expected {sorted(expected)}")
+        check("lru", not any(n.endswith((".state.json", ".state.log")) for n in left), f"saved state left behind: {left}")
+        check("lru", {keep.name, snapshot.snapshot_path(c).name} <= set(left), f"kept {left}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    out["failures"] = failures
+    print(json.dumps(out, indent=2))
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,141 @@
+"""Synthetic student CSVs for benchmarks: configurable size, nulls, messy headers, encodings, delimiters.
+
+    python benchmarks/datagen.py out.csv --rows 1000000 --subjects 8 --semesters 2 \
+        --null-rate 0.02 --dirty-header-rate 0.5 --encoding latin-1 --delimiter ';'
+
+Each student takes every subject every semester, so rows = students * subjects * semesters
+(--rows picks the student count and trims the last one's rows). Output is deterministic per seed.
+"""
+import argparse
+import io
+import math
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+SUBJECTS = [
+    "Mathematics", "Physics", "Chemistry", "English", "Biology", "History",
+    "Geography", "Computer Science", "Economics", "Art",
+]
+FIRST_NAMES = ["Rahul", "Priya", "Amit", "Neha", "Vikram", "Ana", "José", "Zoë", "Chloé", "Mateo", "Björn", "Aisha"]
+LAST_NAMES = ["Sharma", "Patel", "Kumar", "Singh", "Reddy", "García", "Müller", "Nguyen", "O'Brien", "Lefèvre"]
+GRADES = ["A+", "A", "B+", "B", "C", "D", "F"]
+ENCODINGS = ("utf-8", "utf-8-sig", "latin-1", "utf-16")
+DELIMITERS = {",": ",", ";": ";", "tab": "\t", "\t": "\t"}
+
+# Header variants ingestion maps back to the canonical names (see COLUMN_ALIASES)
+DIRTY_HEADERS = {
+    "student_id": ["Student ID", "StudentID", " student id "],
+    "name": ["Student Name", "NAME", "Name "],
+    "subject": ["Course", "Subject", " SUBJECTS"],
+    "marks": ["Score", "Total Marks", "MARKS"],
+    "attendance_pct": ["Attendance %", "Attendance", "attendance_percentage"],
+    "grade": ["Letter Grade", "Grade", "GRADES"],
+    "semester": ["Term", "Sem", "SEMESTER"],
+}
+NULLABLE_COLUMNS = ["name", "marks", "attendance_pct", "grade"]
+
+
+def synthetic_frame(
+    students: int = 100,
+    subjects: int = 6,
+    semesters: int = 1,
+    rows: Optional[int] = None,
+    null_rate: float = 0.0,
+    dirty_header_rate: float = 0.0,
+    seed: int = 0,
+) -> pd.DataFrame:
+    """Student-by-subject-by-semester rows with correlated marks and attendance.
+
+    rows, if given, overrides students. null_rate blanks that fraction of cells in
+    NULLABLE_COLUMNS; dirty_header_rate renames that fraction of headers to aliases.
+    """
+    rng = np.random.default_rng(seed)
+    subject_names = [SUBJECTS[i] if i < len(SUBJECTS) else f"Subject {i + 1}" for i in range(subjects)]
+    per_student = subjects * semesters
+    if rows is not None:
+        students = max(1, math.ceil(rows / per_student))
+    n = students * per_student
+
+    student = np.repeat(np.arange(students), per_student)
+    # Each student has an ability and a habit; marks follow attendance plus noise
+    ability = rng.normal(65, 12, students)
+    habit = np.clip(rng.normal(82, 10, students), 30, 100)
+    attendance = np.clip(habit[student] + rng.normal(0, 5, n), 0, 100).round(1)
+    marks = np.clip(ability[student] + 0.4 * (attendance - 80) + rng.normal(0, 10, n), 0, 100).round()
+    grade_idx = np.clip(((100 - marks) // 10).astype(int) - 1, 0, len(GRADES) - 1)
+    first = rng.integers(0, len(FIRST_NAMES), students)
+    last = rng.integers(0, len(LAST_NAMES), students)
+    names = np.array([f"{FIRST_NAMES[f]} {LAST_NAMES[l]}" for f, l in zip(first, last)], dtype=object)
+
+    df = pd.DataFrame({
+        "student_id": np.char.add("S", np.char.zfill(student.astype(str), 6)),
+        "name": names[student],
+        "subject": np.tile(np.repeat(np.array(subject_names, dtype=object), semesters), students),
+        "marks": marks,
+        "attendance_pct": attendance,
+        "grade": np.array(GRADES, dtype=object)[grade_idx],
+        "semester": np.tile(np.arange(1, semesters + 1), students * subjects),
+    })
+    if rows is not None:
+        df = df.iloc[:rows]
+    if null_rate > 0:
+        for col in NULLABLE_COLUMNS:
+            df[col] = df[col].mask(rng.random(len(df)) < null_rate)
+    if dirty_header_rate > 0:
+        df = df.rename(columns={
+            c: DIRTY_HEADERS[c][rng.integers(len(DIRTY_HEADERS[c]))]
+            for c in df.columns
+            if rng.random() < dirty_header_rate
+        })
+    return df
+
+
+def write_csv(df: pd.DataFrame, path: Path, encoding: str = "utf-8", delimiter: str = ",") -> Path:
+    """Write df as a CSV the way a spreadsheet export would (latin-1 falls back to '?' for odd characters)."""
+    if encoding not in ENCODINGS:
+        raise ValueError(f"encoding must be one of {list(ENCODINGS)}")
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding=encoding, errors="replace", newline="") as f:
+        df.to_csv(f, index=False, sep=DELIMITERS.get(delimiter, delimiter), lineterminator="\n")
+    return path
+
+
+def synthetic_csv(rows: int, seed: int = 0, **kwargs) -> bytes:
+    """UTF-8 CSV bytes of synthetic_frame(rows=rows) (for uploads in load tests)."""
+    out = io.StringIO()
+    synthetic_frame(rows=rows, seed=seed, **kwargs).to_csv(out, index=False, lineterminator="\n")
+    return out.getvalue().encode("utf-8")
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("out", type=Path)
+    parser.add_argument("--rows", type=int, default=None, help="total rows (overrides --students)")
+    parser.add_argument("--students", type=int, default=100)
+    parser.add_argument("--subjects", type=int, default=6)
+    parser.add_argument("--semesters", type=int, default=1)
+    parser.add_argument("--null-rate", type=float, default=0.0)
+    parser.add_argument("--dirty-header-rate", type=float, default=0.0)
+    parser.add_argument("--encoding", choices=ENCODINGS, default="utf-8")
+    parser.add_argument("--delimiter", choices=sorted(DELIMITERS), default=",")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    df = synthetic_frame(
+        students=args.students,
+        subjects=args.subjects,
+        semesters=args.semesters,
+        rows=args.rows,
+        null_rate=args.null_rate,
+        dirty_header_rate=args.dirty_header_rate,
+        seed=args.seed,
+    )
+    write_csv(df, args.out, encoding=args.encoding, delimiter=args.delimiter)
+    print(f"{args.out}: {len(df)} rows, {args.out.stat().st_size} bytes")
+
+
+if __name__ == "__main__":
+    main()
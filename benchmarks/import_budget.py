@@ -0,0 +1,79 @@
+"""Cold-start check: how long `import main` takes, and that heavy modules stay unloaded.
+
+    python benchmarks/import_budget.py --budget-ms 1500
+
+Runs `python -X importtime -c "import main"` in fresh interpreters (best of --runs), prints
+the cumulative import time and the slowest top-level imports, and exits 1 when the time is
+over --budget-ms or a module listed in FORBIDDEN (loaded on first use or during start-up
+warm-up instead) is imported eagerly. Suitable for CI next to bench_pipeline --compare.
+"""
+import argparse
+import json
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+FORBIDDEN = ("pandas", "numpy", "scipy", "google.generativeai")
+_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)$")
+
+
+def import_profile(module: str = "main") -> dict[str, dict]:
+    """{module: {"self_us", "cumulative_us", "depth"}} from one -X importtime run."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+    profile = {}
+    for line in proc.stderr.splitlines():
+        m = _LINE.match(line)
+        if m:
+            self_us, cumulative_us, indent, name = m.groups()
+            profile[name] = {
+                "self_us": int(self_us),
+                "cumulative_us": int(cumulative_us),
+                "depth": (len(indent) - 1) // 2,
+            }
+    return profile
+
+
+def main(args) -> int:
+    runs = [import_profile(args.module) for _ in range(args.runs)]
+    best = min(runs, key=lambda p: p[args.module]["cumulative_us"])
+    total_ms = best[args.module]["cumulative_us"] / 1000
+    depth = best[args.module]["depth"] + 1  # modules imported directly by the target
+    top = sorted(
+        ((name, p["cumulative_us"]) for name, p in best.items() if p["depth"] == depth),
+        key=lambda item: item[1], reverse=True,
+    )[: args.top]
+    eager = sorted(
+        name for name in best if any(name == f or name.startswith(f + ".") for f in FORBIDDEN)
+    )
+    report = {
+        "module": args.module,
+        "import_ms": round(total_ms, 1),
+        "budget_ms": args.budget_ms,
+        "top_imports_ms": {name: round(us / 1000, 1) for name, us in top},
+        "eager_forbidden": eager,
+    }
+    print(json.dumps(report, indent=2))
+    failed = False
+    if total_ms > args.budget_ms:
+        print(f"FAIL: import {args.module} took {total_ms:.0f} ms (budget {args.budget_ms:.0f} ms)", file=sys.stderr)
+        failed = True
+    if eager:
+        print(f"FAIL: imported at startup: {', '.join(eager)}", file=sys.stderr)
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--budget-ms", type=float, default=1500)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=10)
+    sys.exit(main(parser.parse_args()))
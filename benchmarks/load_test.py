@@ -0,0 +1,108 @@
+"""Load test: latency of cheap endpoints while heavy analyses run.
+
+Start the server first (uvicorn main:app), then:
+
+    python benchmarks/load_test.py --url http://127.0.0.1:8000 --rows 200000 --heavy 4
+
+Phase 1 measures cheap requests alone; phase 2 repeats them while --heavy clients keep
+uploading CSVs. Each client re-uploads under its own fixed name (loadtest-<n>.csv), so
+a run leaves at most --heavy datasets (and snapshots) on the server, overwritten by the
+next run; replacing the file changes its fingerprint, so every upload is still a cache
+miss that runs the full pipeline. Analytics run off the event loop, so cheap requests
+are never queued behind a whole upload; they still wait out the longest single
+GIL-holding call in a worker, plus CPU sharing when client and server share cores.
+Expect p99 and max above the baseline by a few hundred ms, not by the seconds an
+upload takes.
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+
+from datagen import synthetic_csv
+
+CHEAP_PATHS = ("/api/cache/stats", "/api/analytics/stats", "/static/index.html")
+
+
+def percentiles(samples: list[float]) -> dict[str, float]:
+    if not samples:
+        return {}
+    s = sorted(samples)
+
+    def pct(q: float) -> float:
+        return round(s[min(len(s) - 1, int(q * len(s)))] * 1000, 2)
+
+    return {"count": len(s), "p50_ms": pct(0.50), "p95_ms": pct(0.95), "p99_ms": pct(0.99), "max_ms": pct(1.0)}
+
+
+async def cheap_load(client: httpx.AsyncClient, duration: float, concurrency: int) -> list[float]:
+    latencies: list[float] = []
+    deadline = time.perf_counter() + duration
+
+    async def one_client(n: int):
+        i = n
+        while time.perf_counter() < deadline:
+            path = CHEAP_PATHS[i % len(CHEAP_PATHS)]
+            i += 1
+            t = time.perf_counter()
+            r = await client.get(path)
+            latencies.append(time.perf_counter() - t)
+            r.raise_for_status()
+
+    await asyncio.gather(*(one_client(n) for n in range(concurrency)))
+    return latencies
+
+
+async def heavy_load(client: httpx.AsyncClient, n: int, stop: asyncio.Event, payloads: list[bytes], counts: dict):
+    i = 0
+    while not stop.is_set():
+        body = payloads[i % len(payloads)]
+        i += 1
+        t = time.perf_counter()
+        r = await client.post(
+            "/api/upload",
+            files={"file": (f"loadtest-{n}.csv", body, "text/csv")},
+        )
+        counts["seconds"].append(time.perf_counter() - t)
+        counts[r.status_code] = counts.get(r.status_code, 0) + 1
+        if r.status_code == 503:
+            await asyncio.sleep(float(r.headers.get("Retry-After", "1")))
+
+
+async def main(args) -> dict:
+    payloads = [synthetic_csv(args.rows, seed) for seed in range(args.heavy)]
+    timeout = httpx.Timeout(args.timeout)
+    async with httpx.AsyncClient(base_url=args.url, timeout=timeout) as client:
+        baseline = await cheap_load(client, args.duration, args.concurrency)
+
+        stop = asyncio.Event()
+        heavy_counts: dict = {"seconds": []}
+        heavy = [asyncio.create_task(heavy_load(client, n, stop, payloads, heavy_counts)) for n in range(args.heavy)]
+        await asyncio.sleep(0.5)  # let the uploads reach the analytics stage
+        loaded = await cheap_load(client, args.duration, args.concurrency)
+        stop.set()
+        await asyncio.gather(*heavy)
+        pool = (await client.get("/api/analytics/stats")).json()
+
+    return {
+        "rows_per_upload": args.rows,
+        "cheap_baseline": percentiles(baseline),
+        "cheap_under_load": percentiles(loaded),
+        "heavy_requests": {k: v for k, v in heavy_counts.items() if k != "seconds"},
+        "heavy_latency": percentiles(heavy_counts["seconds"]),
+        "analytics_pool": pool,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--rows", type=int, default=200_000, help="rows per uploaded CSV")
+    parser.add_argument("--heavy", type=int, default=4, help="concurrent upload clients")
+    parser.add_argument("--concurrency", type=int, default=8, help="concurrent cheap-request clients")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per phase")
+    parser.add_argument("--timeout", type=float, default=300.0)
+    report = asyncio.run(main(parser.parse_args()))
+    print(json.dumps(report, indent=2))
@@ -11,12 +11,77 @@ BASE_DIR = Path(__file__).resolve().parent
 DATA_DIR = BASE_DIR / "data"
 UPLOAD_DIR = DATA_DIR / "uploads"
 SAMPLE_CSV = DATA_DIR / "sample_students.csv"
-
-# Ensure directories exist
-DATA_DIR.mkdir(exist_ok=True)
-UPLOAD_DIR.mkdir(exist_ok=True)
+# Directories are created by whatever writes into them first, not at import
 
 # API
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "")
 API_HOST = os.getenv("API_HOST", "0.0.0.0")
 API_PORT = int(os.getenv("API_PORT", "8000"))
+
+# Insights cache (keyed by file path + mtime + size). Insights for 100k students
+# (600k rows) take about 270MB; a result larger than MAX_BYTES is not cached at all
+INSIGHTS_CACHE_MAX_ENTRIES = int(os.getenv("INSIGHTS_CACHE_MAX_ENTRIES", "16"))
+INSIGHTS_CACHE_MAX_BYTES = int(os.getenv("INSIGHTS_CACHE_MAX_BYTES", str(1024 * 1024 * 1024)))
+INSIGHTS_CACHE_TTL = float(os.getenv("INSIGHTS_CACHE_TTL", "0"))  # seconds, 0 = no expiry
+# /api/correlation results (small) get their own cache so they never evict insights
+CORRELATION_CACHE_MAX_ENTRIES = int(os.getenv("CORRELATION_CACHE_MAX_ENTRIES", "64"))
+
+# AI mentor: max concurrent Gemini calls and per-call timeout (seconds)
+MENTOR_MAX_CONCURRENCY = int(os.getenv("MENTOR_MAX_CONCURRENCY", "4"))
+MENTOR_TIMEOUT = float(os.getenv("MENTOR_TIMEOUT", "60"))
+# Seconds between background refreshes of the Gemini model list
+MENTOR_MODEL_REFRESH = float(os.getenv("MENTOR_MODEL_REFRESH", "3600"))
+# Seconds before retrying a failed Gemini set-up; doubles per failure, up to MENTOR_MODEL_REFRESH
+MENTOR_INIT_RETRY = float(os.getenv("MENTOR_INIT_RETRY", "5"))
+
+# Large CSVs: files at least this size are analysed in chunks of CSV_CHUNK_ROWS rows
+CHUNKED_INGEST_MIN_BYTES = int(os.getenv("CHUNKED_INGEST_MIN_BYTES", str(64 * 1024 * 1024)))
+CSV_CHUNK_ROWS = int(os.getenv("CSV_CHUNK_ROWS", "200000"))
+
+# Analytics off the event loop: worker threads, and jobs allowed to wait before requests get 503
+ANALYTICS_WORKERS = int(os.getenv("ANALYTICS_WORKERS", "2"))
+ANALYTICS_QUEUE = int(os.getenv("ANALYTICS_QUEUE", "8"))
+
+# Background upload jobs: worker threads, finished jobs kept for polling, max waiting jobs
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_HISTORY = int(os.getenv("JOB_HISTORY", "100"))
+JOB_QUEUE_MAX = int(os.getenv("JOB_QUEUE_MAX", "50"))
+
+# Multi-dataset analytics: worker processes (0 = one per CPU); files at least
+# PARALLEL_SHARD_MIN_BYTES are split across all workers
+PARALLEL_WORKERS = int(os.getenv("PARALLEL_WORKERS", "0")) or (os.cpu_count() or 1)
+PARALLEL_SHARD_MIN_BYTES = int(os.getenv("PARALLEL_SHARD_MIN_BYTES", str(32 * 1024 * 1024)))
+
+# Columnar snapshots of cleaned datasets (reused until the source CSV changes); the least
+# recently used are removed once all of them take more than SNAPSHOT_MAX_BYTES
+SNAPSHOT_DIR = UPLOAD_DIR / ".snapshots"
+DATASET_SNAPSHOTS = os.getenv("DATASET_SNAPSHOTS", "1").lower() not in ("0", "false", "no")
+SNAPSHOT_MAX_BYTES = int(os.getenv("SNAPSHOT_MAX_BYTES", str(2 * 1024**3)))
+
+# Mentor response cache; set MENTOR_CACHE_DB to a SQLite path to keep it across restarts
+MENTOR_CACHE_MAX_ENTRIES = int(os.getenv("MENTOR_CACHE_MAX_ENTRIES", "256"))
+MENTOR_CACHE_TTL = float(os.getenv("MENTOR_CACHE_TTL", str(24 * 3600)))  # seconds, 0 = no expiry
+MENTOR_CACHE_DB = os.getenv("MENTOR_CACHE_DB", "")
+
+# Class-wide mentor reports: students per LLM request (requests may ask for up to
+# MENTOR_BATCH_MAX_SIZE), parallel requests, finished jobs kept for polling, progress/report files
+MENTOR_BATCH_SIZE = int(os.getenv("MENTOR_BATCH_SIZE", "5"))
+MENTOR_BATCH_MAX_SIZE = int(os.getenv("MENTOR_BATCH_MAX_SIZE", "20"))
+MENTOR_BATCH_CONCURRENCY = int(os.getenv("MENTOR_BATCH_CONCURRENCY", "2"))
+MENTOR_BATCH_HISTORY = int(os.getenv("MENTOR_BATCH_HISTORY", "20"))
+MENTOR_BATCH_DIR = UPLOAD_DIR / ".mentor_batches"
+
+# Instrumentation: stage/request metrics at /metrics plus Server-Timing headers;
+# METRICS_TRACE_MEMORY adds tracemalloc allocation peaks (slows allocation-heavy stages)
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1").lower() not in ("0", "false", "no")
+METRICS_TRACE_MEMORY = os.getenv("METRICS_TRACE_MEMORY", "0").lower() not in ("0", "false", "no")
+
+# JSON responses: compress bodies of at least COMPRESS_MIN_BYTES when the client accepts
+# gzip (or br, with the brotli package); COMPRESS_LEVEL is the gzip level / brotli quality
+RESPONSE_COMPRESSION = os.getenv("RESPONSE_COMPRESSION", "1").lower() not in ("0", "false", "no")
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+COMPRESS_LEVEL = int(os.getenv("COMPRESS_LEVEL", "5"))
+
+# Startup: after the server starts, import the heavy modules and analyse the sample CSV
+# in the background; /api/ready answers 503 until that has finished
+STARTUP_WARMUP = os.getenv("STARTUP_WARMUP", "1").lower() not in ("0", "false", "no")
@@ -1,19 +1,104 @@
 """Backend API: request handling, data + AI integration."""
+import asyncio
+import json
+import threading
+import uuid
+from collections import defaultdict
+from contextlib import asynccontextmanager, nullcontext
 from pathlib import Path
 from typing import Optional
 
-from fastapi import FastAPI, UploadFile, File, HTTPException
-from fastapi.responses import HTMLResponse, FileResponse
+from fastapi import FastAPI, UploadFile, File, HTTPException, Query, Request
+from fastapi.responses import HTMLResponse, FileResponse, JSONResponse, PlainTextResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
+from starlette.background import BackgroundTask
 
-from config import SAMPLE_CSV
-from services.ingestion import load_csv, preprocess, save_upload
-from services.analytics import run_analytics
-from services.insights import build_insight_summary
-from services.ai_mentor import get_mentor_response, list_available_models
+from config import CHUNKED_INGEST_MIN_BYTES, METRICS_ENABLED, SAMPLE_CSV, STARTUP_WARMUP, UPLOAD_DIR
+from services.cache import analytics_states, correlation_cache, file_fingerprint, insight_indexes, insights_cache
+from services.ingestion import (
+    append_rows,
+    iter_csv_chunks,
+    load_csv,
+    load_dataset,
+    preprocess,
+    promote_upload,
+    save_upload_stream,
+    sniff_format,
+)
+from services.analytics import AnalyticsAccumulator, attendance_correlation, run_analytics, run_analytics_chunked
+from services.snapshot import append_state, read_state, state_source, write_state
+from services.insights import InsightIndex, build_insight_summary, patch_insight_summary
+from services.mentor_batch import get_batch, report_path, start_batch
+from services.jobs import Job, JobQueueFull, job_queue
+from services import metrics
+from services.offload import PoolSaturated, analytics_pool
+from services.parallel import analyze_many, get_pool, shutdown_pool
+from services.serialization import FastJSONResponse, etag_matches, json_response, make_etag, not_modified
+from services.warmup import warmup
+from services.ai_mentor import (
+    get_mentor_response_async,
+    list_available_models,
+    mentor_client,
+    mentor_stats,
+    run_mentor_call,
+    stream_mentor_response_async,
+)
 
-app = FastAPI(title="Student Performance Analysis", version="1.0.0")
+
+def _import_heavy_modules() -> None:
+    import numpy  # noqa: F401
+    import pandas  # noqa: F401  (services load both on first use)
+    from scipy import special  # noqa: F401  (correlation p-values)
+
+
+async def _start_mentor() -> None:
+    try:
+        await run_mentor_call(mentor_client.start)
+    except asyncio.TimeoutError:
+        pass  # slow network: the refresh loop keeps retrying
+
+
+def _warmup_steps() -> list:
+    loop = asyncio.get_running_loop()
+    steps = [("imports", lambda: loop.run_in_executor(None, _import_heavy_modules), True)]
+    if SAMPLE_CSV.exists():
+        steps.append(("sample_insights", lambda: _get_insights(SAMPLE_CSV), True))
+    if mentor_client.configured:
+        # Not required for readiness: analytics are usable while Gemini is still being set up
+        steps.append(("mentor", _start_mentor, False))
+    return steps
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start serving at once; warm up (imports, sample analytics, Gemini client) in the background."""
+    tasks = []
+    if STARTUP_WARMUP:
+        tasks.append(asyncio.create_task(warmup.run(_warmup_steps())))
+    else:
+        warmup.skip()
+    if mentor_client.configured:
+        tasks.append(asyncio.create_task(mentor_client.refresh_loop()))
+    yield
+    for task in tasks:
+        task.cancel()
+    shutdown_pool()
+
+
+app = FastAPI(
+    title="Student Performance Analysis",
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse,
+)
+if METRICS_ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
+
+
+@app.exception_handler(PoolSaturated)
+async def _pool_saturated(request: Request, exc: PoolSaturated):
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "1"})
 
 
 class ChatRequest(BaseModel):
@@ -22,11 +107,192 @@ class ChatRequest(BaseModel):
     filename: Optional[str] = None
 
 
-# Load and cache insights for default sample data
-def _get_insights(csv_path: Optional[Path] = None):
-    df = load_csv(csv_path)
-    analytics = run_analytics(df)
-    return build_insight_summary(analytics)
+class MultiInsightsRequest(BaseModel):
+    filenames: list[str]
+    include_insights: bool = False
+
+
+class BatchRequest(BaseModel):
+    filename: Optional[str] = None
+    batch_size: Optional[int] = None
+
+
+def _no_stage(name: str):
+    return nullcontext({})
+
+
+def _compute_insights(csv_path: Optional[Path] = None, stage=_no_stage):
+    """Load → analytics → summary; stage(name) wraps each step (Job.stage reports progress)."""
+    p = csv_path or SAMPLE_CSV
+    if p.exists() and p.stat().st_size >= CHUNKED_INGEST_MIN_BYTES:
+        # Large file: aggregate chunk by chunk instead of holding the whole frame
+        with stage("load"):
+            fmt = sniff_format(p)
+        with stage("analytics") as st:
+            def counted(chunks):
+                rows = 0
+                for chunk in chunks:
+                    rows += len(chunk)
+                    st["detail"] = {"rows": rows}
+                    yield chunk
+
+            analytics = run_analytics_chunked(counted(iter_csv_chunks(p, fmt=fmt)))
+        dtype_plan = None
+    else:
+        with stage("load") as st:
+            df = load_dataset(p)
+            st["detail"] = {"rows": len(df)}
+        fmt = df.attrs.get("csv_format")
+        dtype_plan = df.attrs.get("dtype_plan")
+        with stage("analytics"):
+            analytics = run_analytics(df)
+    with stage("summary"):
+        insights = build_insight_summary(analytics)
+    insights["csv_format"] = fmt
+    insights["dtype_plan"] = dtype_plan
+    return insights
+
+
+def _compute_and_cache(p: Path, key: tuple) -> dict:
+    insights = _compute_insights(p)
+    insights_cache.put(key, insights)
+    return insights
+
+
+def _build_index(insights: dict, key: tuple) -> InsightIndex:
+    index = InsightIndex(insights)
+    insight_indexes.put(key, index)
+    return index
+
+
+# Load and cache insights; cache key changes whenever the file is rewritten.
+# Cache hits are served inline; misses run once in the analytics pool, shared by
+# every request for the same file version that arrives meanwhile.
+async def _get_insights(csv_path: Optional[Path] = None):
+    p = csv_path or SAMPLE_CSV
+    if not p.exists():
+        raise FileNotFoundError(f"CSV not found: {p}")
+    key = file_fingerprint(p)
+    insights = insights_cache.get(key)
+    if insights is None:
+        insights = await analytics_pool.run(("insights", key), _compute_and_cache, p, key)
+    return insights
+
+
+async def _get_index(csv_path: Optional[Path] = None) -> tuple[dict, InsightIndex]:
+    """Insights plus their sort/filter index, built once per file version."""
+    p = csv_path or SAMPLE_CSV
+    insights = await _get_insights(p)
+    key = file_fingerprint(p)
+    index = insight_indexes.get(key)
+    if index is None or not index.covers(insights):
+        # Missing, or built from other insights for this key (e.g. the file changed
+        # between the two lookups): index these insights, keyed by their students list
+        index = await analytics_pool.run(("index", key, id(insights["students"])), _build_index, insights, key)
+    return insights, index
+
+
+UPLOAD_STAGES = ["save", "load", "analytics", "summary"]
+APPEND_STAGES = ["append"]
+
+
+def _job_result(path: Path, key: tuple, insights: dict) -> dict:
+    """What a finished upload job keeps: the file version it produced and its summary.
+
+    The full insights stay in insights_cache (and can be recomputed from the file), so
+    JOB_HISTORY finished jobs don't each pin a roster's worth of records in memory.
+    """
+    return {"csv_path": str(path), "fingerprint": key, "summary": insights["summary"]}
+
+
+def _upload_job(job: Job, staged: Path, target: Path, append: bool):
+    """Background upload pipeline: move the staged file into place, then analyse or append it."""
+    if append:
+        try:
+            with job.stage("append"):
+                insights = _append_insights(target, staged)
+                return _job_result(target, file_fingerprint(target), insights)
+        finally:
+            staged.unlink(missing_ok=True)
+    with job.stage("save"):
+        path = promote_upload(staged, target.name)
+        key = file_fingerprint(path)
+    insights = _compute_insights(path, stage=job.stage)
+    insights_cache.put(key, insights)
+    return _job_result(path, key, insights)
+
+
+def _render(content, accept_encoding: str = "", etag: Optional[str] = None) -> Response:
+    with metrics.span("api.serialize"):
+        return json_response(content, accept_encoding, etag)
+
+
+async def _json(content, request: Optional[Request] = None, etag: Optional[str] = None) -> Response:
+    """Encode (and compress) a response body in the analytics pool rather than on the event loop."""
+    accept = request.headers.get("accept-encoding", "") if request else ""
+    return await analytics_pool.run(None, _render, content, accept, etag)
+
+
+def _etag(request: Request, p: Path) -> str:
+    """ETag for a GET over a dataset: its file version plus the query, known before any work is done."""
+    return make_etag(app.version, file_fingerprint(p), request.url.path, sorted(request.query_params.multi_items()))
+
+
+def _split(value: Optional[str]) -> Optional[list[str]]:
+    return [v.strip() for v in value.split(",") if v.strip()] if value else None
+
+
+_append_locks: defaultdict = defaultdict(threading.Lock)
+
+
+def _base_state(path: Path) -> tuple[AnalyticsAccumulator, bool]:
+    """Analytics state for the file as it is now: memory, then disk, then a full rebuild.
+
+    The flag says whether the state on disk is up to date (so patches can be appended to it).
+    """
+    acc = analytics_states.get(file_fingerprint(path))
+    if acc is not None:
+        return acc, True
+    saved = read_state(path)
+    if saved is not None:
+        try:
+            return AnalyticsAccumulator.from_state(*saved), True
+        except (KeyError, TypeError, ValueError):
+            pass  # written by an older version: rebuild below
+    return AnalyticsAccumulator().update(load_dataset(path)), False
+
+
+def _append_insights(target: Path, delta_path: Path):
+    """Fold a delta CSV into target: append its rows to the file and update analytics in O(delta).
+
+    Only the students in the delta are recomputed: their records are patched into the cached
+    insights and their state entries appended to the saved state. A full result() is built
+    only when there is nothing to patch (no cached insights, or ids turned from numbers to text).
+    """
+    delta = load_csv(delta_path)
+    with _append_locks[str(target.resolve())]:
+        base = insights_cache.get(file_fingerprint(target))
+        acc, persisted = _base_state(target)
+        analytics_states.invalidate(target)
+        previous = state_source(target)
+        acc.take_changed()
+        acc.update(append_rows(target, delta))
+        changed = acc.take_changed()
+        fingerprint = file_fingerprint(target)
+        analytics_states.put(fingerprint, acc)
+        if changed is None or not persisted or append_state(acc.to_state(changed), target, previous):
+            write_state(acc.to_state(), target)
+        patched = acc.patch(base["raw_analytics"], changed) if base is not None and changed is not None else None
+        if patched is not None:
+            insights = patch_insight_summary(base, *patched)
+        else:
+            insights = build_insight_summary(acc.result())
+            insights["csv_format"] = sniff_format(target)
+        insights["dtype_plan"] = None
+        insights_cache.invalidate(target)
+        correlation_cache.invalidate(target)
+        insights_cache.put(fingerprint, insights)
+    return insights
 
 
 @app.get("/")
@@ -39,67 +305,386 @@ async def root():
 
 
 @app.get("/api/insights")
-async def api_insights(csv_path: Optional[str] = None):
-    """Get full insights (summary + students + analytics). Uses sample CSV if no path."""
+async def api_insights(
+    request: Request,
+    csv_path: Optional[str] = None,
+    offset: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1),
+    sort: Optional[str] = None,
+    order: str = Query("asc", pattern="^(asc|desc)$"),
+    at_risk: bool = False,
+    risk: Optional[str] = None,
+    subject: Optional[str] = None,
+    fields: Optional[str] = None,
+    exclude: Optional[str] = None,
+    student_fields: Optional[str] = None,
+):
+    """Get full insights (summary + students + analytics). Uses sample CSV if no path.
+
+    Optional paging/filtering: offset, limit, sort (academic_health | avg_marks), order,
+    at_risk, risk (low_marks | low_attendance | multiple_weak), subject; and comma-separated
+    fields / exclude (top-level sections, e.g. exclude=raw_analytics) and student_fields
+    (keys kept per student). Responses carry an ETag; If-None-Match gets 304 while the file is unchanged.
+    """
     try:
         path = Path(csv_path) if csv_path else None
-        insights = _get_insights(path)
-        return insights
+        etag = _etag(request, path or SAMPLE_CSV)
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return not_modified(etag)
+        if not any((offset, limit, sort, at_risk, risk, subject, fields, exclude, student_fields)):
+            return await _json(await _get_insights(path), request, etag)
+        insights, index = await _get_index(path)
+        page = index.query(
+            insights,
+            offset=offset,
+            limit=limit,
+            sort=sort,
+            descending=order == "desc",
+            at_risk=at_risk,
+            subject=subject,
+            fields=_split(fields),
+            exclude=_split(exclude),
+            student_fields=_split(student_fields),
+            risk=risk,
+        )
+        return await _json(page, request, etag)
+    except PoolSaturated:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except FileNotFoundError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/api/students/{student_id}")
+async def api_student(request: Request, student_id: str, csv_path: Optional[str] = None):
+    """One student's summary record, looked up in the dataset's index."""
+    p = Path(csv_path) if csv_path else SAMPLE_CSV
+    try:
+        etag = _etag(request, p)
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return not_modified(etag)
+        insights, index = await _get_index(p)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    student = index.student(insights, student_id)
+    if student is None:
+        raise HTTPException(status_code=404, detail=f"Student not found: {student_id}")
+    return await _json(student, request, etag)
+
+
+def _correlation(p: Path, key: tuple, method: str, group_by: tuple) -> dict:
+    result = attendance_correlation(load_dataset(p), method=method, group_by=group_by)
+    correlation_cache.put(key, result)
+    return result
+
+
+@app.get("/api/correlation")
+async def api_correlation(
+    request: Request,
+    csv_path: Optional[str] = None,
+    method: str = Query("pearson", pattern="^(pearson|spearman)$"),
+    group_by: str = "subject",
+):
+    """Attendance vs marks correlation, Pearson or Spearman, grouped by any of
+    subject, semester, grade (comma-separated; each gives a by_<column> section)."""
+    p = Path(csv_path) if csv_path else SAMPLE_CSV
+    groups = tuple(_split(group_by) or ())
+    bad = [g for g in groups if g not in ("subject", "semester", "grade")]
+    if bad:
+        raise HTTPException(status_code=400, detail=f"Cannot group by: {', '.join(bad)}")
+    if not p.exists():
+        raise HTTPException(status_code=404, detail=f"CSV not found: {p}")
+    etag = _etag(request, p)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag)
+    key = file_fingerprint(p) + ("correlation", method, groups)
+    result = correlation_cache.get(key)
+    if result is None:
+        try:
+            result = await analytics_pool.run(key, _correlation, p, key, method, groups)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    return await _json(result, request, etag)
+
+
+@app.post("/api/insights/batch")
+async def api_insights_batch(body: MultiInsightsRequest):
+    """Analyse several uploaded CSVs in parallel worker processes.
+
+    Returns each dataset's summary (full insights with include_insights=true), per-stage
+    timings and core utilization; results also fill the insights cache for /api/insights.
+    """
+    paths = [UPLOAD_DIR / Path(name).name for name in body.filenames]
+    keys = {str(p): file_fingerprint(p) for p in paths if p.exists()}
+    loop = asyncio.get_running_loop()
+    result = await loop.run_in_executor(None, lambda: analyze_many(paths, executor=get_pool()))
+    for d in result["datasets"]:
+        insights = d.pop("insights", None)
+        if insights is None:
+            continue
+        if d["path"] in keys:
+            insights_cache.put(keys[d["path"]], insights)
+        d["summary"] = insights.get("summary")
+        if body.include_insights:
+            d["insights"] = insights
+    return result
+
+
 @app.post("/api/upload")
-async def api_upload(file: UploadFile = File(...)):
-    """Upload a CSV and return insights for it."""
+async def api_upload(
+    request: Request,
+    file: UploadFile = File(...),
+    mode: str = "replace",
+    dataset: Optional[str] = None,
+    background: bool = False,
+):
+    """Upload a CSV and return insights for it.
+
+    mode=append adds the uploaded rows to an earlier upload (dataset, default: same
+    filename) and updates its analytics incrementally instead of recomputing.
+    background=true stores the upload and returns a job id at once (202); poll
+    /api/jobs/{job_id} for per-stage progress and the insights.
+    """
     if not file.filename or not file.filename.lower().endswith(".csv"):
         raise HTTPException(status_code=400, detail="CSV file required")
+    if mode not in ("replace", "append"):
+        raise HTTPException(status_code=400, detail="mode must be 'replace' or 'append'")
+    loop = asyncio.get_running_loop()
+    if background:
+        return await _submit_upload_job(file, UPLOAD_DIR / Path(dataset or file.filename).name, mode)
     try:
-        content = await file.read()
-        path = save_upload(content, file.filename)
-        insights = _get_insights(path)
-        return insights
+        target = UPLOAD_DIR / Path(dataset or file.filename).name
+        if mode == "append" and target.exists():
+            delta_name = f".delta-{uuid.uuid4().hex}.csv"
+            delta_path = await loop.run_in_executor(None, save_upload_stream, file.file, delta_name)
+            try:
+                return await _json(await analytics_pool.run(None, _append_insights, target, delta_path), request)
+            finally:
+                delta_path.unlink(missing_ok=True)
+        path = await loop.run_in_executor(None, save_upload_stream, file.file, target.name)
+        insights = await _get_insights(path)
+        return await _json(insights, request)
+    except PoolSaturated:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+async def _submit_upload_job(file: UploadFile, target: Path, mode: str) -> JSONResponse:
+    # The request's spooled file is closed once we respond, so keep the bytes in a staging file
+    loop = asyncio.get_running_loop()
+    staged_name = f".upload-{uuid.uuid4().hex}.csv"
+    staged = await loop.run_in_executor(None, save_upload_stream, file.file, staged_name)
+    append = mode == "append" and target.exists()
+    try:
+        job = job_queue.submit(
+            "upload",
+            APPEND_STAGES if append else UPLOAD_STAGES,
+            _upload_job,
+            staged,
+            target,
+            append,
+            meta={"filename": target.name, "mode": mode},
+        )
+    except JobQueueFull as e:
+        staged.unlink(missing_ok=True)
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    return JSONResponse(status_code=202, content={**job.state(), "status_url": f"/api/jobs/{job.id}"})
+
+
+@app.get("/api/jobs")
+async def api_jobs(limit: int = Query(50, ge=1, le=500)):
+    """Recent background jobs (newest first) and queue depth."""
+    return {"jobs": job_queue.recent(limit), "queue": job_queue.stats()}
+
+
+@app.get("/api/jobs/{job_id}")
+async def api_job(request: Request, job_id: str, result: bool = True):
+    """Status and per-stage progress of a background job; includes the insights once done.
+
+    The insights are read back through the insights cache for the file version the job
+    produced; if the file has changed since, the answer is 409 (fetch /api/insights).
+    """
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job")
+    state = job.state()
+    if job.status == "done" and result:
+        p = Path(job.result["csv_path"])
+        if not p.exists() or file_fingerprint(p) != job.result["fingerprint"]:
+            raise HTTPException(
+                status_code=409,
+                detail=f"{p.name} has changed since this job finished; fetch /api/insights?csv_path={p} instead",
+            )
+        try:
+            insights = await _get_insights(p)
+        except FileNotFoundError as e:
+            raise HTTPException(status_code=409, detail=str(e))
+        return await _json({**state, "result": insights}, request)
+    return state
+
+
+@app.get("/api/ready")
+async def api_ready():
+    """Readiness: 200 once start-up warm-up has finished, 503 (with its progress) until then."""
+    state = warmup.state()
+    if not state["ready"]:
+        return JSONResponse(status_code=503, content=state, headers={"Retry-After": "1"})
+    return state
+
+
+@app.get("/metrics", include_in_schema=False)
+async def api_metrics():
+    """Prometheus text format: stage latencies, rows and memory peaks, HTTP requests."""
+    if not METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are disabled (METRICS_ENABLED=0)")
+    return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+
+@app.get("/api/cache/stats")
+async def api_cache_stats():
+    """Insights cache hit/miss counters."""
+    return insights_cache.stats()
+
+
+@app.get("/api/analytics/stats")
+async def api_analytics_stats():
+    """Analytics pool load: admitted jobs, coalesced and rejected requests."""
+    return analytics_pool.stats()
+
+
 @app.get("/api/mentor/models")
 async def api_mentor_models():
     """List Gemini models available for your API key (for debugging)."""
-    return {"models": list_available_models()}
+    try:
+        return {"models": await run_mentor_call(list_available_models)}
+    except asyncio.TimeoutError:
+        return {"models": []}
+
+
+@app.get("/api/mentor/stats")
+async def api_mentor_stats():
+    """Mentor pool queue depth, in-flight calls and timeouts."""
+    return mentor_stats()
 
 
 @app.get("/api/mentor")
 async def api_mentor_summary():
     """AI mentor overview (no question)."""
-    insights = _get_insights(None)
-    text = get_mentor_response(insights, user_question=None, student_id=None)
+    insights = await _get_insights(None)
+    text = await get_mentor_response_async(insights, user_question=None, student_id=None)
     return {"response": text}
 
 
-@app.post("/api/mentor/chat")
-async def api_mentor_chat(body: ChatRequest):
-    """AI mentor Q&A with optional student focus."""
-    # Use uploaded file if specified, else default
-    csv_path = None
-    if body.filename:
+def _chat_csv_path(filename: Optional[str]) -> Optional[Path]:
+    """Use uploaded file if specified, else default."""
+    if filename:
         # Sanitize filename to prevent directory traversal
-        safe_name = Path(body.filename).name
+        safe_name = Path(filename).name
         possible_path = Path("data/uploads") / safe_name
         if possible_path.exists():
-            csv_path = possible_path
+            return possible_path
+    return None
+
+
+async def _chat_focus(body: ChatRequest) -> tuple[dict, Optional[str], Optional[dict]]:
+    """Insights plus the focused student's record from the index (class overview if unknown)."""
+    p = _chat_csv_path(body.filename)
+    if not body.student_id:
+        return await _get_insights(p), None, None
+    insights, index = await _get_index(p)
+    student = index.student(insights, body.student_id)
+    return insights, (body.student_id if student is not None else None), student
 
-    insights = _get_insights(csv_path)
-    text = get_mentor_response(
+
+@app.post("/api/mentor/chat")
+async def api_mentor_chat(body: ChatRequest):
+    """AI mentor Q&A with optional student focus."""
+    insights, student_id, student = await _chat_focus(body)
+    text = await get_mentor_response_async(
         insights,
         user_question=body.question,
-        student_id=body.student_id,
+        student_id=student_id,
+        student=student,
     )
     return {"response": text}
 
 
+@app.post("/api/mentor/chat/stream")
+async def api_mentor_chat_stream(body: ChatRequest):
+    """AI mentor Q&A streamed as Server-Sent Events (data: {"text": ...}, then event: done)."""
+    insights, student_id, student = await _chat_focus(body)
+
+    async def events():
+        async for piece in stream_mentor_response_async(
+            insights,
+            user_question=body.question,
+            student_id=student_id,
+            student=student,
+        ):
+            yield f"data: {json.dumps({'text': piece})}\n\n"
+        yield "event: done\ndata: {}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.post("/api/mentor/batch", status_code=202)
+async def api_mentor_batch(body: BatchRequest):
+    """Start (or resume) mentor reports for every at-risk student; poll the returned job."""
+    if not mentor_client.configured:
+        raise HTTPException(status_code=503, detail="AI Mentor is not configured. Please set GEMINI_API_KEY in .env.")
+    p = _chat_csv_path(body.filename) or SAMPLE_CSV
+    try:
+        insights, index = await _get_index(p)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    students = insights.get("students", [])
+    at_risk = [s for s, flagged in zip(students, index.at_risk) if flagged]
+    job = start_batch(
+        file_fingerprint(p),
+        p.name,
+        at_risk,
+        insights.get("summary", {}).get("attendance_marks_correlation", ""),
+        batch_size=body.batch_size,
+    )
+    return job.state()
+
+
+@app.get("/api/mentor/batch/{job_id}")
+async def api_mentor_batch_status(job_id: str):
+    """Progress of a batch report job."""
+    job = get_batch(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown batch job")
+    return job.state()
+
+
+@app.get("/api/mentor/batch/{job_id}/report")
+async def api_mentor_batch_report(job_id: str):
+    """Download the reports finished so far as CSV."""
+    filename = f"mentor-reports-{job_id}.csv"
+    job = get_batch(job_id)
+    if job is None:
+        path = report_path(job_id)  # written before a restart
+        if path is None or not path.exists():
+            raise HTTPException(status_code=404, detail="Unknown batch job")
+        return FileResponse(path, media_type="text/csv", filename=filename)
+    if job.finished_at is not None and job.status != "failed" and job.report_file.exists():
+        return FileResponse(job.report_file, media_type="text/csv", filename=filename)
+    # Still running (or failed before its report was written): a copy of the reports so far
+    path = await asyncio.get_running_loop().run_in_executor(None, job.partial_report)
+    return FileResponse(
+        path, media_type="text/csv", filename=filename, background=BackgroundTask(path.unlink, missing_ok=True)
+    )
+
+
 # Static files for dashboard
 static_dir = Path(__file__).parent / "static"
 if static_dir.exists():
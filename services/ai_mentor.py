@@ -1,116 +1,299 @@
 """AI Mentor using Gemini API: reasoning, suggestions, Q&A."""
-from typing import Optional
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Iterable, Iterator, Optional
 
-from config import GEMINI_API_KEY
+from config import GEMINI_API_KEY, MENTOR_INIT_RETRY, MENTOR_MAX_CONCURRENCY, MENTOR_MODEL_REFRESH, MENTOR_TIMEOUT
+from services.cache import mentor_cache
+from services.metrics import in_context, span
 
-# Cache discovered model name so we don't list on every request
-_CACHED_MODEL_NAME: Optional[str] = None
+# Gemini calls are blocking; run them on a dedicated pool so the event loop stays free
+_EXECUTOR = ThreadPoolExecutor(max_workers=MENTOR_MAX_CONCURRENCY, thread_name_prefix="mentor")
+_SEMAPHORE: Optional[asyncio.Semaphore] = None
+# in_flight counts pool threads in use, including "abandoned" calls whose caller timed out
+_STATS = {"in_flight": 0, "waiting": 0, "max_waiting": 0, "completed": 0, "timeouts": 0, "abandoned": 0}
+
+FALLBACK_MODELS = ("gemini-2.0-flash", "gemini-1.5-flash", "gemini-1.5-pro", "gemini-pro")
+
+
+class MentorClient:
+    """Long-lived Gemini client: configures the SDK once, resolves the model once and
+    reuses GenerativeModel objects (and their pooled connections) across requests.
+
+    The model list is refreshed off the request path (refresh_loop); a 404 only moves
+    to the next candidate locally and schedules a refresh. The same loop retries a
+    failed set-up, backing off from MENTOR_INIT_RETRY seconds.
+    """
+
+    def __init__(self, api_key: str = GEMINI_API_KEY, refresh_interval: float = MENTOR_MODEL_REFRESH):
+        self.api_key = api_key
+        self.refresh_interval = refresh_interval
+        self._genai = None
+        self._models: dict[str, Any] = {}  # model name -> GenerativeModel
+        self._available: list[str] = []
+        self._unavailable: set[str] = set()
+        self._model_name: Optional[str] = None
+        self._lock = threading.Lock()
+        self._refresh_wanted = threading.Event()
+        self._wakeup: Optional[asyncio.Event] = None  # refresh_loop's, set via _loop
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.init_error: Optional[str] = None
+        self.init_failures = 0
+        self.refresh_error: Optional[str] = None
+        self.last_refresh: Optional[float] = None
+        self.refreshes = 0
+        self.started_at: Optional[float] = None
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.api_key)
+
+    def start(self, retry: bool = False) -> None:
+        """Import and configure the SDK, then resolve the model (blocking; idempotent).
+
+        After a failure, calls are no-ops (init_error stays set for callers to report)
+        until one with retry=True, made by refresh_loop; a retry returns at once if
+        another set-up is still in progress.
+        """
+        if not self._lock.acquire(blocking=not retry):
+            return
+        try:
+            if self._genai is not None or (self.init_error and not retry) or not self.api_key:
+                return
+            try:
+                import google.generativeai as genai
+                genai.configure(api_key=self.api_key)
+            except Exception as e:
+                self.init_error = f"Failed to initialize Gemini: {e}"
+                self.init_failures += 1
+                return
+            self._genai = genai
+            self.init_error = None
+            self.init_failures = 0
+            self.started_at = time.time()
+        finally:
+            self._lock.release()
+        self.refresh_models()
+
+    def refresh_models(self, forget_unavailable: bool = True) -> list[str]:
+        """Re-list models that support generateContent and re-pick the preferred one.
+
+        forget_unavailable=False keeps models that returned 404 excluded (used for the
+        refresh triggered by that 404, so the same model is not retried immediately).
+        """
+        if self._genai is None:
+            return []
+        try:
+            names = []
+            for m in self._genai.list_models():
+                if "generateContent" in getattr(m, "supported_generation_methods", []):
+                    # m.name is like "models/gemini-1.5-flash"
+                    name = getattr(m, "name", None) or ""
+                    if name.startswith("models/"):
+                        name = name.replace("models/", "", 1)
+                    names.append(name)
+        except Exception as e:
+            self.refresh_error = str(e)
+            names = None
+        with self._lock:
+            if names is not None:
+                self._available = names
+                if forget_unavailable:
+                    self._unavailable.clear()
+                self.refresh_error = None
+            self._model_name = self._pick_model()
+            self.last_refresh = time.time()
+            self.refreshes += 1
+            self._refresh_wanted.clear()
+            return list(self._available)
+
+    def _pick_model(self) -> str:
+        for name in list(self._available) + list(FALLBACK_MODELS):
+            if name not in self._unavailable:
+                return name
+        return FALLBACK_MODELS[0]
+
+    @property
+    def model_name(self) -> str:
+        with self._lock:
+            if self._model_name is None:
+                self._model_name = self._pick_model()
+            return self._model_name
+
+    def available_models(self) -> list[str]:
+        with self._lock:
+            return list(self._available)
+
+    def model(self, name: str):
+        """Cached GenerativeModel for name."""
+        with self._lock:
+            m = self._models.get(name)
+            if m is None:
+                m = self._models[name] = self._genai.GenerativeModel(name)
+            return m
+
+    def models_to_try(self) -> list[str]:
+        first = self.model_name
+        return [first] + [f for f in FALLBACK_MODELS if f != first and f not in self._unavailable]
+
+    def mark_unavailable(self, name: str) -> None:
+        """Model returned 404: skip it from now on and ask the background loop to re-list."""
+        with self._lock:
+            self._unavailable.add(name)
+            self._models.pop(name, None)
+            if self._model_name == name:
+                self._model_name = None
+        self._refresh_wanted.set()
+        if self._loop is not None:
+            try:
+                self._loop.call_soon_threadsafe(self._wakeup.set)
+            except RuntimeError:
+                pass  # event loop already closed (shutdown)
+
+    def _next_delay(self) -> float:
+        """Seconds until refresh_loop's next pass: the refresh interval once the SDK is up,
+        else MENTOR_INIT_RETRY, doubled per failed attempt (capped at the interval)."""
+        if self._genai is not None:
+            return self.refresh_interval
+        return min(self.refresh_interval, MENTOR_INIT_RETRY * 2 ** min(max(self.init_failures - 1, 0), 16))
+
+    async def refresh_loop(self) -> None:
+        """Refresh the model list every refresh_interval seconds, or as soon as a 404 asks for it;
+        until the SDK is set up, retry start() with backoff. Runs through run_mentor_call,
+        so it takes a mentor slot like any other Gemini call."""
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        while True:
+            if not self._refresh_wanted.is_set():
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self._next_delay())
+                except asyncio.TimeoutError:
+                    pass
+            self._wakeup.clear()
+            try:
+                if self._genai is None:
+                    await run_mentor_call(self.start, True)
+                else:
+                    await run_mentor_call(self.refresh_models, not self._refresh_wanted.is_set())
+            except asyncio.TimeoutError:
+                if self._genai is None:
+                    self.init_failures += 1  # hung set-up: back off as for a failed one
+
+    def state(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "configured": self.configured,
+                "ready": self._genai is not None,
+                "init_error": self.init_error,
+                "init_failures": self.init_failures,
+                "model": self._model_name,
+                "available_models": list(self._available),
+                "unavailable_models": sorted(self._unavailable),
+                "cached_models": list(self._models),
+                "started_at": self.started_at,
+                "last_refresh": self.last_refresh,
+                "refreshes": self.refreshes,
+                "refresh_error": self.refresh_error,
+                "refresh_interval": self.refresh_interval,
+            }
+
+
+mentor_client = MentorClient()
 
 
 def list_available_models() -> list[str]:
     """List model names that support generateContent (for debugging)."""
-    if not GEMINI_API_KEY:
-        return []
-    try:
-        import google.generativeai as genai
-        genai.configure(api_key=GEMINI_API_KEY)
-        out = []
-        for m in genai.list_models():
-            if "generateContent" in getattr(m, "supported_generation_methods", []):
-                name = getattr(m, "name", None) or ""
-                if name.startswith("models/"):
-                    name = name.replace("models/", "", 1)
-                out.append(name)
-        return out
-    except Exception:
+    if not mentor_client.configured:
         return []
+    mentor_client.start()
+    return mentor_client.available_models()
 
 
-def _get_model_name(genai) -> str:
-    """Find a model that supports generateContent for this API key."""
-    global _CACHED_MODEL_NAME
-    if _CACHED_MODEL_NAME:
-        return _CACHED_MODEL_NAME
-    try:
-        for m in genai.list_models():
-            if "generateContent" in getattr(m, "supported_generation_methods", []):
-                # m.name is like "models/gemini-1.5-flash" - use as-is or strip "models/"
-                name = getattr(m, "name", None) or ""
-                if name.startswith("models/"):
-                    name = name.replace("models/", "", 1)
-                _CACHED_MODEL_NAME = name
-                return _CACHED_MODEL_NAME
-    except Exception:
-        pass
-    # Fallbacks if list_models fails or returns nothing
-    for fallback in ("gemini-2.0-flash", "gemini-1.5-flash", "gemini-pro"):
-        _CACHED_MODEL_NAME = fallback
-        return fallback
+def _is_not_found(e: Exception) -> bool:
+    err_str = str(e)
+    return "404" in err_str or "not found" in err_str.lower()
 
 
-def get_mentor_response(
+def _student_block(s: dict) -> str:
+    # Format subject marks for chart analysis
+    sub_marks = s.get('subject_marks', [])
+    sub_str = ", ".join([f"{m['subject']}: {m['marks']}" for m in sub_marks]) if sub_marks else "No specific subject data."
+
+    return (
+        f"Name: {s.get('name')}. "
+        f"Average marks: {s.get('avg_marks')}. "
+        f"Attendance: {s.get('attendance_avg')}%. "
+        f"Academic health score: {s.get('academic_health')}. "
+        f"Subject Marks (Chart Data): [{sub_str}]. "
+        f"Weak subjects: {s.get('weak_subjects', [])}. "
+        f"Focus areas: {s.get('risk_flags', [])}."
+    )
+
+
+def _student_context(s: dict, correlation_text: str) -> str:
+    """Data section for one student (same text whether asked singly or in a batch)."""
+    return (
+        "Focus on this student.\n" + _student_block(s)
+        + f"\nKey insight for everyone: {correlation_text}"
+    )
+
+
+def _data_context(
     insight_summary: dict,
-    user_question: Optional[str] = None,
     student_id: Optional[str] = None,
+    student: Optional[dict] = None,
 ) -> str:
-    """Call Gemini with performance context; optional Q&A."""
-    if not GEMINI_API_KEY:
-        return "AI Mentor is not configured. Please set GEMINI_API_KEY in .env."
-
-    try:
-        import google.generativeai as genai
-        genai.configure(api_key=GEMINI_API_KEY)
-    except Exception as e:
-        return f"Failed to initialize Gemini: {e}"
-
-    model_name = _get_model_name(genai)
-    model = genai.GenerativeModel(model_name)
+    """Data section of the prompt: one student's block, or the class overview.
 
+    Pass student (e.g. from InsightIndex.student) to skip the scan over the roster.
+    """
     summary = insight_summary.get("summary", {})
     students = insight_summary.get("students", [])
     correlation_text = summary.get("attendance_marks_correlation", "")
 
-    def _student_block(s: dict) -> str:
-        # Format subject marks for chart analysis
-        sub_marks = s.get('subject_marks', [])
-        sub_str = ", ".join([f"{m['subject']}: {m['marks']}" for m in sub_marks]) if sub_marks else "No specific subject data."
-        
-        return (
-            f"Name: {s.get('name')}. "
-            f"Average marks: {s.get('avg_marks')}. "
-            f"Attendance: {s.get('attendance_avg')}%. "
-            f"Academic health score: {s.get('academic_health')}. "
-            f"Subject Marks (Chart Data): [{sub_str}]. "
-            f"Weak subjects: {s.get('weak_subjects', [])}. "
-            f"Focus areas: {s.get('risk_flags', [])}."
-        )
-
-    student_context = ""
+    if student is not None:
+        return _student_context(student, correlation_text)
     if student_id:
         for s in students:
             if str(s.get("student_id")) == str(student_id):
-                # Ensure subject_marks is present if not already
-                if "subject_marks" not in s: 
-                     # Fallback or re-fetch if needed, but usually analytics provides it.
-                     pass 
-                student_context = "Focus on this student.\n" + _student_block(s)
-                break
-    if not student_context:
-        student_context = (
-            f"Overall: {summary.get('total_students')} students, "
-            f"{summary.get('students_at_risk_count')} need support. "
-            f"Key insight: {correlation_text}. "
-            "Student data:\n" + "\n".join(_student_block(s) for s in students[:15])
-        )
-    else:
-        student_context += f"\nKey insight for everyone: {correlation_text}"
-
-    system_role = (
-        "You are a supportive Personal Study Coach. Use only the data provided. "
-        "Always be encouraging and use supportive language. "
-        "Format your response using Markdown. Use bolding for key terms. "
-        "Use numbered lists for steps. "
-        "Do not use harsh labels; use terms like 'focus areas' and 'room to grow'.\n\n"
+                return _student_context(s, correlation_text)
+    return (
+        f"Overall: {summary.get('total_students')} students, "
+        f"{summary.get('students_at_risk_count')} need support. "
+        f"Key insight: {correlation_text}. "
+        "Student data:\n" + "\n".join(_student_block(s) for s in students[:15])
+    )
+
+
+def _response_cache_key(
+    model_name: str,
+    context: str,
+    student_id: Optional[str],
+    user_question: Optional[str],
+) -> str:
+    """Hash of (model, data fingerprint, student, normalized question)."""
+    question = " ".join((user_question or "").lower().split()).rstrip("?!. ")
+    fingerprint = hashlib.sha256(context.encode("utf-8")).hexdigest()
+    raw = json.dumps([model_name, fingerprint, str(student_id or ""), question])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+_COACH_ROLE = (
+    "You are a supportive Personal Study Coach. Use only the data provided. "
+    "Always be encouraging and use supportive language. "
+    "Format your response using Markdown. Use bolding for key terms. "
+    "Use numbered lists for steps. "
+    "Do not use harsh labels; use terms like 'focus areas' and 'room to grow'.\n\n"
+)
+
+
+def _build_prompt(student_context: str, user_question: Optional[str] = None) -> str:
+    """Assemble the coach prompt (role, data context, question)."""
+    system_role = _COACH_ROLE + (
         "**CHARTS:** If helpful for comparison or visualizing trends, generate a chart using this JSON format inside a code block with language 'chart'.\n"
         "IMPORTANT: The code block must contain ONLY valid JSON. Do not add comments or text inside the block.\n"
         "```chart\n"
@@ -134,24 +317,354 @@ def get_mentor_response(
             "Then list 2–3 concrete, actionable improvement steps formatted as a numbered list.\n"
             "End with one encouraging sentence."
         )
+    return prompt
 
-    # Retry with another model if we get 404 (model not found)
-    global _CACHED_MODEL_NAME
-    fallbacks = ["gemini-2.0-flash", "gemini-1.5-flash", "gemini-1.5-pro", "gemini-pro"]
-    models_to_try = [model_name] + [f for f in fallbacks if f != model_name]
+
+def get_mentor_response(
+    insight_summary: dict,
+    user_question: Optional[str] = None,
+    student_id: Optional[str] = None,
+    student: Optional[dict] = None,
+) -> str:
+    """Call Gemini with performance context; optional Q&A."""
+    if not mentor_client.configured:
+        return "AI Mentor is not configured. Please set GEMINI_API_KEY in .env."
+    mentor_client.start()  # no-op once the lifespan hook has run
+    if mentor_client.init_error:
+        return mentor_client.init_error
+
+    model_name = mentor_client.model_name
+    context = _data_context(insight_summary, student_id, student)
+    cache_key = _response_cache_key(model_name, context, student_id, user_question)
+    cached = mentor_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    prompt = _build_prompt(context, user_question)
+    try:
+        text = _generate_text(prompt)
+    except RuntimeError as e:
+        return str(e)
+    mentor_cache.put(cache_key, text)
+    return text
+
+
+def _generate_text(prompt: str) -> str:
+    """Run prompt on the preferred model; retry with another model on 404 (model not found).
+
+    Raises RuntimeError with a user-facing "AI error: ..." message.
+    """
     last_error = None
-    for m_name in models_to_try:
+    for m_name in mentor_client.models_to_try():
         try:
-            m = genai.GenerativeModel(m_name)
-            response = m.generate_content(prompt)
+            with span("mentor.generate"):
+                response = mentor_client.model(m_name).generate_content(prompt)
             if response and response.text:
                 return response.text
             last_error = "No response from AI."
         except Exception as e:
-            err_str = str(e)
-            if "404" in err_str or "not found" in err_str.lower():
+            if _is_not_found(e):
+                last_error = e
+                mentor_client.mark_unavailable(m_name)
+                continue
+            raise RuntimeError(f"AI error: {e}") from e
+    raise RuntimeError(f"AI error: {last_error}")
+
+
+_BATCH_MARKER = "### STUDENT "
+
+
+def _build_batch_prompt(contexts: list[tuple[str, str]]) -> str:
+    """One prompt asking for a separate report per (student_id, context), split by marker lines."""
+    blocks = "\n\n".join(f"{_BATCH_MARKER}{sid}\n{ctx}" for sid, ctx in contexts)
+    return (
+        _COACH_ROLE + "Write a separate report for each student below. "
+        f"Start each report with the line `{_BATCH_MARKER}<student_id>` exactly as given, "
+        "then a short performance overview, 2–3 concrete improvement steps as a numbered list, "
+        "and one encouraging sentence. Do not include charts.\n\n"
+        "Data:\n" + blocks
+    )
+
+
+def _split_batch_reports(text: str, student_ids: list[str]) -> dict[str, str]:
+    """Cut a batched reply into per-student reports; unknown or empty sections are dropped."""
+    wanted = set(student_ids)
+    reports: dict[str, str] = {}
+    sections: list[tuple[Optional[str], list[str]]] = [(None, [])]
+    for line in text.splitlines():
+        marker = line.strip().strip("`")
+        if marker.startswith(_BATCH_MARKER):
+            sections.append((marker[len(_BATCH_MARKER):].strip(), []))
+        else:
+            sections[-1][1].append(line)
+    for sid, lines in sections:
+        body = "\n".join(lines).strip()
+        if sid in wanted and body:
+            reports[sid] = body
+    return reports
+
+
+def generate_batch_reports(students: list[dict], correlation_text: str) -> dict[str, str]:
+    """Overview reports for several students with one LLM request.
+
+    Reports are cached under the same key as a single-student overview, so cached
+    students are skipped; students the model leaves out of the batched reply are
+    asked for one by one. Raises RuntimeError if the mentor is unavailable.
+    """
+    if not mentor_client.configured:
+        raise RuntimeError("AI Mentor is not configured. Please set GEMINI_API_KEY in .env.")
+    mentor_client.start()
+    if mentor_client.init_error:
+        raise RuntimeError(mentor_client.init_error)
+
+    model_name = mentor_client.model_name
+    reports: dict[str, str] = {}
+    pending = []  # (student_id, context, cache key)
+    for s in students:
+        sid = str(s.get("student_id"))
+        context = _student_context(s, correlation_text)
+        key = _response_cache_key(model_name, context, sid, None)
+        cached = mentor_cache.get(key)
+        if cached is not None:
+            reports[sid] = cached
+        else:
+            pending.append((sid, context, key))
+    if len(pending) > 1:
+        text = _generate_text(_build_batch_prompt([(sid, ctx) for sid, ctx, _ in pending]))
+        split = _split_batch_reports(text, [sid for sid, _, _ in pending])
+        for sid, _, key in pending:
+            if sid in split:
+                reports[sid] = split[sid]
+                mentor_cache.put(key, split[sid])
+        pending = [p for p in pending if p[0] not in split]
+    for sid, context, key in pending:
+        reports[sid] = _generate_text(_build_prompt(context))
+        mentor_cache.put(key, reports[sid])
+    return reports
+
+
+_CHART_OPEN = "```chart"
+_FENCE = "```"
+
+
+def _hold_chart_blocks(pieces: Iterable[str]) -> Iterator[str]:
+    """Re-chunk streamed text so a ```chart block is only emitted once it is closed."""
+    buf = ""
+    for piece in pieces:
+        buf += piece
+        while buf:
+            start = buf.find(_CHART_OPEN)
+            if start == -1:
+                # Keep back a trailing partial "```chart" marker
+                keep = 0
+                for k in range(min(len(buf), len(_CHART_OPEN) - 1), 0, -1):
+                    if _CHART_OPEN.startswith(buf[-k:]):
+                        keep = k
+                        break
+                out, buf = buf[:len(buf) - keep], buf[len(buf) - keep:]
+                if out:
+                    yield out
+                break
+            if start:
+                yield buf[:start]
+                buf = buf[start:]
+            end = buf.find(_FENCE, len(_CHART_OPEN))
+            if end == -1:
+                break  # wait for the closing fence
+            yield buf[:end + len(_FENCE)]
+            buf = buf[end + len(_FENCE):]
+    if buf:
+        yield buf
+
+
+def stream_mentor_response(
+    insight_summary: dict,
+    user_question: Optional[str] = None,
+    student_id: Optional[str] = None,
+    student: Optional[dict] = None,
+) -> Iterator[str]:
+    """Like get_mentor_response, but yields text as Gemini generates it."""
+    if not mentor_client.configured:
+        yield "AI Mentor is not configured. Please set GEMINI_API_KEY in .env."
+        return
+    mentor_client.start()
+    if mentor_client.init_error:
+        yield mentor_client.init_error
+        return
+
+    model_name = mentor_client.model_name
+    context = _data_context(insight_summary, student_id, student)
+    cache_key = _response_cache_key(model_name, context, student_id, user_question)
+    cached = mentor_cache.get(cache_key)
+    if cached is not None:
+        yield cached
+        return
+    prompt = _build_prompt(context, user_question)
+
+    last_error = None
+    for m_name in mentor_client.models_to_try():
+        emitted = False
+        try:
+            m = mentor_client.model(m_name)
+            with span("mentor.stream_start"):
+                response = m.generate_content(prompt, stream=True)
+            parts = []
+            for piece in _hold_chart_blocks(chunk.text for chunk in response if chunk.text):
+                emitted = True
+                parts.append(piece)
+                yield piece
+            if emitted:
+                mentor_cache.put(cache_key, "".join(parts))
+                return
+            last_error = "No response from AI."
+        except Exception as e:
+            if _is_not_found(e) and not emitted:
                 last_error = e
-                _CACHED_MODEL_NAME = None  # force re-list next time
+                mentor_client.mark_unavailable(m_name)
                 continue
-            return f"AI error: {e}"
-    return f"AI error: {last_error}"
+            yield f"AI error: {e}"
+            return
+    yield f"AI error: {last_error}"
+
+
+def _semaphore() -> asyncio.Semaphore:
+    global _SEMAPHORE
+    if _SEMAPHORE is None:
+        _SEMAPHORE = asyncio.Semaphore(MENTOR_MAX_CONCURRENCY)
+    return _SEMAPHORE
+
+
+async def _acquire_slot() -> None:
+    """Wait for a free mentor slot, tracking queue depth and in-flight calls."""
+    _STATS["waiting"] += 1
+    _STATS["max_waiting"] = max(_STATS["max_waiting"], _STATS["waiting"])
+    try:
+        await _semaphore().acquire()
+    finally:
+        _STATS["waiting"] -= 1
+    _STATS["in_flight"] += 1
+
+
+def _release_slot(call: dict, ran: bool = True) -> None:
+    _STATS["in_flight"] -= 1
+    if call["timed_out"]:
+        _STATS["abandoned"] -= 1
+    elif ran:
+        _STATS["completed"] += 1
+    _semaphore().release()
+
+
+def _timed_out(call: dict) -> None:
+    """The caller gave up; the worker keeps its slot until the thread actually returns."""
+    if not call["timed_out"]:
+        call["timed_out"] = True
+        _STATS["timeouts"] += 1
+        _STATS["abandoned"] += 1
+
+
+async def _submit(func) -> tuple[asyncio.Future, dict]:
+    """Take a mentor slot and start func() on the mentor pool.
+
+    The slot is released when the worker thread finishes, not when the caller stops
+    waiting: a call abandoned on timeout still occupies a pool thread, so new calls
+    queue visibly in "waiting" instead of inside the executor, where the wait would
+    eat into their own timeout.
+    """
+    await _acquire_slot()
+    loop = asyncio.get_running_loop()
+    call = {"timed_out": False}
+
+    def release(cf):
+        try:
+            loop.call_soon_threadsafe(_release_slot, call, not cf.cancelled())
+        except RuntimeError:
+            pass  # event loop already closed (shutdown)
+
+    try:
+        cf = _EXECUTOR.submit(in_context(func))
+    except BaseException:
+        _release_slot(call, ran=False)
+        raise
+    cf.add_done_callback(release)
+    return asyncio.wrap_future(cf, loop=loop), call
+
+
+async def run_mentor_call(func, *args, timeout: float = MENTOR_TIMEOUT, **kwargs):
+    """Run a blocking mentor call on the mentor pool, bounded by the concurrency limit.
+
+    Raises asyncio.TimeoutError if the call does not finish within timeout seconds
+    (time spent waiting for a slot is not counted). The worker thread finishes in the
+    background, holding its slot until then; its result is discarded.
+    """
+    fut, call = await _submit(lambda: func(*args, **kwargs))
+    try:
+        return await asyncio.wait_for(fut, timeout=timeout)
+    except asyncio.TimeoutError:
+        _timed_out(call)
+        raise
+
+
+async def get_mentor_response_async(
+    insight_summary: dict,
+    user_question: Optional[str] = None,
+    student_id: Optional[str] = None,
+    student: Optional[dict] = None,
+    timeout: float = MENTOR_TIMEOUT,
+) -> str:
+    """Non-blocking get_mentor_response for async handlers."""
+    try:
+        return await run_mentor_call(
+            get_mentor_response, insight_summary, user_question, student_id, student, timeout=timeout
+        )
+    except asyncio.TimeoutError:
+        return f"AI error: the mentor did not respond within {timeout:g} seconds. Please try again."
+
+
+async def stream_mentor_response_async(
+    insight_summary: dict,
+    user_question: Optional[str] = None,
+    student_id: Optional[str] = None,
+    student: Optional[dict] = None,
+    timeout: float = MENTOR_TIMEOUT,
+) -> AsyncIterator[str]:
+    """Async iterator over stream_mentor_response; timeout applies between chunks."""
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    done = object()
+    cancelled = threading.Event()
+
+    def produce():
+        try:
+            for piece in stream_mentor_response(insight_summary, user_question, student_id, student):
+                if cancelled.is_set():
+                    break
+                loop.call_soon_threadsafe(queue.put_nowait, piece)
+        except Exception as e:
+            loop.call_soon_threadsafe(queue.put_nowait, f"AI error: {e}")
+        finally:
+            loop.call_soon_threadsafe(queue.put_nowait, done)
+
+    _, call = await _submit(produce)
+    try:
+        while True:
+            try:
+                item = await asyncio.wait_for(queue.get(), timeout=timeout)
+            except asyncio.TimeoutError:
+                _timed_out(call)
+                yield f"AI error: the mentor did not respond within {timeout:g} seconds. Please try again."
+                return
+            if item is done:
+                return
+            yield item
+    finally:
+        cancelled.set()  # client went away or timed out: stop pulling from Gemini (slot freed when produce returns)
+
+
+def mentor_stats() -> dict[str, Any]:
+    """Queue depth and call counters for the mentor pool."""
+    return {
+        **_STATS,
+        "max_concurrency": MENTOR_MAX_CONCURRENCY,
+        "timeout": MENTOR_TIMEOUT,
+        "response_cache": mentor_cache.stats(),
+        "client": mentor_client.state(),
+    }
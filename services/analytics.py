@@ -1,93 +1,642 @@
 """Analytics & ML engine: averages, correlation, weak subjects, risk."""
-import pandas as pd
-import numpy as np
-from scipy import stats
-from typing import Any
+from __future__ import annotations
 
+from array import array
+from bisect import bisect_left
+from itertools import chain
+from operator import itemgetter
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Optional
 
+from services.lazy import LazyModule
+from services.metrics import span, timed
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+else:  # loaded on first use (start-up warm-up imports them in the background)
+    np = LazyModule("numpy")
+    pd = LazyModule("pandas")
+
+
+def _widen_numeric(df: pd.DataFrame) -> pd.DataFrame:
+    """Aggregate in float64/int64 even when preprocess stored marks/attendance as float32/int8."""
+    wide = {}
+    for c in ("marks", "attendance_pct"):
+        if c in df.columns:
+            if df[c].dtype == np.float32:
+                wide[c] = np.float64
+            elif pd.api.types.is_integer_dtype(df[c].dtype) and df[c].dtype != np.int64:
+                wide[c] = np.int64
+    return df.astype(wide) if wide else df
+
+
+@timed("analytics.average_marks")
 def average_marks_by_student(df: pd.DataFrame) -> pd.DataFrame:
     """Average marks per student (and overall)."""
+    df = _widen_numeric(df)
     if "student_id" not in df.columns or "marks" not in df.columns:
         return pd.DataFrame()
-    agg = df.groupby("student_id").agg(
+    agg = df.groupby("student_id", observed=True).agg(
         avg_marks=("marks", "mean"),
         total_subjects=("subject", "nunique"),
     ).round(2)
     if "name" in df.columns:
-        names = df.groupby("student_id")["name"].first()
+        names = df.groupby("student_id", observed=True)["name"].first()
         agg = agg.assign(name=names)
     return agg.reset_index()
 
 
-def attendance_correlation(df: pd.DataFrame) -> dict[str, Any]:
-    """Correlation between attendance_pct and marks (overall and per subject)."""
+def _records(frame: pd.DataFrame) -> list[dict[str, Any]]:
+    """frame.to_dict(orient="records") built from column lists, so values are plain Python scalars."""
+    columns = list(frame.columns)
+    return [dict(zip(columns, row)) for row in zip(*(frame[c].tolist() for c in columns))]
+
+
+CORRELATION_METHODS = ("pearson", "spearman")
+
+
+def _corr_entry(r, p) -> dict[str, float]:
+    return {"correlation": round(float(r), 4), "p_value": round(float(p), 4)}
+
+
+def _grouped_comoments(x: pd.Series, y: pd.Series, key: pd.Series) -> pd.DataFrame:
+    """Per group, in first-seen order: rows, any-NaN flag and co-moments M2x, M2y, Cxy."""
+    frame = pd.DataFrame({"k": key, "x": x, "y": y})
+    g = frame.groupby("k", sort=False, observed=True)
+    dx = x - g["x"].transform("mean")
+    dy = y - g["y"].transform("mean")
+    dev = pd.DataFrame({"k": key, "xx": dx * dx, "yy": dy * dy, "xy": dx * dy, "nan": x.isna() | y.isna()})
+    return dev.groupby("k", sort=False, observed=True).agg(
+        rows=("xx", "size"), nan=("nan", "any"), m2x=("xx", "sum"), m2y=("yy", "sum"), cxy=("xy", "sum"),
+    )
+
+
+def _grouped_correlation(x: pd.Series, y: pd.Series, key: pd.Series, method: str) -> dict[str, dict]:
+    """r and p per group with at least 3 rows; groups with missing values get NaN (like pearsonr)."""
+    keep = key.notna()
+    x, y, key = x[keep], y[keep], key[keep]
+    if method == "spearman":
+        x = x.groupby(key, observed=True).rank()
+        y = y.groupby(key, observed=True).rank()
+    m = _grouped_comoments(x, y, key)
+    m = m[m["rows"] >= 3]
+    r, p = _pearson_from_moments(m["rows"].to_numpy(), m["m2x"].to_numpy(), m["m2y"].to_numpy(), m["cxy"].to_numpy())
+    nan = m["nan"].to_numpy()
+    r[nan] = np.nan
+    p[nan] = np.nan
+    return {str(k): _corr_entry(r[i], p[i]) for i, k in enumerate(m.index.tolist())}
+
+
+@timed("analytics.correlation")
+def attendance_correlation(
+    df: pd.DataFrame,
+    method: str = "pearson",
+    group_by: Iterable[str] = ("subject",),
+) -> dict[str, Any]:
+    """Correlation between attendance_pct and marks (overall and per subject).
+
+    Computed from grouped co-moments in one pass per grouping, with vectorized p-values
+    (same tests as scipy.stats.pearsonr / spearmanr). method="spearman" correlates ranks;
+    each column in group_by (e.g. "semester", "grade") gives a by_<column> section.
+    """
+    if method not in CORRELATION_METHODS:
+        raise ValueError(f"method must be one of {', '.join(CORRELATION_METHODS)}")
+    df = _widen_numeric(df)
     if "attendance_pct" not in df.columns or "marks" not in df.columns:
         return {"overall": None, "by_subject": {}}
-    r, p = stats.pearsonr(df["attendance_pct"], df["marks"])
-    by_subject = {}
-    for subj in df["subject"].dropna().unique():
-        s = df[df["subject"] == subj]
-        if len(s) >= 3:
-            r_s, p_s = stats.pearsonr(s["attendance_pct"], s["marks"])
-            by_subject[str(subj)] = {"correlation": round(float(r_s), 4), "p_value": round(float(p_s), 4)}
-    return {
-        "overall": {"correlation": round(float(r), 4), "p_value": round(float(p), 4)},
-        "by_subject": by_subject,
-    }
+    x = df["attendance_pct"].astype(float)
+    y = df["marks"].astype(float)
+    if method == "spearman":
+        xr, yr = x.rank(), y.rank()
+    else:
+        xr, yr = x, y
+    if x.isna().any() or y.isna().any():
+        overall = _corr_entry(np.nan, np.nan)
+    else:
+        dx, dy = xr - xr.mean(), yr - yr.mean()
+        overall = _corr_entry(*_pearson_from_moments(
+            len(df), float((dx * dx).sum()), float((dy * dy).sum()), float((dx * dy).sum())
+        ))
+    out: dict[str, Any] = {"overall": overall}
+    for col in group_by:
+        out[f"by_{col}"] = _grouped_correlation(x, y, df[col], method) if col in df.columns else {}
+    return out
 
 
+@timed("analytics.weak_subjects")
 def weak_subjects(df: pd.DataFrame, threshold: float = 50) -> dict[str, list[dict]]:
     """Detect weak subjects per student (marks below threshold)."""
-    if "student_id" not in df.columns or "marks" not in df.columns or "subject" not in df.columns:
+    df = _widen_numeric(df)
+    if "student_id" not in df.columns or "marks" not in df.columns or "subject" not in df.columns or df.empty:
         return {}
+    # Rows grouped by student (row order kept); weak rows located per group by offset
+    order, starts = _group_bounds(df)
+    keys = df["student_id"].to_numpy()[order][starts[:-1]].tolist()
+    marks = df["marks"].to_numpy()[order]
+    weak_rows = np.flatnonzero(marks < threshold)
+    subjects = df["subject"].to_numpy()[order][weak_rows].tolist()
+    weak_marks = [round(float(m), 2) for m in marks[weak_rows].tolist()]
+    cut = np.searchsorted(weak_rows, starts).tolist()
     out = {}
-    for sid, g in df.groupby("student_id"):
-        weak = g[g["marks"] < threshold][["subject", "marks"]].to_dict("records")
-        for r in weak:
-            r["marks"] = round(float(r["marks"]), 2)
-        out[str(sid)] = weak
+    for i, sid in enumerate(keys):
+        lo, hi = cut[i], cut[i + 1]
+        out[str(sid)] = [{"subject": s, "marks": m} for s, m in zip(subjects[lo:hi], weak_marks[lo:hi])]
     return out
 
 
+def _group_bounds(df: pd.DataFrame, key: str = "student_id") -> tuple[np.ndarray, np.ndarray]:
+    """Stable row order grouped by key (sorted like groupby) and group start offsets."""
+    codes = df.groupby(key, sort=True, observed=True).ngroup().to_numpy()
+    order = np.argsort(codes, kind="stable")
+    counts = np.bincount(codes, minlength=int(codes.max()) + 1 if len(codes) else 0)
+    starts = np.concatenate(([0], np.cumsum(counts)))
+    return order, starts
+
+
+def _segment_means(values: np.ndarray, starts: np.ndarray) -> np.ndarray:
+    """Mean of each values[starts[i]:starts[i + 1]], bit for bit what Series.mean() gives.
+
+    Series.mean sums the NaN-filled values with numpy's pairwise summation, which
+    groupby mean and np.add.reduceat don't reproduce (so .xx5 means can round the
+    other way). Segments of equal length are stacked into one matrix and summed
+    along its rows, which takes the same pairwise path for each row.
+    """
+    values = np.asarray(values)
+    if values.dtype.kind == "f":
+        missing = np.isnan(values)
+        filled = np.where(missing, 0, values)
+    else:
+        missing = np.zeros(len(values), dtype=bool)
+        filled = values.astype(np.float64)
+    lengths = np.diff(starts)
+    sums = np.empty(len(lengths), dtype=filled.dtype)
+    for n in np.unique(lengths).tolist():
+        seg = np.flatnonzero(lengths == n)
+        sums[seg] = filled[starts[seg][:, None] + np.arange(n)].sum(axis=1)
+    counts = np.add.reduceat((~missing).astype(np.int64), starts[:-1]) if len(values) else np.zeros(0, np.int64)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return sums / counts.astype(filled.dtype)
+
+
 def risk_analysis(df: pd.DataFrame) -> pd.DataFrame:
     """Risk flags: low attendance, low average, multiple weak subjects."""
-    avg_df = average_marks_by_student(df)
-    if avg_df.empty:
-        return pd.DataFrame()
+    return pd.DataFrame(risk_records(df))
+
+
+@timed("analytics.risk")
+def risk_records(df: pd.DataFrame) -> list[dict[str, Any]]:
+    """risk_analysis as a list of records with plain Python values (None for missing attendance)."""
+    df = _widen_numeric(df)
+    if "student_id" not in df.columns or "marks" not in df.columns or df.empty:
+        return []
+
+    # One grouped aggregation for averages and names
+    spec = {"avg_marks": ("marks", "mean")}
+    if "name" in df.columns:
+        spec["name"] = ("name", "first")
+    agg = df.groupby("student_id", sort=True, observed=True).agg(**spec)
+    avg_m = agg["avg_marks"].round(2).tolist()
+
+    # Per-student row slices (row order preserved) for attendance, weak subjects and subject marks
+    has_subject = "subject" in df.columns
+    order, starts = _group_bounds(df)
+    att = None
+    if "attendance_pct" in df.columns:
+        att = _segment_means(df["attendance_pct"].to_numpy()[order], starts).tolist()
+    marks = df["marks"].to_numpy()[order]
+    subjects = df["subject"].to_numpy()[order] if has_subject else None
+    weak_mask = marks < 50
+    weak_counts = (np.add.reduceat(weak_mask.astype(np.int64), starts[:-1]) if len(marks) else np.zeros(0, int)).tolist()
+    starts = starts.tolist()
+    marks_list = marks.tolist()
+    subjects_list = subjects.tolist() if has_subject else None
 
+    names = agg["name"].tolist() if "name" in agg.columns else [""] * len(agg)
     risk_list = []
-    for _, row in avg_df.iterrows():
-        sid = row["student_id"]
-        student_df = df[df["student_id"] == sid]
-        avg_m = row["avg_marks"]
-        att = student_df["attendance_pct"].mean() if "attendance_pct" in student_df.columns else None
-        weak = [s for s in weak_subjects(df, threshold=50).get(str(sid), [])]
-        
-        # Calculate subject-wise marks for this student
+    for i, sid in enumerate(agg.index.tolist()):
+        lo, hi = starts[i], starts[i + 1]
+        weak = []
         subject_marks = []
-        if "subject" in student_df.columns and "marks" in student_df.columns:
-            subject_marks = student_df[["subject", "marks"]].to_dict(orient="records")
-
+        if has_subject:
+            subs = subjects_list[lo:hi]
+            mks = marks_list[lo:hi]
+            subject_marks = [{"subject": s, "marks": m} for s, m in zip(subs, mks)]
+            if weak_counts[i]:
+                weak = [s for s, m in zip(subs, mks) if m < 50]
+        a = None if att is None or att[i] != att[i] else round(att[i], 2)  # NaN: no attendance recorded
         risk_list.append({
             "student_id": sid,
-            "name": row.get("name", ""),
-            "avg_marks": round(avg_m, 2),
-            "attendance_avg": round(float(att), 2) if att is not None and not np.isnan(att) else None,
+            "name": names[i],
+            "avg_marks": round(avg_m[i], 2),
+            "attendance_avg": a,
             "weak_subject_count": len(weak),
-            "weak_subjects": [w["subject"] for w in weak],
+            "weak_subjects": weak,
             "subject_marks": subject_marks,
-            "risk_low_marks": avg_m < 55,
-            "risk_low_attendance": att is not None and att < 75,
+            "risk_low_marks": avg_m[i] < 55,
+            "risk_low_attendance": a is not None and att[i] < 75,
             "risk_multiple_weak": len(weak) >= 2,
         })
-    return pd.DataFrame(risk_list)
+    return risk_list
 
 
+@timed("analytics.run")
 def run_analytics(df: pd.DataFrame) -> dict[str, Any]:
     """Run full analytics pipeline and return a single dict."""
+    df = _widen_numeric(df)
     return {
-        "average_marks": average_marks_by_student(df).to_dict(orient="records"),
+        "average_marks": _records(average_marks_by_student(df)),
         "attendance_correlation": attendance_correlation(df),
         "weak_subjects": weak_subjects(df, threshold=50),
-        "risk_analysis": risk_analysis(df).to_dict(orient="records"),
+        "risk_analysis": risk_records(df),
     }
+
+
+def _pearson_from_moments(n, m2x, m2y, cxy) -> tuple[np.ndarray, np.ndarray]:
+    """Pearson r and two-sided p-value from co-moments (vectorized, same test as scipy.stats.pearsonr)."""
+    from scipy import special  # imported on first use: it is most of scipy's startup cost
+
+    n = np.asarray(n, dtype=float)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        r = np.clip(np.asarray(cxy, dtype=float) / np.sqrt(np.asarray(m2x, dtype=float) * m2y), -1.0, 1.0)
+        ab = n / 2 - 1
+        p = np.clip(2 * special.betainc(ab, ab, 0.5 * (1 - np.abs(r))), 0.0, 1.0)
+    p = np.where(n == 2, 1.0, p)  # two points always fit a line
+    return r, p
+
+
+def _id_text(sid: Any) -> str:
+    """Text form of a student id read as a number (1.0 from a chunk with blank ids is "1")."""
+    if isinstance(sid, float) and sid.is_integer():
+        return str(int(sid))
+    return str(sid)
+
+
+STATE_VERSION = 3
+
+
+def _missing(value: Any) -> bool:
+    return value is None or value != value  # NaN: no name on any row read so far
+
+
+class _StudentState:
+    """One student's rows in row order (subject, marks and attendance, the numbers as
+    arrays of doubles with NaN for missing attendance) and the first name seen."""
+
+    __slots__ = ("name", "subjects", "marks", "attendance")
+
+    def __init__(self):
+        self.name = None
+        self.subjects: list = []
+        self.marks = array("d")
+        self.attendance = array("d")
+
+    def merge(self, other: "_StudentState") -> None:
+        if _missing(self.name):
+            self.name = other.name
+        self.subjects.extend(other.subjects)
+        self.marks.extend(other.marks)
+        self.attendance.extend(other.attendance)
+
+    def to_list(self) -> list:
+        return [self.name, self.subjects, self.marks.tolist(), self.attendance.tolist()]
+
+    @classmethod
+    def from_list(cls, values: list) -> "_StudentState":
+        st = cls()
+        st.name, subjects, marks, attendance = values
+        st.subjects = list(subjects)
+        st.marks = array("d", marks)
+        st.attendance = array("d", attendance)
+        return st
+
+
+class AnalyticsAccumulator:
+    """Running analytics state fed chunk by chunk; result() matches run_analytics on the full frame.
+
+    Per student (_StudentState): each row's subject, marks and attendance in row order
+    and the first name. subject_marks lists every row, so the rows are kept anyway (about
+    24 bytes each); averages are taken from them with the same reductions run_analytics
+    uses, so the student records match it exactly. Marks are listed as integers unless
+    some chunk read them as floats, as pandas types the column for the whole file. Per
+    subject and overall: Pearson co-moments [n, mean_x, mean_y, M2x, M2y, Cxy] of
+    attendance vs marks, merged across chunks with the pairwise (Chan et al.) update.
+
+    Each chunk is typed on its own, so ids read as numbers in one chunk can be text
+    ("S99") in the next; once any id is text, all ids are kept as text, as pandas does
+    when it reads the whole file.
+
+    The ids touched since the last take_changed() are tracked, so an append can patch
+    the previous result (patch()) and persist (to_state(ids)) only those students.
+    """
+
+    def __init__(self, weak_threshold: float = 50):
+        self.weak_threshold = weak_threshold
+        self.students: dict = {}
+        self.text_ids = False
+        self.subject_moments: dict = {}
+        self.overall_moments = None
+        self.subject_rows: dict = {}  # subject -> row count, in first-seen order
+        self.nan_subjects: set = set()
+        self.overall_nan = False
+        self.has_name = False
+        self.has_attendance = False
+        self.float_marks = False
+        self.changed: Optional[set] = set()  # None: every id changed (they were turned to text)
+
+    def _promote_ids(self) -> None:
+        """Switch every stored id to text (done at most once)."""
+        self.text_ids = True
+        self.students = {_id_text(sid): st for sid, st in self.students.items()}
+        self.changed = None
+
+    def _touch(self, sid: Any) -> None:
+        if self.changed is not None:
+            self.changed.add(sid)
+
+    def take_changed(self) -> Optional[set]:
+        """Ids updated since the last call (None: all of them), and start tracking afresh."""
+        changed, self.changed = self.changed, set()
+        return changed
+
+    def _id_key(self, ids: list) -> Callable[[Any], Any]:
+        """Mapping from a chunk's ids to stored keys (identity unless ids are text)."""
+        if not self.text_ids and any(isinstance(sid, str) for sid in ids):
+            self._promote_ids()
+        if self.text_ids:
+            return lambda sid: sid if isinstance(sid, str) else _id_text(sid)
+        return lambda sid: sid
+
+    @staticmethod
+    def _merge_moments(a, b):
+        if a is None:
+            return b
+        n = a[0] + b[0]
+        dx, dy = b[1] - a[1], b[2] - a[2]
+        f = a[0] * b[0] / n
+        return [
+            n,
+            a[1] + dx * b[0] / n,
+            a[2] + dy * b[0] / n,
+            a[3] + b[3] + dx * dx * f,
+            a[4] + b[4] + dy * dy * f,
+            a[5] + b[5] + dx * dy * f,
+        ]
+
+    def _update_moments(self, df: pd.DataFrame) -> None:
+        counts = df["subject"].value_counts()
+        for subj in pd.unique(df["subject"].dropna()):
+            self.subject_rows[subj] = self.subject_rows.get(subj, 0) + int(counts[subj])
+        nan_rows = df["attendance_pct"].isna()
+        if nan_rows.any():
+            self.overall_nan = True
+            self.nan_subjects.update(df.loc[nan_rows, "subject"].dropna().tolist())
+            df = df[~nan_rows]
+        if df.empty:
+            return
+        x = df["attendance_pct"].astype(float)
+        y = df["marks"].astype(float)
+        xm, ym = x - x.mean(), y - y.mean()
+        self.overall_moments = self._merge_moments(self.overall_moments, [
+            float(len(df)), float(x.mean()), float(y.mean()),
+            float((xm * xm).sum()), float((ym * ym).sum()), float((xm * ym).sum()),
+        ])
+        g = pd.DataFrame({"subject": df["subject"], "x": x, "y": y}).groupby("subject", sort=False, observed=True)
+        n = g["x"].count()
+        mx, my = g["x"].mean(), g["y"].mean()
+        dx = x - g["x"].transform("mean")
+        dy = y - g["y"].transform("mean")
+        dev = pd.DataFrame({"subject": df["subject"], "xx": dx * dx, "yy": dy * dy, "xy": dx * dy})
+        sums = dev.groupby("subject", sort=False, observed=True)[["xx", "yy", "xy"]].sum()
+        for subj, cnt, a, b, xx, yy, xy in zip(
+            n.index, n.to_numpy(), mx.to_numpy(), my.to_numpy(),
+            sums["xx"].to_numpy(), sums["yy"].to_numpy(), sums["xy"].to_numpy(),
+        ):
+            self.subject_moments[subj] = self._merge_moments(
+                self.subject_moments.get(subj),
+                [float(cnt), float(a), float(b), float(xx), float(yy), float(xy)],
+            )
+
+    def update(self, df: pd.DataFrame) -> "AnalyticsAccumulator":
+        """Fold a preprocessed chunk into the running state."""
+        if df.empty or "student_id" not in df.columns or "marks" not in df.columns:
+            return self
+        df = _widen_numeric(df)
+        self.has_name = self.has_name or "name" in df.columns
+        has_att = "attendance_pct" in df.columns
+        self.has_attendance = self.has_attendance or has_att
+        if has_att and "subject" in df.columns:
+            self._update_moments(df)
+
+        self.float_marks = self.float_marks or df["marks"].dtype.kind == "f"
+
+        # Rows grouped by student, row order kept within each student
+        order, starts = _group_bounds(df)
+        ids = df["student_id"].to_numpy()[order][starts[:-1]].tolist()
+        names = df.groupby("student_id", sort=True, observed=True)["name"].first().tolist() if "name" in df.columns else None
+        marks = df["marks"].to_numpy(dtype=float)[order].tolist()
+        att = df["attendance_pct"].to_numpy(dtype=float)[order].tolist() if has_att else [np.nan] * len(marks)
+        subjects = df["subject"].to_numpy()[order].tolist() if "subject" in df.columns else None
+        starts = starts.tolist()
+        key = self._id_key(ids)
+        students = self.students
+        for i, sid in enumerate(ids):
+            sid = key(sid)
+            st = students.get(sid)
+            if st is None:
+                st = students[sid] = _StudentState()
+            self._touch(sid)
+            lo, hi = starts[i], starts[i + 1]
+            st.marks.extend(marks[lo:hi])
+            st.attendance.extend(att[lo:hi])
+            if subjects is not None:
+                st.subjects.extend(subjects[lo:hi])
+            if names is not None and _missing(st.name):
+                st.name = names[i]
+        return self
+
+    def merge(self, other: "AnalyticsAccumulator") -> "AnalyticsAccumulator":
+        """Fold in state built from rows that come after ours (e.g. the next shard of a file)."""
+        key = self._id_key(list(other.students))
+        for sid, st in other.students.items():
+            sid = key(sid)
+            mine = self.students.get(sid)
+            if mine is None:
+                mine = self.students[sid] = _StudentState()
+            self._touch(sid)
+            mine.merge(st)
+        for subj, m in other.subject_moments.items():
+            self.subject_moments[subj] = self._merge_moments(self.subject_moments.get(subj), m)
+        if other.overall_moments is not None:
+            self.overall_moments = self._merge_moments(self.overall_moments, other.overall_moments)
+        for subj, cnt in other.subject_rows.items():
+            self.subject_rows[subj] = self.subject_rows.get(subj, 0) + cnt
+        self.nan_subjects |= other.nan_subjects
+        self.overall_nan = self.overall_nan or other.overall_nan
+        self.has_name = self.has_name or other.has_name
+        self.has_attendance = self.has_attendance or other.has_attendance
+        self.float_marks = self.float_marks or other.float_marks
+        return self
+
+    def _correlation(self) -> dict[str, Any]:
+        if not self.has_attendance:
+            return {"overall": None, "by_subject": {}}
+
+        m = self.overall_moments
+        if self.overall_nan or m is None:
+            overall = _corr_entry(np.nan, np.nan)
+        else:
+            overall = _corr_entry(*_pearson_from_moments(m[0], m[3], m[4], m[5]))
+        names = [s for s, cnt in self.subject_rows.items() if cnt >= 3]
+        by_subject = {}
+        if names:
+            mom = np.array([self.subject_moments.get(s, [0.0] * 6) for s in names])
+            r, p = _pearson_from_moments(mom[:, 0], mom[:, 3], mom[:, 4], mom[:, 5])
+            for i, subj in enumerate(names):
+                if subj in self.nan_subjects:
+                    by_subject[str(subj)] = _corr_entry(np.nan, np.nan)
+                else:
+                    by_subject[str(subj)] = _corr_entry(r[i], p[i])
+        return {"overall": overall, "by_subject": by_subject}
+
+    def to_state(self, ids: Optional[Iterable] = None) -> dict[str, Any]:
+        """JSON-serializable state (keys kept as [key, value] pairs to preserve their types).
+
+        With ids, only those students' entries are included (plus the per-subject parts,
+        which are small): a patch for from_state(state, patches).
+        """
+        students = self.students.items() if ids is None else ((sid, self.students[sid]) for sid in ids)
+        return {
+            "version": STATE_VERSION,
+            "weak_threshold": self.weak_threshold,
+            "text_ids": self.text_ids,
+            "students": [[sid, *st.to_list()] for sid, st in students],
+            "subject_moments": [[k, v] for k, v in self.subject_moments.items()],
+            "overall_moments": self.overall_moments,
+            "subject_rows": [[k, v] for k, v in self.subject_rows.items()],
+            "nan_subjects": list(self.nan_subjects),
+            "overall_nan": self.overall_nan,
+            "has_name": self.has_name,
+            "has_attendance": self.has_attendance,
+            "float_marks": self.float_marks,
+        }
+
+    @classmethod
+    def from_state(cls, state: dict[str, Any], patches: Iterable[dict[str, Any]] = ()) -> "AnalyticsAccumulator":
+        """Rebuild an accumulator saved with to_state(), then apply to_state(ids) patches in
+        order; ValueError for another state version."""
+        acc = cls(weak_threshold=state["weak_threshold"])
+        for s in (state, *patches):
+            if s.get("version") != STATE_VERSION:
+                raise ValueError(f"unsupported analytics state version: {s.get('version')}")
+            acc.text_ids = s["text_ids"]
+            acc.students.update((entry[0], _StudentState.from_list(entry[1:])) for entry in s["students"])
+            acc.subject_moments = {k: v for k, v in s["subject_moments"]}
+            acc.overall_moments = s["overall_moments"]
+            acc.subject_rows = {k: v for k, v in s["subject_rows"]}
+            acc.nan_subjects = set(s["nan_subjects"])
+            acc.overall_nan = s["overall_nan"]
+            acc.has_name = s["has_name"]
+            acc.has_attendance = s["has_attendance"]
+            acc.float_marks = s["float_marks"]
+        return acc
+
+    def _student_records(self, sids: list) -> list[tuple[dict, list[dict], dict]]:
+        """(average_marks record, weak_subjects entry, risk_analysis record) per student in sids."""
+        states = [self.students[sid] for sid in sids]
+        lengths = [len(st.marks) for st in states]
+        total = sum(lengths)
+        starts = np.concatenate(([0], np.cumsum(lengths, dtype=np.int64)))
+        marks = np.fromiter(chain.from_iterable(st.marks for st in states), dtype=float, count=total)
+        # Grouped mean, as average_marks_by_student and risk_records take it
+        avg = pd.Series(marks).groupby(np.repeat(np.arange(len(states)), lengths)).mean().round(2).tolist()
+        att = None
+        if self.has_attendance:
+            att = _segment_means(
+                np.fromiter(chain.from_iterable(st.attendance for st in states), dtype=float, count=total), starts
+            ).tolist()
+        threshold = self.weak_threshold
+        out = []
+        for i, (sid, st) in enumerate(zip(sids, states)):
+            avg_m = avg[i]
+            rows = list(zip(st.subjects, st.marks if self.float_marks else map(int, st.marks)))
+            weak = [(s, m) for s, m in rows if m < threshold]
+            rec = {"student_id": sid, "avg_marks": avg_m, "total_subjects": len(set(st.subjects))}
+            if self.has_name:
+                rec["name"] = st.name
+            a = None if att is None or att[i] != att[i] else round(att[i], 2)
+            risk = {
+                "student_id": sid,
+                "name": st.name if self.has_name else "",
+                "avg_marks": round(avg_m, 2),
+                "attendance_avg": a,
+                "weak_subject_count": len(weak),
+                "weak_subjects": [s for s, _ in weak],
+                "subject_marks": [{"subject": s, "marks": m} for s, m in rows],
+                "risk_low_marks": avg_m < 55,
+                "risk_low_attendance": a is not None and att[i] < 75,
+                "risk_multiple_weak": len(weak) >= 2,
+            }
+            out.append((rec, [{"subject": s, "marks": round(float(m), 2)} for s, m in weak], risk))
+        return out
+
+    def result(self) -> dict[str, Any]:
+        """Analytics dict in the same shape as run_analytics."""
+        average_marks, weak_map, risk_list = [], {}, []
+        sids = sorted(self.students)
+        for sid, (rec, weak_entry, risk) in zip(sids, self._student_records(sids)):
+            average_marks.append(rec)
+            weak_map[str(sid)] = weak_entry
+            risk_list.append(risk)
+        return {
+            "average_marks": average_marks,
+            "attendance_correlation": self._correlation(),
+            "weak_subjects": weak_map,
+            "risk_analysis": risk_list,
+        }
+
+    def patch(self, analytics: dict[str, Any], ids: Iterable) -> Optional[tuple[dict[str, Any], list[tuple]]]:
+        """Bring analytics (result() from before ids were updated) up to date by recomputing
+        only those students' records; the lists are copied, not changed in place.
+
+        Returns (analytics, changes), changes being (position, inserted, old risk record,
+        new risk record) in the order they were applied to risk_analysis, or None when
+        analytics does not line up with this state (e.g. ids of another type).
+        """
+        average = list(analytics["average_marks"])
+        risk = list(analytics["risk_analysis"])
+        weak_map = dict(analytics["weak_subjects"])
+        changes = []
+        by_id = itemgetter("student_id")
+        try:
+            sids = sorted(ids)
+            for sid, (rec, weak_entry, new) in zip(sids, self._student_records(sids)):
+                i = bisect_left(risk, sid, key=by_id)
+                if i < len(risk) and risk[i]["student_id"] == sid:
+                    changes.append((i, False, risk[i], new))
+                    average[i], risk[i] = rec, new
+                else:
+                    changes.append((i, True, None, new))
+                    average.insert(i, rec)
+                    risk.insert(i, new)
+                weak_map[str(sid)] = weak_entry
+        except TypeError:  # int and str ids do not compare
+            return None
+        if len(risk) != len(self.students) or len(average) != len(risk):
+            return None
+        return {
+            "average_marks": average,
+            "attendance_correlation": self._correlation(),
+            "weak_subjects": weak_map,
+            "risk_analysis": risk,
+        }, changes
+
+
+def run_analytics_chunked(chunks: Iterable[pd.DataFrame]) -> dict[str, Any]:
+    """run_analytics over an iterable of preprocessed chunks, holding only running state."""
+    acc = AnalyticsAccumulator()
+    with span("analytics.chunked") as s:
+        s.rows = 0
+        for chunk in chunks:
+            acc.update(chunk)
+            s.rows += len(chunk)
+        return acc.result()
@@ -0,0 +1,279 @@
+"""Insights cache: reuse analytics results while the source CSV is unchanged."""
+import logging
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+from itertools import islice
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+from config import (
+    CORRELATION_CACHE_MAX_ENTRIES,
+    INSIGHTS_CACHE_MAX_BYTES,
+    INSIGHTS_CACHE_MAX_ENTRIES,
+    INSIGHTS_CACHE_TTL,
+    MENTOR_CACHE_DB,
+    MENTOR_CACHE_MAX_ENTRIES,
+    MENTOR_CACHE_TTL,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def file_fingerprint(path: Path) -> tuple[str, int, int]:
+    """Cache key for a file: resolved path + mtime (ns) + size."""
+    st = path.stat()
+    return (str(path.resolve()), st.st_mtime_ns, st.st_size)
+
+
+_SIZE_SAMPLE = 16
+
+
+def _approx_size(obj: Any, seen: Optional[set] = None) -> int:
+    """Rough in-memory size of nested containers or plain objects (bytes).
+
+    Containers longer than _SIZE_SAMPLE are estimated from an evenly spaced sample of
+    their elements, so sizing a large result stays cheap. Objects reached more than once
+    (dict keys, lists shared between insights["students"] and raw_analytics) count once.
+    """
+    if seen is None:
+        seen = set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, (str, bytes, int, float, bool)) or obj is None:
+        return size
+    if isinstance(obj, dict):
+        n = len(obj)
+        if not n:
+            return size
+        step = max(1, n // _SIZE_SAMPLE)
+        sample = [_approx_size(k, seen) + _approx_size(v, seen) for k, v in islice(obj.items(), 0, None, step)]
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        n = len(obj)
+        if not n:
+            return size
+        step = max(1, n // _SIZE_SAMPLE)
+        sample = [_approx_size(o, seen) for o in islice(obj, 0, None, step)]
+    elif hasattr(obj, "__dict__"):
+        return size + _approx_size(vars(obj), seen)
+    else:
+        return size
+    return size + sum(sample) * n // len(sample)
+
+
+class ReadOnlyDict(dict):
+    """dict that refuses in-place changes; cached dicts are shared by every request that hits them."""
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError("cached value is read-only; copy it ({**value}) before changing it")
+
+    __setitem__ = __delitem__ = __ior__ = _read_only
+    clear = pop = popitem = setdefault = update = _read_only
+
+    def __reduce__(self):
+        return (ReadOnlyDict, (dict(self),))
+
+
+def _freeze(value: Any) -> Any:
+    """Read-only view of a dict value and of its dict sections (e.g. insights["summary"]).
+
+    Only these two levels are copied (a handful of keys), so caching stays cheap; the
+    lists and records below them are shared as well and must not be mutated either.
+    """
+    if not isinstance(value, dict) or isinstance(value, ReadOnlyDict):
+        return value
+    return ReadOnlyDict(
+        {k: ReadOnlyDict(v) if type(v) is dict else v for k, v in value.items()}
+    )
+
+
+class InsightsCache:
+    """LRU cache bounded by entry count and approximate bytes, with optional TTL.
+
+    Dict values are stored read-only (see _freeze): get() hands every caller the same
+    object, so a handler that wants to add keys must build a new dict.
+    """
+
+    def __init__(self, max_entries: int = 16, max_bytes: int = 256 * 1024 * 1024, ttl: float = 0, name: str = "insights"):
+        self.name = name  # for log messages
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._data: OrderedDict = OrderedDict()  # key -> (value, size, stored_at)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.oversized = 0  # puts refused because the value alone exceeds max_bytes
+
+    def get(self, key) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, size, stored_at = entry
+            if self.ttl and time.monotonic() - stored_at > self.ttl:
+                self._drop(key)
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value: Any) -> None:
+        size = _approx_size(value)
+        if size > self.max_bytes:
+            # Too big to cache at all: every lookup for this key will recompute it
+            with self._lock:
+                if key in self._data:
+                    self._drop(key)
+                self.oversized += 1
+            logger.warning(
+                "%s cache: value of about %d MB exceeds max_bytes (%d MB) and is not cached",
+                self.name, size >> 20, self.max_bytes >> 20,
+            )
+            return
+        with self._lock:
+            if key in self._data:
+                self._drop(key)
+            self._data[key] = (_freeze(value), size, time.monotonic())
+            self._bytes += size
+            while len(self._data) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._data))
+                self._drop(oldest)
+                self.evictions += 1
+
+    def get_or_compute(self, key, compute: Callable[[], Any]) -> Any:
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def invalidate(self, path: Path) -> None:
+        """Drop every entry built from this file (any mtime/size)."""
+        target = str(path.resolve())
+        with self._lock:
+            for key in [k for k in self._data if k[0] == target]:
+                self._drop(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def _drop(self, key) -> None:
+        _, size, _ = self._data.pop(key)
+        self._bytes -= size
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._data),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "oversized": self.oversized,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+class ResponseCache(InsightsCache):
+    """String-keyed text cache; optionally backed by SQLite so entries survive restarts."""
+
+    def __init__(self, db_path: str = "", **kwargs):
+        super().__init__(**kwargs)
+        self.disk_hits = 0
+        self._db = None
+        if db_path:
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, value TEXT, stored_at REAL)"
+            )
+            self._db.commit()
+        self._db_lock = threading.Lock()
+
+    def get(self, key):
+        value = super().get(key)
+        if value is not None or self._db is None:
+            return value
+        with self._db_lock:
+            row = self._db.execute("SELECT value, stored_at FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None or (self.ttl and time.time() - row[1] > self.ttl):
+            return None
+        with self._lock:
+            # Counted as a miss by the memory layer; it was served from disk
+            self.misses -= 1
+            self.hits += 1
+            self.disk_hits += 1
+        super().put(key, row[0])
+        return row[0]
+
+    def put(self, key, value) -> None:
+        super().put(key, value)
+        if self._db is None:
+            return
+        with self._db_lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, value, stored_at) VALUES (?, ?, ?)",
+                (key, value, time.time()),
+            )
+            # Keep the table bounded like the memory layer
+            self._db.execute(
+                "DELETE FROM responses WHERE key NOT IN "
+                "(SELECT key FROM responses ORDER BY stored_at DESC LIMIT ?)",
+                (self.max_entries,),
+            )
+            self._db.commit()
+
+    def stats(self) -> dict[str, Any]:
+        return {**super().stats(), "disk_hits": self.disk_hits, "persistent": self._db is not None}
+
+
+insights_cache = InsightsCache(
+    max_entries=INSIGHTS_CACHE_MAX_ENTRIES,
+    max_bytes=INSIGHTS_CACHE_MAX_BYTES,
+    ttl=INSIGHTS_CACHE_TTL,
+)
+
+# /api/correlation results per file fingerprint, method and grouping
+correlation_cache = InsightsCache(
+    name="correlation",
+    max_entries=CORRELATION_CACHE_MAX_ENTRIES,
+    max_bytes=INSIGHTS_CACHE_MAX_BYTES,
+    ttl=INSIGHTS_CACHE_TTL,
+)
+
+# Incremental analytics state (AnalyticsAccumulator) per file fingerprint, for appends
+analytics_states = InsightsCache(
+    name="analytics_states",
+    max_entries=INSIGHTS_CACHE_MAX_ENTRIES,
+    max_bytes=INSIGHTS_CACHE_MAX_BYTES,
+    ttl=INSIGHTS_CACHE_TTL,
+)
+
+# InsightIndex (sort orders / filters) per file fingerprint, for paginated queries
+insight_indexes = InsightsCache(
+    name="insight_indexes",
+    max_entries=INSIGHTS_CACHE_MAX_ENTRIES,
+    max_bytes=INSIGHTS_CACHE_MAX_BYTES,
+    ttl=INSIGHTS_CACHE_TTL,
+)
+
+# Mentor (Gemini) responses keyed by hash of model, data context, student and question
+mentor_cache = ResponseCache(
+    name="mentor",
+    db_path=MENTOR_CACHE_DB,
+    max_entries=MENTOR_CACHE_MAX_ENTRIES,
+    max_bytes=INSIGHTS_CACHE_MAX_BYTES,
+    ttl=MENTOR_CACHE_TTL,
+)
@@ -1,9 +1,26 @@
 """Data ingestion and preprocessing (cleaning, formatting)."""
-import pandas as pd
+from __future__ import annotations
+
+import codecs
+import csv
+import io
+import os
+import shutil
 from pathlib import Path
-from typing import Optional
+from typing import TYPE_CHECKING, BinaryIO, Iterator, Optional
+
+from config import UPLOAD_DIR, SAMPLE_CSV, CSV_CHUNK_ROWS, DATASET_SNAPSHOTS
+from services.cache import correlation_cache, insights_cache
+from services.lazy import LazyModule
+from services.metrics import span, timed
+from services.snapshot import prune_snapshots, read_snapshot, remove_snapshot, write_snapshot
 
-from config import UPLOAD_DIR, SAMPLE_CSV
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+else:  # loaded on first use (start-up warm-up imports them in the background)
+    np = LazyModule("numpy")
+    pd = LazyModule("pandas")
 
 # Map common CSV header variants to our expected column names (lowercase for match)
 COLUMN_ALIASES = {
@@ -17,6 +34,7 @@ COLUMN_ALIASES = {
 }
 
 
+@timed("ingestion.normalize_columns")
 def _normalize_columns(df: pd.DataFrame) -> pd.DataFrame:
     """Map common column names to expected names (student_id, name, subject, marks, attendance_pct, etc.)."""
     df = df.copy()
@@ -24,10 +42,11 @@ def _normalize_columns(df: pd.DataFrame) -> pd.DataFrame:
     for col in df.columns:
         c = str(col).strip()
         c_lower = c.lower()
-        if c_lower in [k.lower() for k in COLUMN_ALIASES.keys()]:
+        if col in COLUMN_ALIASES:
             continue  # already canonical
         for canonical, aliases in COLUMN_ALIASES.items():
-            if c_lower in [a.lower() for a in aliases]:
+            # "MARKS" / " Subject " are the canonical name in another case or with padding
+            if c_lower == canonical or c_lower in [a.lower() for a in aliases]:
                 if canonical not in new_names.values() and canonical not in df.columns:
                     new_names[col] = canonical
                 break
@@ -36,46 +55,113 @@ def _normalize_columns(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
+SNIFF_BYTES = 64 * 1024
+DELIMITERS = ",;\t"
+
+
+def sniff_format(path: Path) -> dict[str, str]:
+    """Guess encoding (BOM / UTF-8 check) and delimiter (csv.Sniffer) from the start of the file."""
+    with open(path, "rb") as f:
+        sample = f.read(SNIFF_BYTES)
+    if sample.startswith(codecs.BOM_UTF8):
+        encoding = "utf-8-sig"
+    elif sample.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        encoding = "utf-16"
+    else:
+        try:
+            # Not final: a multi-byte character cut at the sample edge is fine
+            codecs.getincrementaldecoder("utf-8")().decode(sample)
+            encoding = "utf-8"
+        except UnicodeDecodeError:
+            encoding = "latin-1"
+    lines = sample.decode(encoding, errors="ignore").splitlines()
+    if len(sample) == SNIFF_BYTES and len(lines) > 1:
+        lines = lines[:-1]  # last line may be cut off
+    try:
+        delimiter = csv.Sniffer().sniff("\n".join(lines[:50]), delimiters=DELIMITERS).delimiter
+    except csv.Error:
+        delimiter = ","
+    return {"encoding": encoding, "delimiter": delimiter}
+
+
+def _read_csv(p: Path, fmt: dict[str, str], **kwargs):
+    """pd.read_csv with a sniffed format; falls back to latin-1 if non-UTF-8 bytes appear past the sample."""
+    try:
+        return pd.read_csv(p, encoding=fmt["encoding"], sep=fmt["delimiter"], **kwargs)
+    except UnicodeDecodeError:
+        fmt["encoding"] = "latin-1"
+        return pd.read_csv(p, encoding="latin-1", sep=fmt["delimiter"], **kwargs)
+
+
 def load_csv(path: Optional[Path] = None) -> pd.DataFrame:
-    """Load student CSV from path or use sample."""
+    """Load student CSV from path or use sample.
+
+    The detected format is kept in df.attrs["csv_format"] (encoding, delimiter).
+    """
     p = path or SAMPLE_CSV
     if not p.exists():
         raise FileNotFoundError(f"CSV not found: {p}")
-    for encoding in ("utf-8", "latin-1", "cp1252"):
-        try:
-            df = pd.read_csv(p, encoding=encoding)
-            break
-        except UnicodeDecodeError:
-            continue
-    else:
-        raise ValueError("Could not read CSV: unsupported encoding. Try saving as UTF-8.")
-    # If only one column, try semicolon or tab
+    with span("ingestion.parse") as s:
+        fmt = sniff_format(p)
+        df = _read_csv(p, fmt)
+        s.rows = len(df)
+    # Sniffer missed: if only one column, try the other separators
     if len(df.columns) < 2 and len(df) > 0:
-        for sep in (";", "\t"):
+        for sep in DELIMITERS:
+            if sep == fmt["delimiter"]:
+                continue
             try:
-                df = pd.read_csv(p, encoding=encoding, sep=sep)
-                if len(df.columns) >= 2:
-                    break
+                alt = pd.read_csv(p, encoding=fmt["encoding"], sep=sep)
             except Exception:
-                pass
+                continue
+            if len(alt.columns) >= 2:
+                df, fmt["delimiter"] = alt, sep
+                break
     df = _normalize_columns(df)
-    return preprocess(df)
+    df = preprocess(df)
+    df.attrs["csv_format"] = fmt
+    return df
 
 
+def load_dataset(path: Optional[Path] = None) -> pd.DataFrame:
+    """Cleaned dataset for path: reuse its columnar snapshot, or load the CSV and write one."""
+    p = path or SAMPLE_CSV
+    if not p.exists():
+        raise FileNotFoundError(f"CSV not found: {p}")
+    if not DATASET_SNAPSHOTS:
+        return load_csv(p)
+    df = read_snapshot(p)
+    if df is not None:
+        return df
+    df = load_csv(p)
+    try:
+        prune_snapshots(keep=write_snapshot(df, p))
+    except OSError:
+        pass  # snapshots are an optimization; a read-only disk shouldn't fail the request
+    return df
+
+
+REQUIRED_COLUMNS = ["student_id", "subject", "marks"]
+
+
+def _check_required(df: pd.DataFrame) -> None:
+    """Ensure we have required columns (after alias mapping)."""
+    missing = [c for c in REQUIRED_COLUMNS if c not in df.columns]
+    if missing:
+        raise ValueError(
+            f"CSV is missing required columns: {missing}. "
+            "Expected headers like: student_id (or 'Student ID'), subject, marks (or 'Marks'/'Score')."
+        )
+
+
+@timed("ingestion.preprocess")
 def preprocess(df: pd.DataFrame) -> pd.DataFrame:
     """Clean and normalize: types, nulls, valid ranges."""
     df = df.copy()
     # Strip whitespace from string columns
     for col in df.select_dtypes(include=["object"]).columns:
         df[col] = df[col].astype(str).str.strip()
-    # Ensure we have required columns (after alias mapping)
-    required = ["student_id", "subject", "marks"]
-    missing = [c for c in required if c not in df.columns]
-    if missing:
-        raise ValueError(
-            f"CSV is missing required columns: {missing}. "
-            "Expected headers like: student_id (or 'Student ID'), subject, marks (or 'Marks'/'Score')."
-        )
+    _check_required(df)
     # Numeric columns
     if "marks" in df.columns:
         df["marks"] = pd.to_numeric(df["marks"], errors="coerce").clip(0, 100)
@@ -84,17 +170,201 @@ def preprocess(df: pd.DataFrame) -> pd.DataFrame:
     if "semester" in df.columns:
         df["semester"] = pd.to_numeric(df["semester"], errors="coerce").fillna(1).astype(int)
     # Drop rows with critical nulls
-    for c in required:
+    for c in REQUIRED_COLUMNS:
         df = df.dropna(subset=[c])
     if df.empty:
         raise ValueError(
             "No valid rows after reading CSV. Check that student_id, subject, and marks columns have values."
         )
-    return df.reset_index(drop=True)
+    return compact_dtypes(df.reset_index(drop=True))
+
+
+CATEGORICAL_COLUMNS = ["student_id", "name", "subject", "grade"]
+
+
+def compact_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """Shrink dtypes: text keys to categoricals, marks/attendance to int8/float32 when lossless, semester to int8.
+
+    Bytes before/after are recorded in df.attrs["dtype_plan"]. Values are unchanged
+    (float32 is only used when every value round-trips exactly).
+    """
+    before = int(df.memory_usage(deep=True).sum())
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns and not pd.api.types.is_numeric_dtype(df[col]):
+            df[col] = df[col].astype("category")
+    for col in ("marks", "attendance_pct"):
+        if col not in df.columns:
+            continue
+        if pd.api.types.is_integer_dtype(df[col].dtype):
+            df[col] = df[col].astype(np.int8)  # already clipped to 0–100
+        elif df[col].dtype == np.float64:
+            as32 = df[col].astype(np.float32)
+            if np.array_equal(as32.to_numpy(np.float64), df[col].to_numpy(), equal_nan=True):
+                df[col] = as32
+    if "semester" in df.columns:
+        df["semester"] = pd.to_numeric(df["semester"], downcast="integer")
+    after = int(df.memory_usage(deep=True).sum())
+    df.attrs["dtype_plan"] = {
+        "bytes_before": before,
+        "bytes_after": after,
+        "bytes_saved": before - after,
+        "dtypes": {str(c): str(t) for c, t in df.dtypes.items()},
+    }
+    return df
+
+
+def _is_utf8(p: Path, block_size: int = 1 << 20) -> bool:
+    """Decode the file incrementally (bounded memory) to check it is valid UTF-8."""
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    try:
+        with open(p, "rb") as f:
+            while block := f.read(block_size):
+                decoder.decode(block)
+        decoder.decode(b"", final=True)
+    except UnicodeDecodeError:
+        return False
+    return True
+
+
+def chunk_format(path: Path, fmt: Optional[dict[str, str]] = None) -> dict[str, str]:
+    """Format for reading path in pieces: UTF-8 validated up front, required columns checked."""
+    if not path.exists():
+        raise FileNotFoundError(f"CSV not found: {path}")
+    fmt = fmt if fmt is not None else sniff_format(path)
+    # Chunks can't be re-read after they are yielded, so validate UTF-8 up front
+    if fmt["encoding"] == "utf-8" and not _is_utf8(path):
+        fmt["encoding"] = "latin-1"
+    head = pd.read_csv(path, encoding=fmt["encoding"], sep=fmt["delimiter"], nrows=0)
+    _check_required(_normalize_columns(head))
+    return fmt
+
+
+def iter_csv_chunks(
+    path: Optional[Path] = None,
+    chunksize: int = CSV_CHUNK_ROWS,
+    fmt: Optional[dict[str, str]] = None,
+) -> Iterator[pd.DataFrame]:
+    """Yield cleaned chunks (aliases mapped, preprocessed) without loading the whole file."""
+    p = path or SAMPLE_CSV
+    fmt = chunk_format(p, fmt)
+    any_rows = False
+    for chunk in pd.read_csv(p, encoding=fmt["encoding"], sep=fmt["delimiter"], chunksize=chunksize):
+        chunk = _normalize_columns(chunk)
+        try:
+            chunk = preprocess(chunk)
+        except ValueError:
+            continue  # chunk with no valid rows; columns were checked above
+        any_rows = True
+        yield chunk
+    if not any_rows:
+        raise ValueError(
+            "No valid rows after reading CSV. Check that student_id, subject, and marks columns have values."
+        )
+
+
+def shard_ranges(path: Path, shards: int) -> list[tuple[int, int]]:
+    """Split the data rows of a CSV (header excluded) into byte ranges of about equal size."""
+    size = path.stat().st_size
+    with open(path, "rb") as f:
+        start = len(f.readline())
+    step = max(1, -(-(size - start) // max(1, shards)))
+    bounds = list(range(start, size, step)) + [size]
+    return list(zip(bounds[:-1], bounds[1:])) or [(start, size)]
+
+
+def iter_csv_range(
+    path: Path,
+    start: int,
+    end: int,
+    fmt: dict[str, str],
+    chunksize: int = CSV_CHUNK_ROWS,
+) -> Iterator[pd.DataFrame]:
+    """Yield cleaned chunks for the rows whose first byte lies in [start, end).
+
+    Lets several processes read one file without overlap. Rows are cut at newlines, so
+    quoted fields with line breaks and UTF-16 files are not supported here.
+    """
+    with open(path, "rb") as f:
+        header = f.readline()
+        if start > len(header):
+            f.seek(start - 1)
+            f.readline()  # rest of the row that began before start belongs to the previous range
+        pos = f.tell()
+        data = f.read(end - pos) if pos < end else b""
+        if data and not data.endswith(b"\n"):
+            data += f.readline()
+    if not data.strip():
+        return
+    buf = io.BytesIO(header + data)
+    for chunk in pd.read_csv(buf, encoding=fmt["encoding"], sep=fmt["delimiter"], chunksize=chunksize):
+        chunk = _normalize_columns(chunk)
+        try:
+            chunk = preprocess(chunk)
+        except ValueError:
+            continue
+        yield chunk
+
+
+def append_rows(path: Path, df: pd.DataFrame) -> pd.DataFrame:
+    """Append cleaned rows to an existing CSV using its header order, delimiter and encoding.
+
+    Returns the rows as they will read back from the file: columns the file lacks
+    are dropped, columns only the file has are NaN.
+    """
+    fmt = sniff_format(path)
+    header = list(pd.read_csv(path, encoding=fmt["encoding"], sep=fmt["delimiter"], nrows=0).columns)
+    canonical = list(_normalize_columns(pd.DataFrame(columns=header)).columns)
+    aligned = pd.DataFrame({c: df[c] if c in df.columns else np.nan for c in canonical}, index=df.index)
+    encoding = fmt["encoding"]
+    with open(path, "rb") as f:
+        if encoding == "utf-16":
+            encoding = "utf-16-le" if f.read(2) == codecs.BOM_UTF16_LE else "utf-16-be"
+        needs_newline = False
+        if f.seek(0, os.SEEK_END) > 0:
+            f.seek(-1, os.SEEK_END)
+            needs_newline = f.read(1) not in (b"\n", b"\r")
+    if encoding == "utf-8-sig":
+        encoding = "utf-8"  # BOM only at the start of the file
+    out = aligned.set_axis(header, axis=1)
+    with open(path, "a", encoding=encoding, newline="") as f:
+        if needs_newline:
+            f.write("\n")
+        out.to_csv(f, header=False, index=False, sep=fmt["delimiter"], lineterminator="\n")
+    return aligned
+
+
+def _invalidate(path: Path) -> None:
+    """Forget everything derived from the previous contents of path: cached results, snapshot, saved state."""
+    insights_cache.invalidate(path)
+    correlation_cache.invalidate(path)
+    remove_snapshot(path)
+
+
+def save_upload_stream(src: BinaryIO, filename: str, chunk_size: int = 1 << 20) -> Path:
+    """Copy an uploaded file object to data/uploads in fixed-size chunks and return path."""
+    UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+    path = UPLOAD_DIR / filename
+    tmp = path.with_name(path.name + ".part")
+    with open(tmp, "wb") as out:
+        shutil.copyfileobj(src, out, chunk_size)
+    os.replace(tmp, path)
+    _invalidate(path)
+    return path
 
 
 def save_upload(file_content: bytes, filename: str) -> Path:
     """Save uploaded file to data/uploads and return path."""
+    UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
     path = UPLOAD_DIR / filename
     path.write_bytes(file_content)
+    _invalidate(path)
+    return path
+
+
+def promote_upload(staged: Path, filename: str) -> Path:
+    """Move a file already staged in data/uploads into place as filename and return path."""
+    path = UPLOAD_DIR / filename
+    os.replace(staged, path)
+    remove_snapshot(staged)
+    _invalidate(path)
     return path
@@ -1,5 +1,15 @@
 """Insight generator: structured performance summary and risk flags."""
-from typing import Any
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, Optional
+
+from services.lazy import LazyModule
+from services.metrics import timed
+
+if TYPE_CHECKING:
+    import numpy as np
+else:  # loaded on first use (start-up warm-up imports it in the background)
+    np = LazyModule("numpy")
 
 
 def _correlation_interpretation(r_val: float) -> str:
@@ -42,53 +52,208 @@ def _friendly_risk_flags(r: dict) -> list[str]:
     return flags
 
 
-def build_insight_summary(analytics: dict[str, Any]) -> dict[str, Any]:
-    """Turn analytics output into a structured performance summary and risk flags."""
-    risk_list = analytics.get("risk_analysis", [])
-    avg_list = analytics.get("average_marks", [])
-    corr = analytics.get("attendance_correlation", {})
-
-    students_summary = []
-    for r in risk_list:
-        sid = r.get("student_id", "")
-        avg_m = r.get("avg_marks") or 0
-        att = r.get("attendance_avg")
-        att_pct = att if att is not None else 0
-        # academic_health = 0.6 * average_marks + 0.4 * attendance_percentage (0–100)
-        academic_health = round(0.6 * avg_m + 0.4 * att_pct, 1)
-        students_summary.append({
-            "student_id": sid,
-            "name": r.get("name", ""),
-            "avg_marks": r.get("avg_marks"),
-            "attendance_avg": r.get("attendance_avg"),
-            "academic_health": academic_health,
-            "weak_subjects": r.get("weak_subjects", []),
-            "subject_marks": r.get("subject_marks", []),
-            "risk_flags": _friendly_risk_flags(r),
-        })
+def _student_summary(r: dict) -> dict[str, Any]:
+    avg_m = r.get("avg_marks") or 0
+    att = r.get("attendance_avg")
+    att_pct = att if att is not None else 0
+    # academic_health = 0.6 * average_marks + 0.4 * attendance_percentage (0–100)
+    academic_health = round(0.6 * avg_m + 0.4 * att_pct, 1)
+    return {
+        "student_id": r.get("student_id", ""),
+        "name": r.get("name", ""),
+        "avg_marks": r.get("avg_marks"),
+        "attendance_avg": r.get("attendance_avg"),
+        "academic_health": academic_health,
+        "weak_subjects": r.get("weak_subjects", []),
+        "subject_marks": r.get("subject_marks", []),
+        "risk_flags": _friendly_risk_flags(r),
+    }
 
+
+def _summary_fields(corr: Any, students_summary: list[dict]) -> dict[str, Any]:
+    """The correlation text and class-level average academic health (hero meter)."""
     overall_corr = corr.get("overall") if isinstance(corr, dict) else None
     correlation_interpretation = "N/A"
     if overall_corr and "correlation" in overall_corr:
         r_val = overall_corr["correlation"]
         correlation_interpretation = _correlation_interpretation(r_val)
 
-    # Class-level average academic health for hero meter (when no student selected)
     class_health = 0.0
     if students_summary:
         class_health = round(
             sum(s["academic_health"] for s in students_summary) / len(students_summary), 1
         )
+    return {"attendance_marks_correlation": correlation_interpretation, "class_academic_health": class_health}
+
+
+@timed("insights.summary")
+def build_insight_summary(analytics: dict[str, Any]) -> dict[str, Any]:
+    """Turn analytics output into a structured performance summary and risk flags."""
+    risk_list = analytics.get("risk_analysis", [])
+    avg_list = analytics.get("average_marks", [])
+    students_summary = [_student_summary(r) for r in risk_list]
+    fields = _summary_fields(analytics.get("attendance_correlation", {}), students_summary)
 
     return {
         "summary": {
             "total_students": len(avg_list),
-            "attendance_marks_correlation": correlation_interpretation,
-            "students_at_risk_count": sum(1 for r in risk_list if (
-                r.get("risk_low_marks") or r.get("risk_low_attendance") or r.get("risk_multiple_weak")
-            )),
-            "class_academic_health": class_health,
+            "attendance_marks_correlation": fields["attendance_marks_correlation"],
+            "students_at_risk_count": sum(1 for r in risk_list if _is_at_risk(r)),
+            "class_academic_health": fields["class_academic_health"],
         },
         "students": students_summary,
         "raw_analytics": analytics,
     }
+
+
+@timed("insights.patch")
+def patch_insight_summary(insights: dict[str, Any], analytics: dict[str, Any], changes: list[tuple]) -> dict[str, Any]:
+    """build_insight_summary(analytics) when analytics differs from insights["raw_analytics"]
+    only by changes, as returned by AnalyticsAccumulator.patch(): only the changed students
+    are summarised again. insights is not modified (it may be shared through the cache).
+    """
+    students = list(insights["students"])
+    at_risk = insights["summary"]["students_at_risk_count"]
+    for i, inserted, old, new in changes:
+        if inserted:
+            students.insert(i, _student_summary(new))
+        else:
+            students[i] = _student_summary(new)
+            at_risk -= _is_at_risk(old)
+        at_risk += _is_at_risk(new)
+    fields = _summary_fields(analytics.get("attendance_correlation", {}), students)
+    return {
+        **insights,
+        "summary": {
+            **insights["summary"],
+            "total_students": len(analytics.get("average_marks", [])),
+            "attendance_marks_correlation": fields["attendance_marks_correlation"],
+            "students_at_risk_count": at_risk,
+            "class_academic_health": fields["class_academic_health"],
+        },
+        "students": students,
+        "raw_analytics": analytics,
+    }
+
+
+SORT_KEYS = ("academic_health", "avg_marks")
+RISK_CATEGORIES = ("low_marks", "low_attendance", "multiple_weak")
+
+
+def _is_at_risk(r: dict) -> bool:
+    return bool(r.get("risk_low_marks") or r.get("risk_low_attendance") or r.get("risk_multiple_weak"))
+
+
+class StaleIndexError(RuntimeError):
+    """An InsightIndex was asked about insights it was not built from."""
+
+
+class InsightIndex:
+    """Precomputed lookups over an insight summary's students (built once per dataset).
+
+    Holds positions into insights["students"], not the records, so it stays small:
+    student_id -> position, sort orders, risk-category masks and (on first use)
+    subject -> positions of students with marks in it. Positions only mean something
+    for the students list the index was built from; covers() tells whether that is the
+    list in a given insights, and lookups raise StaleIndexError rather than answer for another.
+    """
+
+    @timed("insights.index")
+    def __init__(self, insights: dict[str, Any]):
+        students = insights.get("students", [])
+        self.size = len(students)
+        self._students_id = id(students)  # not a reference: the index must stay small
+        self.positions = {str(s.get("student_id")): i for i, s in enumerate(students)}
+        risk_list = insights.get("raw_analytics", {}).get("risk_analysis", [])
+        # students_summary is built from risk_analysis in the same order
+        self.risk_aligned = len(risk_list) == self.size
+        self.at_risk = np.array([_is_at_risk(r) for r in risk_list], dtype=bool)
+        self.risk_masks = {
+            cat: np.array([bool(r.get(f"risk_{cat}")) for r in risk_list], dtype=bool)
+            for cat in RISK_CATEGORIES
+        }
+        self.sort_orders = {
+            key: np.argsort(np.array([s.get(key) or 0 for s in students], dtype=float), kind="stable")
+            for key in SORT_KEYS
+        }
+        self._subjects: Optional[dict[str, np.ndarray]] = None
+
+    def covers(self, insights: dict[str, Any]) -> bool:
+        """True if the index was built from this insights' students list."""
+        students = insights.get("students", [])
+        return id(students) == self._students_id and len(students) == self.size
+
+    def _check(self, insights: dict[str, Any]) -> None:
+        if not self.covers(insights):
+            raise StaleIndexError("insight index was built for another version of these insights")
+
+    def student(self, insights: dict[str, Any], student_id: Any) -> Optional[dict]:
+        """The student's summary record, or None."""
+        self._check(insights)
+        i = self.positions.get(str(student_id))
+        return None if i is None else insights["students"][i]
+
+    def subject_positions(self, students: list[dict], subject: str) -> np.ndarray:
+        """Positions of students with marks in subject (all subjects indexed in one pass on first use)."""
+        if self._subjects is None:
+            by_subject: dict[str, list[int]] = {}
+            for i, s in enumerate(students):
+                for subj in {m.get("subject") for m in s.get("subject_marks", [])}:
+                    by_subject.setdefault(subj, []).append(i)
+            self._subjects = {k: np.array(v, dtype=np.int64) for k, v in by_subject.items()}
+        return self._subjects.get(subject, np.zeros(0, dtype=np.int64))
+
+    def subject_mask(self, students: list[dict], subject: str) -> np.ndarray:
+        """Students with marks in subject, as a boolean mask."""
+        mask = np.zeros(self.size, dtype=bool)
+        mask[self.subject_positions(students, subject)] = True
+        return mask
+
+    def query(
+        self,
+        insights: dict[str, Any],
+        offset: int = 0,
+        limit: Optional[int] = None,
+        sort: Optional[str] = None,
+        descending: bool = False,
+        at_risk: bool = False,
+        subject: Optional[str] = None,
+        fields: Optional[list[str]] = None,
+        exclude: Optional[list[str]] = None,
+        student_fields: Optional[list[str]] = None,
+        risk: Optional[str] = None,
+    ) -> dict[str, Any]:
+        """One page of students plus the top-level sections asked for (insights: the indexed summary)."""
+        if sort is not None and sort not in SORT_KEYS:
+            raise ValueError(f"sort must be one of {list(SORT_KEYS)}")
+        if risk is not None and risk not in RISK_CATEGORIES:
+            raise ValueError(f"risk must be one of {list(RISK_CATEGORIES)}")
+        self._check(insights)
+        if (at_risk or risk) and not self.risk_aligned:
+            raise StaleIndexError("risk_analysis does not line up with students; cannot filter by risk")
+        all_students = insights.get("students", [])
+        positions = self.sort_orders[sort] if sort else np.arange(self.size)
+        if sort and descending:
+            positions = positions[::-1]
+        mask = np.ones(self.size, dtype=bool)
+        if at_risk:
+            mask &= self.at_risk
+        if risk:
+            mask &= self.risk_masks[risk]
+        if subject:
+            mask &= self.subject_mask(all_students, subject)
+        selected = positions[mask[positions]]
+        end = None if limit is None else offset + limit
+        page = selected[offset:end]
+        students = [all_students[i] for i in page.tolist()]
+        if student_fields:
+            students = [{k: s[k] for k in student_fields if k in s} for s in students]
+
+        out = {k: v for k, v in insights.items() if k != "students"}
+        out["students"] = students
+        out["page"] = {"offset": offset, "limit": limit, "total": int(len(selected))}
+        if fields:
+            out = {k: v for k, v in out.items() if k in fields or k == "page"}
+        for k in exclude or []:
+            out.pop(k, None)
+        return out
@@ -0,0 +1,147 @@
+"""In-process background jobs: a queue drained by worker threads, with per-stage progress."""
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, Optional
+
+from config import JOB_HISTORY, JOB_QUEUE_MAX, JOB_WORKERS
+
+
+class JobQueueFull(RuntimeError):
+    """Raised when JOB_QUEUE_MAX jobs are already waiting."""
+
+
+class Job:
+    """One queued pipeline run; stages are declared up front so progress is known from the start."""
+
+    def __init__(self, kind: str, stages: list[str], meta: Optional[dict] = None):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.meta = meta or {}
+        self.status = "queued"
+        self.stages = [{"name": s, "status": "pending", "seconds": None, "detail": None} for s in stages]
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[dict]:
+        """Mark a stage running for the duration of the block; yields its dict for a "detail" entry."""
+        st = next((s for s in self.stages if s["name"] == name), None)
+        if st is None:
+            st = {"name": name, "status": "pending", "seconds": None, "detail": None}
+            self.stages.append(st)
+        st["status"] = "running"
+        t0 = time.perf_counter()
+        try:
+            yield st
+        except BaseException:
+            st["status"] = "failed"
+            raise
+        else:
+            st["status"] = "done"
+        finally:
+            st["seconds"] = round(time.perf_counter() - t0, 4)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "failed")
+
+    def state(self) -> dict[str, Any]:
+        done = sum(1 for s in self.stages if s["status"] == "done")
+        current = next((s["name"] for s in self.stages if s["status"] == "running"), None)
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "stage": current,
+            "progress": round(done / len(self.stages), 4) if self.stages else 0.0,
+            "stages": [dict(s) for s in self.stages],
+            "error": self.error,
+            "meta": self.meta,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobQueue:
+    """FIFO of jobs run by a fixed number of daemon threads; finished jobs are kept for polling.
+
+    Only the newest `history` finished jobs are kept (with their results, which should be
+    small: upload jobs keep a summary and file fingerprint, not the insights).
+    """
+
+    def __init__(self, workers: int = JOB_WORKERS, history: int = JOB_HISTORY, max_queued: int = JOB_QUEUE_MAX):
+        self.workers = workers
+        self.history = history
+        self.max_queued = max_queued
+        self._queue: queue.Queue = queue.Queue()
+        self._jobs: OrderedDict[str, Job] = OrderedDict()
+        self._lock = threading.Lock()
+        self._threads: list[threading.Thread] = []
+
+    def _ensure_workers(self) -> None:
+        # Started on first use so importing the module doesn't spawn threads
+        if self._threads:
+            return
+        for i in range(self.workers):
+            t = threading.Thread(target=self._work, name=f"jobs-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def submit(self, kind: str, stages: list[str], func: Callable[..., Any], *args: Any, meta: Optional[dict] = None) -> Job:
+        """Queue func(job, *args); its return value becomes job.result."""
+        with self._lock:
+            if self._queue.qsize() >= self.max_queued:
+                raise JobQueueFull("Too many jobs waiting; please retry shortly.")
+            self._ensure_workers()
+            job = Job(kind, stages, meta)
+            self._jobs[job.id] = job
+            self._trim()
+        self._queue.put((job, func, args))
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def recent(self, limit: int = 50) -> list[dict[str, Any]]:
+        with self._lock:
+            jobs = list(self._jobs.values())[-limit:]
+        return [j.state() for j in reversed(jobs)]
+
+    def _trim(self) -> None:
+        finished = [j.id for j in self._jobs.values() if j.finished]
+        for job_id in finished[:max(0, len(finished) - self.history)]:
+            del self._jobs[job_id]
+
+    def _work(self) -> None:
+        while True:
+            job, func, args = self._queue.get()
+            job.status = "running"
+            job.started_at = time.time()
+            try:
+                job.result = func(job, *args)
+                job.status = "done"
+            except Exception as e:
+                job.error = str(e)
+                job.status = "failed"
+            finally:
+                job.finished_at = time.time()
+                self._queue.task_done()
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            counts: dict[str, int] = {}
+            for j in self._jobs.values():
+                counts[j.status] = counts.get(j.status, 0) + 1
+        return {"workers": self.workers, "queued": self._queue.qsize(), "max_queued": self.max_queued, "jobs": counts}
+
+
+job_queue = JobQueue()
@@ -0,0 +1,29 @@
+"""Modules imported on first use, so `import main` doesn't pay for pandas and numpy."""
+import importlib
+from typing import Any, Optional
+
+
+class LazyModule:
+    """Stands in for a module: the first attribute lookup imports it.
+
+    Each attribute is copied onto the proxy as it is used, so later lookups are plain
+    attribute reads. Modules using this need `from __future__ import annotations` so
+    that annotations such as `pd.DataFrame` don't trigger the import at definition time.
+    """
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module: Optional[Any] = None
+
+    def __getattr__(self, attr: str) -> Any:
+        if attr.startswith("__"):
+            raise AttributeError(attr)
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        value = getattr(self._module, attr)
+        setattr(self, attr, value)
+        return value
+
+    def __repr__(self) -> str:
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<LazyModule {self._name!r} ({state})>"
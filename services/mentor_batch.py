@@ -0,0 +1,230 @@
+"""Class-wide mentor reports: batched LLM calls for every at-risk student, resumable, saved as CSV."""
+import asyncio
+import csv
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Optional
+
+from config import (
+    MENTOR_BATCH_CONCURRENCY,
+    MENTOR_BATCH_DIR,
+    MENTOR_BATCH_HISTORY,
+    MENTOR_BATCH_MAX_SIZE,
+    MENTOR_BATCH_SIZE,
+    MENTOR_TIMEOUT,
+)
+from services.ai_mentor import generate_batch_reports, run_mentor_call
+
+REPORT_FIELDS = ["student_id", "name", "avg_marks", "attendance_avg", "academic_health", "weak_subjects", "report"]
+_JOB_ID = re.compile(r"^[0-9a-f]{16}$")
+
+
+def batch_job_id(fingerprint: tuple) -> str:
+    """Job id for a dataset version; posting the same file again resumes the same job."""
+    return hashlib.sha1(json.dumps(list(fingerprint)).encode("utf-8")).hexdigest()[:16]
+
+
+def report_path(job_id: str) -> Optional[Path]:
+    """Report CSV for job_id (None for ids that are not ours, e.g. path tricks)."""
+    if not _JOB_ID.match(job_id):
+        return None
+    return MENTOR_BATCH_DIR / f"{job_id}.csv"
+
+
+class MentorBatchJob:
+    """Reports for a list of students, written to a JSONL progress file as batches finish.
+
+    Students already in the progress file are skipped on the next run, so a job that
+    was interrupted (restart, timeouts, AI errors) picks up where it stopped.
+    batch_size is clamped to 1..MENTOR_BATCH_MAX_SIZE (it can come from a request body).
+    """
+
+    def __init__(
+        self,
+        job_id: str,
+        dataset: str,
+        students: list[dict],
+        correlation_text: str,
+        batch_size: int = MENTOR_BATCH_SIZE,
+        concurrency: int = MENTOR_BATCH_CONCURRENCY,
+    ):
+        self.job_id = job_id
+        self.dataset = dataset
+        self.students = students
+        self.correlation_text = correlation_text
+        self.batch_size = min(max(1, batch_size), MENTOR_BATCH_MAX_SIZE)
+        self.concurrency = max(1, concurrency)
+        self.progress_file = MENTOR_BATCH_DIR / f"{job_id}.jsonl"
+        self.report_file = MENTOR_BATCH_DIR / f"{job_id}.csv"
+        self._write_lock = threading.Lock()  # workers append from executor threads
+        self.status = "pending"
+        self.results: dict[str, str] = self._load_progress()
+        self.resumed = len(self.results)
+        self.failed: dict[str, str] = {}
+        self.requests = 0
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.task: Optional[asyncio.Task] = None
+
+    def _load_progress(self) -> dict[str, str]:
+        results: dict[str, str] = {}
+        if not self.progress_file.exists():
+            return results
+        with open(self.progress_file, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    continue  # torn last line from an interrupted write
+                results[str(row["student_id"])] = row["report"]
+        return results
+
+    def _write_progress(self, reports: dict[str, str]) -> None:
+        with self._write_lock, open(self.progress_file, "a", encoding="utf-8") as f:
+            for sid, text in reports.items():
+                f.write(json.dumps({"student_id": sid, "report": text}) + "\n")
+
+    async def _record(self, reports: dict[str, str]) -> None:
+        """Append reports to the progress file (off the event loop), then to results."""
+        if reports:
+            await asyncio.get_running_loop().run_in_executor(None, self._write_progress, reports)
+        self.results.update(reports)
+
+    async def run(self) -> None:
+        self.status = "running"
+        self.started_at = time.time()
+        self.finished_at = None
+        self.failed = {}
+        MENTOR_BATCH_DIR.mkdir(parents=True, exist_ok=True)
+        pending = [s for s in self.students if str(s.get("student_id")) not in self.results]
+        batches = iter([pending[i:i + self.batch_size] for i in range(0, len(pending), self.batch_size)])
+
+        async def worker():
+            # Workers share one iterator; the mentor pool bounds total concurrent LLM calls
+            for batch in batches:
+                self.requests += 1
+                try:
+                    reports = await run_mentor_call(
+                        generate_batch_reports,
+                        batch,
+                        self.correlation_text,
+                        timeout=MENTOR_TIMEOUT * len(batch),
+                    )
+                except asyncio.TimeoutError:
+                    reports, error = {}, "timed out"
+                except RuntimeError as e:
+                    reports, error = {}, str(e)
+                else:
+                    error = "no report returned"
+                await self._record(reports)
+                for s in batch:
+                    sid = str(s.get("student_id"))
+                    if sid not in reports:
+                        self.failed[sid] = error
+
+        try:
+            await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+            await asyncio.get_running_loop().run_in_executor(None, self.write_report)
+            self.status = "partial" if self.failed else "done"
+        except Exception as e:
+            self.failed["*"] = str(e)
+            self.status = "failed"
+        self.finished_at = time.time()
+
+    def _report_copy(self) -> Path:
+        """Finished reports (in class order) in a new CSV under a name unique to this call."""
+        MENTOR_BATCH_DIR.mkdir(parents=True, exist_ok=True)
+        fd, name = tempfile.mkstemp(dir=MENTOR_BATCH_DIR, prefix=f"{self.job_id}-", suffix=".csv.tmp")
+        try:
+            with open(fd, "w", newline="", encoding="utf-8") as f:
+                writer = csv.DictWriter(f, fieldnames=REPORT_FIELDS)
+                writer.writeheader()
+                for s in self.students:
+                    sid = str(s.get("student_id"))
+                    if sid not in self.results:
+                        continue
+                    writer.writerow({
+                        "student_id": sid,
+                        "name": s.get("name"),
+                        "avg_marks": s.get("avg_marks"),
+                        "attendance_avg": s.get("attendance_avg"),
+                        "academic_health": s.get("academic_health"),
+                        "weak_subjects": "; ".join(map(str, s.get("weak_subjects") or [])),
+                        "report": self.results[sid],
+                    })
+        except BaseException:
+            os.unlink(name)
+            raise
+        return Path(name)
+
+    def write_report(self) -> Path:
+        """Write finished reports to the downloadable CSV (atomically: readers see the old or the new file)."""
+        os.replace(self._report_copy(), self.report_file)
+        return self.report_file
+
+    def partial_report(self) -> Path:
+        """Reports finished so far, for a download while the job runs: a file of the caller's own
+        (report_file is only written by run()), which the caller deletes once sent."""
+        return self._report_copy()
+
+    def state(self) -> dict[str, Any]:
+        ids = {str(s.get("student_id")) for s in self.students}
+        completed = len(ids & self.results.keys())
+        return {
+            "job_id": self.job_id,
+            "dataset": self.dataset,
+            "status": self.status,
+            "total": len(self.students),
+            "completed": completed,
+            "resumed": self.resumed,
+            "failed": len(self.failed),
+            "errors": dict(list(self.failed.items())[:20]),
+            "requests": self.requests,
+            "batch_size": self.batch_size,
+            "concurrency": self.concurrency,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "report": f"/api/mentor/batch/{self.job_id}/report",
+        }
+
+
+_JOBS: OrderedDict[str, MentorBatchJob] = OrderedDict()  # oldest first
+
+
+def _trim() -> None:
+    """Forget all but the newest MENTOR_BATCH_HISTORY finished jobs (their files stay, so
+    posting the dataset again resumes); running jobs are always kept."""
+    finished = [job_id for job_id, job in _JOBS.items() if job.finished_at is not None and job.status != "running"]
+    for job_id in finished[:max(0, len(finished) - MENTOR_BATCH_HISTORY)]:
+        del _JOBS[job_id]
+
+
+def start_batch(
+    fingerprint: tuple,
+    dataset: str,
+    students: list[dict],
+    correlation_text: str,
+    batch_size: Optional[int] = None,
+) -> MentorBatchJob:
+    """Start (or resume) the report job for this dataset version; a running job is returned as is."""
+    job_id = batch_job_id(fingerprint)
+    job = _JOBS.get(job_id)
+    if job is not None and job.status == "running":
+        return job
+    job = MentorBatchJob(job_id, dataset, students, correlation_text, batch_size or MENTOR_BATCH_SIZE)
+    _JOBS.pop(job_id, None)
+    _JOBS[job_id] = job
+    _trim()
+    job.task = asyncio.create_task(job.run())
+    return job
+
+
+def get_batch(job_id: str) -> Optional[MentorBatchJob]:
+    return _JOBS.get(job_id)
@@ -0,0 +1,257 @@
+"""Lightweight instrumentation: stage timings, row counts and allocation peaks, exported for Prometheus.
+
+Wrap work in span("stage") or decorate it with @timed("stage"). Each span feeds the
+app_stage_* metrics served at /metrics and, inside an HTTP request, that response's
+Server-Timing header. With METRICS_ENABLED off, span() hands back a shared no-op and
+the middleware is not installed. Allocation peaks (tracemalloc) are opt-in via
+METRICS_TRACE_MEMORY; they are process-wide, so concurrent requests blur each other's.
+"""
+import contextvars
+import functools
+import threading
+import time
+import tracemalloc
+from typing import Any, Callable, Iterable, Optional
+
+from config import METRICS_ENABLED, METRICS_TRACE_MEMORY
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+SECONDS_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+BYTES_BUCKETS = tuple(2**p for p in range(20, 33, 2))  # 1 MiB .. 4 GiB
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: tuple[str, ...], values: tuple[str, ...], le: Optional[str] = None) -> str:
+    pairs = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if le is not None:
+        pairs.append(f'le="{le}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def collect(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            yield f"{self.name}{_labels(self.labelnames, labels)} {value:g}"
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = (), buckets: tuple = SECONDS_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self._values: dict[tuple, list] = {}  # labels -> [per-bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        with self._lock:
+            v = self._values.get(labels)
+            if v is None:
+                v = self._values[labels] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    v[i] += 1
+                    break
+            v[-2] += value
+            v[-1] += 1
+
+    def collect(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._values.items())
+        for labels, v in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets, v):
+                cumulative += n
+                yield f"{self.name}_bucket{_labels(self.labelnames, labels, f'{bound:g}')} {cumulative}"
+            yield f"{self.name}_bucket{_labels(self.labelnames, labels, '+Inf')} {v[-1]}"
+            yield f"{self.name}_sum{_labels(self.labelnames, labels)} {v[-2]:g}"
+            yield f"{self.name}_count{_labels(self.labelnames, labels)} {v[-1]}"
+
+
+STAGE_SECONDS = Histogram("app_stage_duration_seconds", "Time spent in each pipeline stage.", ("stage",))
+STAGE_ROWS = Counter("app_stage_rows_total", "Rows processed by each pipeline stage.", ("stage",))
+STAGE_ERRORS = Counter("app_stage_errors_total", "Pipeline stages that raised.", ("stage",))
+STAGE_PEAK = Histogram(
+    "app_stage_memory_peak_bytes",
+    "Peak traced allocation above the stage's starting point (METRICS_TRACE_MEMORY).",
+    ("stage",),
+    BYTES_BUCKETS,
+)
+HTTP_SECONDS = Histogram("app_http_request_duration_seconds", "HTTP time to response headers.", ("method", "route"))
+HTTP_REQUESTS = Counter("app_http_requests_total", "HTTP requests by route and status.", ("method", "route", "status"))
+REGISTRY = (STAGE_SECONDS, STAGE_ROWS, STAGE_ERRORS, STAGE_PEAK, HTTP_SECONDS, HTTP_REQUESTS)
+
+# (stage, seconds) pairs for the current request's Server-Timing header
+_request_timings: contextvars.ContextVar[Optional[list]] = contextvars.ContextVar("request_timings", default=None)
+_memory = threading.local()
+
+
+class _NoSpan:
+    """Returned by span() when metrics are off."""
+
+    rows: Optional[int] = None
+
+    def __enter__(self) -> "_NoSpan":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        return None
+
+
+_NO_SPAN = _NoSpan()
+
+
+class _Span:
+    __slots__ = ("name", "rows", "_t0", "_mem")
+
+    def __init__(self, name: str, rows: Optional[int] = None):
+        self.name = name
+        self.rows = rows  # may be set inside the block once known
+
+    def __enter__(self) -> "_Span":
+        self._mem = _memory_enter() if METRICS_TRACE_MEMORY else None
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        seconds = time.perf_counter() - self._t0
+        STAGE_SECONDS.observe(seconds, self.name)
+        if self.rows:
+            STAGE_ROWS.inc(self.name, amount=self.rows)
+        if exc_type is not None:
+            STAGE_ERRORS.inc(self.name)
+        if self._mem is not None:
+            STAGE_PEAK.observe(_memory_exit(self._mem), self.name)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings.append((self.name, seconds))
+
+
+def _memory_enter() -> list:
+    # tracemalloc keeps a single peak, so nested spans pass theirs up to the enclosing one
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+    stack = getattr(_memory, "stack", None)
+    if stack is None:
+        stack = _memory.stack = []
+    current, peak = tracemalloc.get_traced_memory()
+    if stack:
+        stack[-1][1] = max(stack[-1][1], peak)
+    tracemalloc.reset_peak()
+    frame = [current, current]  # [start, highest peak seen by nested spans]
+    stack.append(frame)
+    return frame
+
+
+def _memory_exit(frame: list) -> int:
+    stack = _memory.stack
+    peak = max(tracemalloc.get_traced_memory()[1], frame[1])
+    if stack and stack[-1] is frame:
+        stack.pop()
+    if stack:
+        stack[-1][1] = max(stack[-1][1], peak)
+    return max(0, peak - frame[0])
+
+
+def span(name: str, rows: Optional[int] = None):
+    """Context manager timing a stage; set .rows on the yielded span once the count is known."""
+    return _Span(name, rows) if METRICS_ENABLED else _NO_SPAN
+
+
+def timed(name: str) -> Callable:
+    """Decorator form of span(); rows are taken from a DataFrame first argument."""
+    def wrap(func: Callable) -> Callable:
+        if not METRICS_ENABLED:
+            return func
+
+        @functools.wraps(func)
+        def inner(*args: Any, **kwargs: Any) -> Any:
+            rows = len(args[0]) if args and hasattr(args[0], "shape") else None
+            with _Span(name, rows):
+                return func(*args, **kwargs)
+        return inner
+    return wrap
+
+
+def in_context(func: Callable, *args: Any) -> Callable[[], Any]:
+    """func(*args) bound to the caller's contextvars, for run_in_executor (which doesn't copy them)."""
+    ctx = contextvars.copy_context()
+    return functools.partial(ctx.run, func, *args)
+
+
+def server_timing(timings: list[tuple[str, float]], total: float) -> str:
+    """Server-Timing header value: repeated stages summed, in first-seen order, plus the total."""
+    merged: dict[str, list] = {}
+    for name, seconds in timings:
+        entry = merged.setdefault(name, [0.0, 0])
+        entry[0] += seconds
+        entry[1] += 1
+    parts = [
+        f"{name};dur={s * 1000:.1f}" + (f';desc="x{n}"' if n > 1 else "")
+        for name, (s, n) in merged.items()
+    ]
+    parts.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(parts)
+
+
+def render() -> str:
+    """All metrics in the Prometheus text exposition format."""
+    return "\n".join(line for metric in REGISTRY for line in metric.collect()) + "\n"
+
+
+class MetricsMiddleware:
+    """ASGI middleware: per-route request metrics and a Server-Timing header on every response.
+
+    The header is sent with the response start, so streamed responses only report the
+    stages finished before their first byte.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        timings: list = []
+        token = _request_timings.set(timings)
+        t0 = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                elapsed = time.perf_counter() - t0
+                route = scope.get("route")
+                HTTP_SECONDS.observe(elapsed, scope["method"], getattr(route, "path", "other"))
+                header = server_timing(timings, elapsed).encode("latin-1")
+                message = {**message, "headers": [*message.get("headers", []), (b"server-timing", header)]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_timings.reset(token)
+            route = scope.get("route")
+            HTTP_REQUESTS.inc(scope["method"], getattr(route, "path", "other"), str(status))
@@ -0,0 +1,212 @@
+"""Multi-dataset analytics on a process pool: many CSVs at once, very large ones split across workers.
+
+CLI:  python -m services.parallel school_a.csv school_b.csv [--workers 8] [--json out.json]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Optional
+
+from config import PARALLEL_SHARD_MIN_BYTES, PARALLEL_WORKERS
+from services.analytics import AnalyticsAccumulator, run_analytics
+from services.ingestion import chunk_format, iter_csv_range, load_dataset, shard_ranges
+from services.insights import build_insight_summary
+
+STAGES = ("load", "analytics", "merge", "summary")
+
+
+def _analyze_file(path: str) -> dict[str, Any]:
+    """Worker: whole file through load → run_analytics → build_insight_summary."""
+    cpu0, t0 = time.process_time(), time.perf_counter()
+    df = load_dataset(Path(path))
+    t1 = time.perf_counter()
+    analytics = run_analytics(df)
+    t2 = time.perf_counter()
+    insights = build_insight_summary(analytics)
+    insights["csv_format"] = df.attrs.get("csv_format")
+    insights["dtype_plan"] = df.attrs.get("dtype_plan")
+    t3 = time.perf_counter()
+    return {
+        "insights": insights,
+        "timings": {"load": t1 - t0, "analytics": t2 - t1, "summary": t3 - t2},
+        "cpu": time.process_time() - cpu0,
+        "pid": os.getpid(),
+    }
+
+
+def _analyze_shard(path: str, start: int, end: int, fmt: dict[str, str]) -> dict[str, Any]:
+    """Worker: one byte range of a large file folded into an AnalyticsAccumulator."""
+    cpu0 = time.process_time()
+    acc = AnalyticsAccumulator()
+    load = analytics = 0.0
+    t = time.perf_counter()
+    for chunk in iter_csv_range(Path(path), start, end, fmt):
+        t1 = time.perf_counter()
+        acc.update(chunk)
+        t2 = time.perf_counter()
+        load += t1 - t
+        analytics += t2 - t1
+        t = t2
+    load += time.perf_counter() - t
+    return {
+        "state": acc,
+        "timings": {"load": load, "analytics": analytics},
+        "cpu": time.process_time() - cpu0,
+        "pid": os.getpid(),
+    }
+
+
+def _new_pool(workers: int) -> ProcessPoolExecutor:
+    # spawn: the API process runs threads (mentor pool, uvicorn), which fork does not copy safely
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+
+_POOL: Optional[ProcessPoolExecutor] = None
+
+
+def get_pool() -> ProcessPoolExecutor:
+    """Long-lived pool for the API, so worker start-up (imports) is paid once."""
+    global _POOL
+    if _POOL is None:
+        _POOL = _new_pool(PARALLEL_WORKERS)
+    return _POOL
+
+
+def shutdown_pool() -> None:
+    global _POOL
+    if _POOL is not None:
+        _POOL.shutdown(cancel_futures=True)
+        _POOL = None
+
+
+def analyze_many(
+    paths: list[Path],
+    workers: int = PARALLEL_WORKERS,
+    shard_min_bytes: int = PARALLEL_SHARD_MIN_BYTES,
+    executor: Optional[Executor] = None,
+) -> dict[str, Any]:
+    """Insights for every path, computed in parallel.
+
+    Files of at least shard_min_bytes are split into one byte range per worker; each
+    shard returns an AnalyticsAccumulator (per-student sums, correlation co-moments)
+    and the shards are merged in file order. Per-dataset errors are reported, not raised.
+    """
+    wall0 = time.perf_counter()
+    own_pool = executor is None
+    pool = executor or _new_pool(workers)
+    jobs = []  # (dataset entry, futures, sharded, csv format)
+    try:
+        for p in paths:
+            entry: dict[str, Any] = {"path": str(p), "name": p.name}
+            futures, sharded, fmt = [], False, None
+            try:
+                if workers > 1 and p.stat().st_size >= shard_min_bytes:
+                    fmt = chunk_format(p)
+                    sharded = fmt["encoding"] != "utf-16"  # byte ranges can't be cut on newlines
+                if sharded:
+                    ranges = shard_ranges(p, workers)
+                    futures = [pool.submit(_analyze_shard, str(p), a, b, fmt) for a, b in ranges]
+                else:
+                    futures = [pool.submit(_analyze_file, str(p))]
+                entry["shards"] = len(futures)
+            except (OSError, ValueError) as e:
+                entry["error"] = str(e)
+            jobs.append((entry, futures, sharded, fmt))
+
+        datasets, totals, cpu = [], dict.fromkeys(STAGES, 0.0), 0.0
+        for entry, futures, sharded, fmt in jobs:
+            if not futures:
+                datasets.append(entry)
+                continue
+            try:
+                parts = [f.result() for f in futures]
+            except Exception as e:
+                entry["error"] = str(e)
+                datasets.append(entry)
+                continue
+            timings = dict.fromkeys(STAGES, 0.0)
+            for part in parts:
+                cpu += part["cpu"]
+                for stage, secs in part["timings"].items():
+                    timings[stage] += secs
+            if sharded:
+                t0 = time.perf_counter()
+                acc = parts[0]["state"]
+                for part in parts[1:]:
+                    acc.merge(part["state"])
+                t1 = time.perf_counter()
+                if not acc.students:
+                    entry["error"] = (
+                        "No valid rows after reading CSV. Check that student_id, subject, and marks columns have values."
+                    )
+                    datasets.append(entry)
+                    continue
+                insights = build_insight_summary(acc.result())
+                insights["csv_format"] = fmt
+                insights["dtype_plan"] = None
+                t2 = time.perf_counter()
+                timings["merge"] += t1 - t0
+                timings["summary"] += t2 - t1
+            else:
+                insights = parts[0]["insights"]
+            entry["insights"] = insights
+            entry["timings"] = {k: round(v, 4) for k, v in timings.items()}
+            entry["workers_used"] = len({part["pid"] for part in parts})
+            for stage in STAGES:
+                totals[stage] += timings[stage]
+            datasets.append(entry)
+    finally:
+        if own_pool:
+            pool.shutdown()
+
+    wall = time.perf_counter() - wall0
+    return {
+        "datasets": datasets,
+        "timings": {k: round(v, 4) for k, v in totals.items()},
+        "wall_seconds": round(wall, 4),
+        "workers": workers,
+        "cpu_count": os.cpu_count(),
+        "worker_cpu_seconds": round(cpu, 4),
+        # Share of the pool's capacity (workers × wall time) spent on CPU work in workers
+        "core_utilization": round(cpu / (wall * workers), 4) if wall > 0 and workers else 0.0,
+    }
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Analyse many student CSVs in parallel.")
+    parser.add_argument("paths", nargs="+", type=Path, help="CSV files")
+    parser.add_argument("--workers", type=int, default=PARALLEL_WORKERS, help="worker processes")
+    parser.add_argument(
+        "--shard-min-bytes", type=int, default=PARALLEL_SHARD_MIN_BYTES,
+        help="split files at least this large across all workers",
+    )
+    parser.add_argument("--json", type=Path, help="write full results (insights + timings) to this file")
+    args = parser.parse_args(argv)
+
+    result = analyze_many(args.paths, workers=args.workers, shard_min_bytes=args.shard_min_bytes)
+    for d in result["datasets"]:
+        if "error" in d:
+            print(f"{d['name']}: error: {d['error']}")
+            continue
+        s = d["insights"]["summary"]
+        t = d["timings"]
+        print(
+            f"{d['name']}: {s.get('total_students')} students, {s.get('students_at_risk_count')} at risk, "
+            f"{d['shards']} shard(s) | load {t['load']:.2f}s analytics {t['analytics']:.2f}s "
+            f"merge {t['merge']:.2f}s summary {t['summary']:.2f}s"
+        )
+    print(
+        f"{len(result['datasets'])} dataset(s) in {result['wall_seconds']:.2f}s on {result['workers']} worker(s); "
+        f"core utilization {result['core_utilization']:.0%}"
+    )
+    if args.json:
+        args.json.write_text(json.dumps(result, default=str), encoding="utf-8")
+    return 1 if any("error" in d for d in result["datasets"]) else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
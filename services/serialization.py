@@ -0,0 +1,122 @@
+"""Fast JSON responses: orjson when installed, gzip/brotli for large bodies, ETags for revalidation."""
+import gzip
+import hashlib
+import json
+import math
+from typing import Any, Optional
+
+from fastapi.responses import JSONResponse, Response
+
+from config import COMPRESS_LEVEL, COMPRESS_MIN_BYTES, RESPONSE_COMPRESSION
+
+try:
+    import orjson
+except ImportError:  # optional: stdlib json is used instead
+    orjson = None
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+ORJSON_OPTIONS = (orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS) if orjson else 0
+
+
+def _default(obj: Any) -> Any:
+    """numpy scalars/arrays for the stdlib encoder (orjson handles them natively)."""
+    if hasattr(obj, "tolist"):
+        return _finite(obj.tolist())
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _finite(obj: Any) -> Any:
+    """Copy with NaN/inf floats as None, as orjson writes them (stdlib json would emit invalid JSON)."""
+    if isinstance(obj, float):
+        return obj if math.isfinite(obj) else None
+    if isinstance(obj, dict):
+        return {k: _finite(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_finite(v) for v in obj]
+    return obj
+
+
+def dumps(content: Any) -> bytes:
+    """Compact UTF-8 JSON; NaN (e.g. a correlation over missing attendance) becomes null."""
+    if orjson is not None:
+        return orjson.dumps(content, option=ORJSON_OPTIONS)
+    return json.dumps(
+        _finite(content), ensure_ascii=False, allow_nan=False, separators=(",", ":"), default=_default
+    ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with dumps()."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """Best supported Content-Encoding from an Accept-Encoding header (br, then gzip), or None."""
+    accepted = set()
+    for item in accept_encoding.lower().split(","):
+        name, _, params = item.strip().partition(";")
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(name.strip())
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted or "*" in accepted:
+        return "gzip"
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=COMPRESS_LEVEL)
+    return gzip.compress(body, compresslevel=COMPRESS_LEVEL, mtime=0)
+
+
+def make_etag(*parts: Any) -> str:
+    """Weak ETag (shared by the compressed and plain forms of a response) for the given identity."""
+    digest = hashlib.sha1(json.dumps(parts, default=str).encode("utf-8")).hexdigest()[:24]
+    return f'W/"{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match check with weak comparison (RFC 9110 13.1.2)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    bare = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == bare for tag in if_none_match.split(","))
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+
+def json_response(
+    content: Any,
+    accept_encoding: str = "",
+    etag: Optional[str] = None,
+    status_code: int = 200,
+) -> Response:
+    """Encoded (and, past COMPRESS_MIN_BYTES, compressed) JSON response with an optional ETag."""
+    body = dumps(content)
+    headers = {}
+    if etag:
+        headers["ETag"] = etag
+        headers["Cache-Control"] = "no-cache"  # cache, but revalidate with If-None-Match
+    if RESPONSE_COMPRESSION and len(body) >= COMPRESS_MIN_BYTES:
+        headers["Vary"] = "Accept-Encoding"
+        encoding = negotiate_encoding(accept_encoding)
+        if encoding:
+            body = compress(body, encoding)
+            headers["Content-Encoding"] = encoding
+    return Response(body, status_code=status_code, media_type="application/json", headers=headers)
@@ -0,0 +1,238 @@
+"""Columnar snapshots of cleaned datasets: memory-mapped .npy columns, categorical codes for text."""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional
+
+from config import SNAPSHOT_DIR, SNAPSHOT_MAX_BYTES
+from services.lazy import LazyModule
+from services.metrics import timed
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+else:  # loaded on first use (start-up warm-up imports them in the background)
+    np = LazyModule("numpy")
+    pd = LazyModule("pandas")
+
+SNAPSHOT_VERSION = 2
+STALE_TMP_SECONDS = 3600  # a .tmp-<pid> directory this old was left by a writer that died
+
+
+def snapshot_path(csv_path: Path) -> Path:
+    """Snapshot directory for a source CSV (one per resolved path)."""
+    key = hashlib.sha1(str(csv_path.resolve()).encode("utf-8")).hexdigest()[:12]
+    return SNAPSHOT_DIR / f"{csv_path.stem}-{key}"
+
+
+def _source_meta(csv_path: Path) -> dict:
+    st = csv_path.stat()
+    return {"path": str(csv_path.resolve()), "mtime_ns": st.st_mtime_ns, "size": st.st_size}
+
+
+@timed("snapshot.write")
+def write_snapshot(df: pd.DataFrame, csv_path: Path) -> Path:
+    """Persist a cleaned frame next to the uploads; text columns are stored as sorted categoricals."""
+    target = snapshot_path(csv_path)
+    tmp = target.with_name(target.name + f".tmp-{os.getpid()}")
+    if tmp.exists():
+        shutil.rmtree(tmp)
+    tmp.mkdir(parents=True)
+    columns = []
+    for i, col in enumerate(df.columns):
+        s = df[col]
+        if isinstance(s.dtype, pd.CategoricalDtype) or not (
+            pd.api.types.is_numeric_dtype(s.dtype) or pd.api.types.is_bool_dtype(s.dtype)
+        ):
+            if not isinstance(s.dtype, pd.CategoricalDtype):
+                s = s.astype(str)
+            codes, cats = pd.factorize(s, sort=True)
+            np.save(tmp / f"{i}.codes.npy", codes.astype(np.int32))
+            (tmp / f"{i}.categories.json").write_text(json.dumps([str(c) for c in cats]), encoding="utf-8")
+            columns.append({"name": str(col), "kind": "category"})
+        else:
+            np.save(tmp / f"{i}.npy", s.to_numpy())
+            columns.append({"name": str(col), "kind": "numeric"})
+    meta = {
+        "version": SNAPSHOT_VERSION,
+        "source": _source_meta(csv_path),
+        "rows": len(df),
+        "columns": columns,
+        "attrs": df.attrs,
+    }
+    (tmp / "meta.json").write_text(json.dumps(meta), encoding="utf-8")
+    if target.exists():
+        shutil.rmtree(target)
+    os.replace(tmp, target)
+    return target
+
+
+@timed("snapshot.read")
+def read_snapshot(csv_path: Path) -> Optional[pd.DataFrame]:
+    """Load the snapshot for csv_path if it exists and matches the file on disk; else None."""
+    target = snapshot_path(csv_path)
+    meta_file = target / "meta.json"
+    if not meta_file.exists():
+        return None
+    try:
+        meta = json.loads(meta_file.read_text(encoding="utf-8"))
+        if meta.get("version") != SNAPSHOT_VERSION or meta.get("source") != _source_meta(csv_path):
+            return None  # stale: source CSV was rewritten
+        data = {}
+        for i, c in enumerate(meta["columns"]):
+            if c["kind"] == "category":
+                codes = np.load(target / f"{i}.codes.npy", mmap_mode="r")
+                cats = json.loads((target / f"{i}.categories.json").read_text(encoding="utf-8"))
+                data[c["name"]] = pd.Categorical.from_codes(codes, categories=cats)
+            else:
+                data[c["name"]] = np.load(target / f"{i}.npy", mmap_mode="r")
+        df = pd.DataFrame(data, copy=False)
+        os.utime(meta_file)  # last use, for prune_snapshots()
+    except (OSError, ValueError, KeyError):
+        return None
+    df.attrs.update(meta.get("attrs") or {})
+    return df
+
+
+def remove_snapshot(csv_path: Path) -> None:
+    """Delete the snapshot and saved analytics state of csv_path (e.g. when the file is replaced)."""
+    shutil.rmtree(snapshot_path(csv_path), ignore_errors=True)
+    _state_file(csv_path).unlink(missing_ok=True)
+    _state_log(csv_path).unlink(missing_ok=True)
+
+
+def _footprint(snapshot: Path) -> int:
+    """Bytes used by a snapshot directory and the saved state next to it."""
+    files = list(snapshot.iterdir()) if snapshot.is_dir() else []
+    files += [snapshot.with_name(snapshot.name + ext) for ext in (".state.json", ".state.log")]
+    return sum(f.stat().st_size for f in files if f.is_file())
+
+
+def _state_source(state_file: Path) -> Optional[Path]:
+    """Source CSV of a saved state file, read from its first bytes (write_state puts it first)."""
+    prefix = '{"source": '
+    with open(state_file, encoding="utf-8") as f:
+        head = f.read(4096)
+    if not head.startswith(prefix):
+        return None
+    return Path(json.JSONDecoder().raw_decode(head, len(prefix))[0]["path"])
+
+
+def prune_snapshots(keep: Optional[Path] = None, max_bytes: int = SNAPSHOT_MAX_BYTES) -> list[Path]:
+    """Remove snapshots whose source CSV is gone and leftovers of interrupted writes, then
+    the least recently used snapshots (with their saved state) until the rest fit in
+    max_bytes. The snapshot directory keep is never removed. Returns what was removed."""
+    if not SNAPSHOT_DIR.is_dir():
+        return []
+    removed, live = [], []
+    now = time.time()
+    for entry in SNAPSHOT_DIR.iterdir():
+        try:
+            if ".tmp-" in entry.name:
+                if entry.is_dir() and now - entry.stat().st_mtime > STALE_TMP_SECONDS:
+                    shutil.rmtree(entry, ignore_errors=True)
+                    removed.append(entry)
+                continue
+            if entry.is_dir():
+                snapshot, used_file = entry, entry / "meta.json"
+                source = Path(json.loads(used_file.read_text(encoding="utf-8"))["source"]["path"])
+            elif entry.name.endswith(".state.json") and not entry.with_name(entry.name[: -len(".state.json")]).is_dir():
+                snapshot, used_file = entry.with_name(entry.name[: -len(".state.json")]), entry
+                source = _state_source(entry)
+                if source is None:
+                    continue
+            else:
+                continue
+            if snapshot != keep and not source.exists():
+                remove_snapshot(source)
+                removed.append(snapshot)
+                continue
+            live.append((used_file.stat().st_mtime, _footprint(snapshot), snapshot, source))
+        except (OSError, ValueError, KeyError):
+            continue  # being written or removed concurrently
+    total = sum(size for _, size, _, _ in live)
+    for _, size, snapshot, source in sorted(live, key=lambda e: e[0]):
+        if total <= max_bytes:
+            break
+        if snapshot == keep:
+            continue
+        remove_snapshot(source)
+        removed.append(snapshot)
+        total -= size
+    return removed
+
+
+def _state_file(csv_path: Path) -> Path:
+    d = snapshot_path(csv_path)
+    return d.with_name(d.name + ".state.json")
+
+
+def _state_log(csv_path: Path) -> Path:
+    d = snapshot_path(csv_path)
+    return d.with_name(d.name + ".state.log")
+
+
+def state_source(csv_path: Path) -> dict:
+    """The fingerprint saved state is tagged with; take it before changing the file."""
+    return _source_meta(csv_path)
+
+
+def write_state(state: dict, csv_path: Path) -> None:
+    """Persist incremental analytics state for csv_path, tagged with the file's current fingerprint.
+
+    Replaces any patches appended with append_state().
+    """
+    target = _state_file(csv_path)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp = target.with_name(target.name + f".tmp-{os.getpid()}")
+    tmp.write_text(json.dumps({"source": _source_meta(csv_path), "state": state}), encoding="utf-8")
+    os.replace(tmp, target)
+    _state_log(csv_path).unlink(missing_ok=True)
+
+
+def append_state(patch: dict, csv_path: Path, previous: dict) -> bool:
+    """Append a state patch (the entries an append changed) to the log next to the saved state.
+
+    previous is state_source() from before the file changed; read_state() only applies a
+    patch on top of state tagged with it. Returns True once the log is larger than the saved
+    state itself, i.e. when the caller should write_state() the whole state instead.
+    """
+    base = _state_file(csv_path)
+    log = _state_log(csv_path)
+    line = json.dumps({"previous": previous, "source": _source_meta(csv_path), "patch": patch})
+    with open(log, "a", encoding="utf-8") as f:
+        f.write(line + "\n")
+    try:
+        return log.stat().st_size > base.stat().st_size
+    except OSError:
+        return True
+
+
+def read_state(csv_path: Path) -> Optional[tuple[dict, list[dict]]]:
+    """(saved analytics state, patches to apply in order) for csv_path, or None if missing or
+    the file has changed since."""
+    target = _state_file(csv_path)
+    if not target.exists():
+        return None
+    try:
+        saved = json.loads(target.read_text(encoding="utf-8"))
+        source, patches = saved.get("source"), []
+        log = _state_log(csv_path)
+        if log.exists():
+            with open(log, encoding="utf-8") as f:
+                for line in f:
+                    entry = json.loads(line)
+                    if entry.get("previous") != source:
+                        break  # left over from before the last write_state()
+                    source = entry.get("source")
+                    patches.append(entry["patch"])
+    except (OSError, ValueError, KeyError):
+        return None
+    if source != _source_meta(csv_path):
+        return None
+    return saved.get("state"), patches
@@ -0,0 +1,65 @@
+"""Startup warm-up run after the server starts accepting connections, reported by /api/ready."""
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Optional
+
+
+class Warmup:
+    """Runs named async steps once, in order, recording each one's outcome and duration.
+
+    ready turns true when every required step has finished (failed steps included:
+    warm-up only pre-loads, so the app still serves requests, just slower at first).
+    """
+
+    def __init__(self):
+        self.steps: list[dict[str, Any]] = []
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.enabled = True
+
+    @property
+    def ready(self) -> bool:
+        if not self.enabled:
+            return True
+        return self.started_at is not None and all(
+            s["status"] in ("done", "failed") for s in self.steps if s["required"]
+        )
+
+    def skip(self) -> None:
+        """Warm-up disabled: report ready at once."""
+        self.enabled = False
+
+    async def run(self, steps: list[tuple[str, Callable[[], Awaitable[Any]], bool]]) -> None:
+        """steps: (name, coroutine factory, required) tuples."""
+        self.steps = [
+            {"name": name, "required": required, "status": "pending", "seconds": None, "error": None}
+            for name, _, required in steps
+        ]
+        self.started_at = time.time()
+        for st, (_, factory, _) in zip(self.steps, steps):
+            st["status"] = "running"
+            t0 = time.perf_counter()
+            try:
+                await factory()
+                st["status"] = "done"
+            except asyncio.CancelledError:
+                st["status"] = "cancelled"
+                raise
+            except Exception as e:
+                st["status"] = "failed"
+                st["error"] = str(e) or type(e).__name__
+            finally:
+                st["seconds"] = round(time.perf_counter() - t0, 4)
+        self.finished_at = time.time()
+
+    def state(self) -> dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "enabled": self.enabled,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "steps": [dict(s) for s in self.steps],
+        }
+
+
+warmup = Warmup()